@@ -1,12 +1,22 @@
 import dash
-from dash import dcc, html, Input, Output, State
-import plotly.graph_objects as go
-import networkx as nx
+from dash import dcc, html, Input, Output, State, Patch
 from pathlib import Path
 import logging
+import sys
 from typing import Dict, List, Set, Tuple
 import json
 from supply_chain_network import SupplyChainNetwork
+from reachability import ReachabilityIndex
+from layout_cache import load_or_compute_layout
+from network_figure import (
+    HIGHLIGHT_TRACE_INDEX, NetworkFigureData, build_highlight_trace, build_lod_figure,
+    build_network_figure, trace_visibility
+)
+from level_of_detail import LevelOfDetailIndex
+
+# 与 DuckDB 看板共用 src/utils 下的公司名称检索
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.name_search import CompanyNameIndex, register_search_endpoint, split_former_names
 
 # 设置日志
 logging.basicConfig(
@@ -23,23 +33,37 @@ app.title = "供应链网络可视化"
 network = SupplyChainNetwork()
 network.build_or_load_network(force_rebuild=False)
 
-# 预计算节点位置
-pos = nx.spring_layout(network.graph, k=1, iterations=50)
+# 加载可达性索引，用于即时查询下游依赖
+reachability = ReachabilityIndex.load_or_build(network)
+
+# 加载按网络版本缓存的节点位置
+pos = load_or_compute_layout(network)
+
+# 预计算图形所需的坐标和属性数组
+figure_data = NetworkFigureData(network.graph, pos)
+
+# 加载细节层级索引，节点数超过单次返回上限时默认按社区聚合显示
+lod_index = LevelOfDetailIndex.load_or_build(network, pos)
+default_group_by = 'community' if network.graph.number_of_nodes() > lod_index.max_units else 'none'
+
+# 构建公司名称检索索引，并提供自动补全接口 /api/search
+name_index = CompanyNameIndex.from_graph(network.graph, network.graph_version)
+register_search_endpoint(app.server, lambda: name_index)
 
 # 应用布局
 app.layout = html.Div([
     html.Div([
         html.H1("供应链网络可视化", style={'textAlign': 'center'}),
         html.Div([
-            dcc.Input(
+            dcc.Dropdown(
                 id='search-input',
-                type='text',
-                placeholder='搜索公司名称...',
-                style={'width': '300px', 'margin': '10px'}
+                placeholder='搜索公司名称、曾用名或股票代码...',
+                options=[],
+                style={'width': '400px', 'margin': '10px'}
             ),
-            html.Button('搜索', id='search-button', n_clicks=0),
             html.Button('重置视图', id='reset-button', n_clicks=0),
-        ], style={'textAlign': 'center', 'margin': '10px'}),
+            html.Button('返回上一级', id='lod-back-button', n_clicks=0),
+        ], style={'textAlign': 'center', 'margin': '10px', 'display': 'flex', 'justifyContent': 'center'}),
         html.Div([
             dcc.Dropdown(
                 id='view-type-dropdown',
@@ -51,7 +75,19 @@ app.layout = html.Div([
                 value='all',
                 style={'width': '200px', 'margin': '10px'}
             ),
-        ], style={'textAlign': 'center'}),
+            dcc.Dropdown(
+                id='lod-group-dropdown',
+                options=[
+                    {'label': '显示全部节点', 'value': 'none'},
+                    {'label': '按社区聚合', 'value': 'community'},
+                    {'label': '按行业聚合', 'value': 'industry'},
+                    {'label': '按地区聚合', 'value': 'area'}
+                ],
+                value=default_group_by,
+                clearable=False,
+                style={'width': '200px', 'margin': '10px'}
+            ),
+        ], style={'textAlign': 'center', 'display': 'flex', 'justifyContent': 'center'}),
     ]),
     
     html.Div([
@@ -67,178 +103,166 @@ app.layout = html.Div([
     ]),
     
     dcc.Store(id='selected-node'),
-    dcc.Store(id='graph-data')
+    dcc.Store(id='graph-data'),
+    # 细节层级的下钻路径（聚合ID列表）
+    dcc.Store(id='lod-path', data=[])
 ])
 
-def create_network_figure(selected_node: str = None, view_type: str = 'all'):
-    """创建网络图形"""
-    # 准备节点轨迹
-    node_trace = go.Scatter(
-        x=[],
-        y=[],
-        text=[],
-        mode='markers+text',
-        hoverinfo='text',
-        marker=dict(
-            showscale=True,
-            colorscale='YlGnBu',
-            size=[],
-            color=[],
-            colorbar=dict(
-                thickness=15,
-                title='共享供应商度',
-                xanchor='left',
-                titleside='right'
-            ),
-            line=dict(width=2, color='#666')
-        ),
-        customdata=[],
-        hovertemplate=(
-            "<b>%{text}</b><br>" +
-            "共享供应商度: %{marker.color}<br>" +
-            "节点类型: %{customdata[0]}<br>" +
-            "行业: %{customdata[1]}<br>" +
-            "地区: %{customdata[2]}<br>" +
-            "<extra></extra>"
-        )
-    )
-    
-    # 添加节点
-    for node in network.graph.nodes():
-        x, y = pos[node]
-        node_trace['x'] += tuple([x])
-        node_trace['y'] += tuple([y])
-        node_trace['text'] += tuple([network.graph.nodes[node]['canonical_name']])
-        
-        # 设置节点大小和颜色
-        if network.graph.nodes[node].get('is_shared_supplier', False):
-            size = 20 + network.graph.nodes[node].get('shared_degree', 0) * 5
-            color = network.graph.nodes[node].get('shared_degree', 0)
-        else:
-            size = 10
-            color = 0
-        
-        # 添加节点详细信息
-        node_type = '上市公司' if network.graph.nodes[node].get('is_listed', 0) == 1 else '供应商/客户'
-        industry = network.graph.nodes[node].get('industry', '未知')
-        area = network.graph.nodes[node].get('area', '未知')
-        
-        node_trace['marker']['size'] += tuple([size])
-        node_trace['marker']['color'] += tuple([color])
-        node_trace['customdata'] += tuple([[node_type, industry, area]])
-    
-    # 准备边轨迹
-    edge_traces = []
-    for edge_type, color in [('supplier', '#ff7f0e'), ('customer', '#1f77b4')]:
-        if view_type != 'all' and view_type != edge_type:
-            continue
-            
-        edge_trace = go.Scatter(
-            x=[],
-            y=[],
-            line=dict(width=0.5, color=color),
-            hoverinfo='text',
-            mode='lines',
-            name=edge_type,
-            customdata=[],
-            hovertemplate=(
-                "<b>%{customdata[0]}</b> → <b>%{customdata[1]}</b><br>" +
-                "关系类型: %{customdata[2]}<br>" +
-                "金额: %{customdata[3]:,.2f}<br>" +
-                "占比: %{customdata[4]:.2%}<br>" +
-                "公告日期: %{customdata[5]}<br>" +
-                "<extra></extra>"
-            )
-        )
-        
-        for edge in network.graph.edges():
-            if network.graph.edges[edge]['relationship_type'] == edge_type:
-                x0, y0 = pos[edge[0]]
-                x1, y1 = pos[edge[1]]
-                edge_trace['x'] += tuple([x0, x1, None])
-                edge_trace['y'] += tuple([y0, y1, None])
-                
-                # 添加边详细信息
-                source_name = network.graph.nodes[edge[0]]['canonical_name']
-                target_name = network.graph.nodes[edge[1]]['canonical_name']
-                amount = network.graph.edges[edge].get('procurement_amount', 0) or network.graph.edges[edge].get('revenue', 0)
-                share = network.graph.edges[edge].get('procurement_share', 0) or network.graph.edges[edge].get('revenue_share', 0)
-                date = network.graph.edges[edge].get('announcement_date', '未知')
-                
-                edge_trace['customdata'] += tuple([[source_name, target_name, edge_type, amount, share, date]])
-        
-        edge_traces.append(edge_trace)
-    
-    # 创建图形
-    fig = go.Figure(
-        data=edge_traces + [node_trace],
-        layout=go.Layout(
-            title=dict(
-                text='供应链网络可视化',
-                x=0.5,
-                y=0.95,
-                xanchor='center',
-                yanchor='top'
-            ),
-            showlegend=True,
-            hovermode='closest',
-            margin=dict(b=20, l=5, r=5, t=40),
-            xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-            yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-            plot_bgcolor='white',
-            legend=dict(
-                yanchor="top",
-                y=0.99,
-                xanchor="left",
-                x=0.01
-            ),
-            annotations=[
-                dict(
-                    text="提示：<br>1. 节点大小表示共享供应商度<br>2. 节点颜色深浅表示共享供应商度<br>3. 橙色边表示供应商关系<br>4. 蓝色边表示客户关系",
-                    showarrow=False,
-                    xref="paper",
-                    yref="paper",
-                    x=0.01,
-                    y=0.01,
-                    align="left",
-                    bgcolor="rgba(255, 255, 255, 0.8)",
-                    bordercolor="black",
-                    borderwidth=1
-                )
-            ]
-        )
+# 全部节点的基础图形，每种 view_type 只构建、序列化一次
+full_figures: Dict[str, Dict] = {}
+
+def base_figure(view_type: str = 'all', group_by: str = 'none', cluster: str = None, bbox=None) -> Dict:
+    """构建不含选中高亮的基础图形
+
+    全部节点的图形按 view_type 缓存在 full_figures 中，之后的回调直接复用；
+    细节层级视图随缩放范围变化，由 LevelOfDetailIndex 缓存视图数据，这里
+    每次重新构建，不占用全图的缓存。
+
+    Args:
+        view_type (str): 'all'、'supplier' 或 'customer'
+        group_by (str): 'none' 显示全部节点，否则为细节层级的聚合维度
+        cluster (str): 细节层级的聚合ID
+        bbox (tuple): 可视范围 (x0, x1, y0, y1)
+
+    Returns:
+        Dict: 图形字典
+    """
+    if group_by == 'none':
+        if view_type not in full_figures:
+            full_figures[view_type] = build_network_figure(figure_data, view_type).to_dict()
+        return full_figures[view_type]
+    view = lod_index.view(cluster or LevelOfDetailIndex.root(group_by), bbox)
+    return build_lod_figure(view, view_type).to_dict()
+
+def highlight_trace(node_id: str = None) -> Dict:
+    """选中节点的高亮轨迹，坐标取自网络布局"""
+    if not node_id or node_id not in pos:
+        return build_highlight_trace().to_plotly_json()
+    x, y = pos[node_id]
+    return build_highlight_trace(
+        [float(x)], [float(y)], [network.graph.nodes[node_id]['canonical_name']]
+    ).to_plotly_json()
+
+def create_network_figure(selected_node: str = None, view_type: str = 'all',
+                          group_by: str = 'none', cluster: str = None, bbox=None) -> Dict:
+    """创建完整的网络图形：缓存的基础图形加上选中节点高亮
+
+    group_by 为 'none' 时显示全部节点，否则显示细节层级聚合视图。
+    只替换高亮轨迹，不复制基础图形中的大数组。
+    """
+    figure = base_figure(view_type, group_by, cluster, bbox)
+    data = list(figure['data'])
+    data[HIGHLIGHT_TRACE_INDEX] = highlight_trace(selected_node)
+    return {**figure, 'data': data}
+
+def patch_network_figure(selected_node: str = None, view_type: str = None) -> Patch:
+    """生成只修改高亮轨迹和轨迹可见性的局部更新"""
+    patch = Patch()
+    if view_type is not None:
+        for i, visible in enumerate(trace_visibility(view_type)):
+            patch['data'][i]['visible'] = visible
+    highlight = highlight_trace(selected_node)
+    for key in ('x', 'y', 'text'):
+        patch['data'][HIGHLIGHT_TRACE_INDEX][key] = highlight[key]
+    return patch
+
+def relayout_bbox(relayout_data):
+    """从 relayoutData 中取出缩放后的可视范围，恢复自动范围时返回 None"""
+    if not relayout_data or 'xaxis.range[0]' not in relayout_data or 'yaxis.range[0]' not in relayout_data:
+        return None
+    return (
+        relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]'],
+        relayout_data['yaxis.range[0]'], relayout_data['yaxis.range[1]']
     )
-    
-    return fig
 
 @app.callback(
     [Output('network-graph', 'figure'),
-     Output('node-info', 'children')],
-    [Input('search-button', 'n_clicks'),
+     Output('node-info', 'children'),
+     Output('lod-path', 'data'),
+     Output('selected-node', 'data')],
+    [Input('search-input', 'value'),
      Input('reset-button', 'n_clicks'),
-     Input('view-type-dropdown', 'value')],
-    [State('search-input', 'value'),
-     State('selected-node', 'data')]
+     Input('view-type-dropdown', 'value'),
+     Input('lod-group-dropdown', 'value'),
+     Input('lod-back-button', 'n_clicks'),
+     Input('network-graph', 'clickData'),
+     Input('network-graph', 'relayoutData')],
+    [State('selected-node', 'data'),
+     State('lod-path', 'data')]
 )
-def update_graph(search_clicks, reset_clicks, view_type, search_value, selected_node):
-    """更新图形"""
+def update_graph(search_value, reset_clicks, view_type, group_by, back_clicks, click_data,
+                 relayout_data, selected_node, lod_path):
+    """更新图形
+
+    只有显示内容变化（切换聚合维度、下钻、返回、缩放、重置）时才发送完整图形，
+    切换视图类型、搜索和点击公司节点只发送局部更新。
+    """
     ctx = dash.callback_context
+    lod_path = lod_path or []
     if not ctx.triggered:
-        return create_network_figure(), None
+        return create_network_figure(view_type=view_type, group_by=group_by), None, [], None
     
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    trigger = ctx.triggered[0]['prop_id']
+    trigger_id = trigger.split('.')[0]
+    bbox = None
+    content_changed = False
     
-    if trigger_id == 'search-button' and search_value:
-        # 搜索节点
-        for node in network.graph.nodes():
-            if search_value.lower() in network.graph.nodes[node]['canonical_name'].lower():
-                selected_node = node
-                break
+    if trigger_id == 'search-input':
+        # 下拉框的值即为检索结果中选中的节点ID
+        if search_value in network.graph:
+            selected_node = search_value
     
     elif trigger_id == 'reset-button':
         selected_node = None
+        lod_path = []
+        content_changed = True
+    
+    elif trigger_id == 'lod-group-dropdown':
+        lod_path = []
+        content_changed = True
+    
+    elif trigger_id == 'lod-back-button':
+        lod_path = lod_path[:-1]
+        content_changed = True
+    
+    elif trigger == 'network-graph.clickData' and click_data:
+        # 点击超级节点下钻，点击公司节点显示详情
+        unit_id = click_data['points'][0].get('customdata')
+        if LevelOfDetailIndex.is_cluster(unit_id):
+            lod_path = lod_path + [unit_id]
+            content_changed = True
+        elif unit_id in network.graph:
+            selected_node = unit_id
     
-    return create_network_figure(selected_node, view_type), create_node_info(selected_node)
+    elif trigger == 'network-graph.relayoutData':
+        # 缩放时只请求可视范围内的下一级视图
+        if group_by == 'none':
+            return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        bbox = relayout_bbox(relayout_data)
+        content_changed = True
+    
+    if content_changed:
+        cluster = lod_path[-1] if lod_path else None
+        figure = create_network_figure(selected_node, view_type, group_by, cluster, bbox)
+    else:
+        figure = patch_network_figure(
+            selected_node, view_type if trigger_id == 'view-type-dropdown' else None
+        )
+    return figure, create_node_info(selected_node), lod_path, selected_node
+
+@app.callback(
+    Output('search-input', 'options'),
+    Input('search-input', 'search_value'),
+    State('search-input', 'value')
+)
+def update_search_options(search_value, current_value):
+    """输入时返回排序后的检索结果"""
+    if not search_value:
+        # 保留当前选中项的选项，避免清空下拉框的显示
+        if current_value in network.graph:
+            return [{'label': network.graph.nodes[current_value]['canonical_name'], 'value': current_value}]
+        return dash.no_update
+    return name_index.dropdown_options(search_value, k=10)
 
 def create_node_info(node_id: str = None):
     """创建节点信息显示"""
@@ -251,11 +275,13 @@ def create_node_info(node_id: str = None):
         html.H3(node_data['canonical_name']),
         html.Table([
             html.Tr([html.Td('节点类型'), html.Td('上市公司' if node_data.get('is_listed', 0) == 1 else '供应商/客户')]),
+            html.Tr([html.Td('曾用名'), html.Td('、'.join(split_former_names(node_data.get('former_names'))) or '无')]),
             html.Tr([html.Td('行业'), html.Td(node_data.get('industry', '未知'))]),
             html.Tr([html.Td('地区'), html.Td(node_data.get('area', '未知'))]),
             html.Tr([html.Td('注册资本'), html.Td(f"{node_data.get('registered_capital', 0):,.2f}")]),
             html.Tr([html.Td('是否共享供应商'), html.Td('是' if node_data.get('is_shared_supplier', False) else '否')]),
             html.Tr([html.Td('共享供应商度'), html.Td(node_data.get('shared_degree', 0))]),
+            html.Tr([html.Td('下游依赖上市公司数'), html.Td(reachability.count_dependents(node_id))]),
         ], style={'width': '100%', 'border': '1px solid black'})
     ])
 
@@ -0,0 +1,363 @@
+import gzip
+import io
+import logging
+import math
+import time
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import pandas as pd
+import networkx as nx
+
+from graph_tables import EDGE_COLUMNS, NODE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 节点/边属性的导出类型，GEXF 与 GraphML 的属性声明都由此生成
+NODE_ATTR_TYPES = {
+    'canonical_name': 'string',
+    'former_names': 'string',
+    'company_id': 'string',
+    'company_class': 'string',
+    'is_listed': 'integer',
+    'stock_code': 'string',
+    'industry': 'string',
+    'area': 'string',
+    'registered_capital': 'double',
+    'is_shared_supplier': 'boolean',
+    'shared_degree': 'integer'
+}
+EDGE_ATTR_TYPES = {
+    'relationship_type': 'string',
+    'procurement_amount': 'double',
+    'procurement_share': 'double',
+    'revenue': 'double',
+    'revenue_share': 'double',
+    'announcement_date': 'string'
+}
+
+# GraphML 中的类型名
+GRAPHML_TYPES = {'string': 'string', 'integer': 'int', 'double': 'double', 'boolean': 'boolean'}
+
+# 支持的导出格式和文件压缩方式
+EXPORT_FORMATS = ('gexf', 'graphml', 'csv', 'tsv', 'parquet')
+COMPRESSIONS = (None, 'gzip', 'zstd')
+
+
+class ExportStats:
+    """导出统计：行数、字节数、耗时和吞吐量"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.nodes = 0
+        self.edges = 0
+        self.bytes = 0
+        self.start_time = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self):
+        """结束计时并统计输出大小"""
+        self.seconds = time.perf_counter() - self.start_time
+        path = Path(self.path)
+        if path.is_dir():
+            self.bytes = sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+        elif path.exists():
+            self.bytes = path.stat().st_size
+        logger.info(
+            f"导出完成: {self.path}, {self.nodes} 个节点, {self.edges} 条边, "
+            f"{self.bytes / 1e6:.1f} MB, 耗时 {self.seconds:.1f} 秒, "
+            f"吞吐量 {(self.nodes + self.edges) / max(self.seconds, 1e-9):,.0f} 行/秒, "
+            f"{self.bytes / 1e6 / max(self.seconds, 1e-9):.1f} MB/秒"
+        )
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            'path': str(self.path),
+            'nodes': self.nodes,
+            'edges': self.edges,
+            'bytes': self.bytes,
+            'seconds': self.seconds
+        }
+
+
+def with_compression_suffix(path: str, compression: Optional[str]) -> str:
+    """按压缩方式补全文件扩展名"""
+    suffix = {'gzip': '.gz', 'zstd': '.zst'}.get(compression, '')
+    return path if not suffix or path.endswith(suffix) else path + suffix
+
+
+@contextmanager
+def open_text_output(path: str, compression: Optional[str] = None):
+    """打开文本输出流，可选 gzip 或 zstd 压缩
+
+    zstd 压缩需要安装 zstandard 包。
+
+    Args:
+        path (str): 输出路径
+        compression (str, optional): None、'gzip' 或 'zstd'
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"不支持的压缩方式: {compression}")
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if compression == 'gzip':
+        with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6, newline='') as f:
+            yield f
+    elif compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd 压缩需要安装 zstandard: pip install zstandard") from e
+        with open(path, 'wb') as raw:
+            with zstandard.ZstdCompressor(level=3).stream_writer(raw) as compressed:
+                with io.TextIOWrapper(compressed, encoding='utf-8', newline='') as f:
+                    yield f
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            yield f
+
+
+def iter_chunks(items: Iterable, chunk_size: int) -> Iterator[List]:
+    """把迭代器按 chunk_size 切分为列表"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def format_value(value, attr_type: str) -> Optional[str]:
+    """把属性值转换为导出文本，空值或无法转换的值返回 None"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    try:
+        if attr_type == 'integer':
+            return str(int(float(value)))
+        if attr_type == 'double':
+            number = float(value)
+            return None if math.isnan(number) else repr(number)
+        if attr_type == 'boolean':
+            return 'true' if bool(value) else 'false'
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+class StreamingGraphExporter:
+    """流式导出供应链网络
+
+    节点和边按 chunk_size 分批从 networkx 网络中取出，逐批格式化后写入
+    输出流，内存占用与网络规模无关（不构建完整的 XML 树或 DataFrame）。
+    """
+
+    def __init__(self, graph: nx.DiGraph, chunk_size: int = 50_000):
+        """
+        Args:
+            graph (nx.DiGraph): 供应链网络
+            chunk_size (int): 每批处理的节点/边数
+        """
+        self.graph = graph
+        self.chunk_size = chunk_size
+
+    def export(self, fmt: str, output_path: str, compression: Optional[str] = None) -> ExportStats:
+        """按格式导出
+
+        Args:
+            fmt (str): 'gexf'、'graphml'、'csv'、'tsv' 或 'parquet'
+            output_path (str): 输出路径；parquet 为输出目录
+            compression (str, optional): 文本格式为 None、'gzip'、'zstd'；
+                parquet 为列压缩编码（默认 snappy）
+
+        Returns:
+            ExportStats: 导出统计
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {fmt}")
+        if fmt == 'parquet':
+            return self.write_parquet(output_path, compression)
+        output_path = with_compression_suffix(output_path, compression)
+        writer = {
+            'gexf': self.write_gexf,
+            'graphml': self.write_graphml,
+            'csv': lambda f, stats: self.write_edge_list(f, stats, ','),
+            'tsv': lambda f, stats: self.write_edge_list(f, stats, '\t')
+        }[fmt]
+        stats = ExportStats(output_path)
+        with open_text_output(output_path, compression) as f:
+            writer(f, stats)
+        return stats.finish()
+
+    @staticmethod
+    def _attr_xml(data: Dict, attr_types: Dict[str, str], ids: Dict[str, str], tag: str) -> str:
+        """生成一个元素的属性值 XML"""
+        parts = []
+        for name, attr_type in attr_types.items():
+            text = format_value(data.get(name), attr_type)
+            if text is not None:
+                if tag == 'attvalue':
+                    parts.append(f'<attvalue for="{ids[name]}" value={quoteattr(text)}/>')
+                else:
+                    parts.append(f'<data key="{ids[name]}">{escape(text)}</data>')
+        return ''.join(parts)
+
+    def write_gexf(self, f, stats: ExportStats):
+        """写出 GEXF 1.2"""
+        node_ids = {name: str(i) for i, name in enumerate(NODE_ATTR_TYPES)}
+        edge_ids = {name: str(i) for i, name in enumerate(EDGE_ATTR_TYPES)}
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<gexf xmlns="http://www.gexf.net/1.2draft" version="1.2">\n'
+            '<graph defaultedgetype="directed" mode="static">\n'
+            '<attributes class="node">\n'
+        )
+        for name, attr_type in NODE_ATTR_TYPES.items():
+            f.write(f'<attribute id="{node_ids[name]}" title="{name}" type="{attr_type}"/>\n')
+        f.write('</attributes>\n<attributes class="edge">\n')
+        for name, attr_type in EDGE_ATTR_TYPES.items():
+            f.write(f'<attribute id="{edge_ids[name]}" title="{name}" type="{attr_type}"/>\n')
+        f.write('</attributes>\n<nodes>\n')
+
+        for chunk in iter_chunks(self.graph.nodes(data=True), self.chunk_size):
+            f.write(''.join(
+                f'<node id={quoteattr(str(node))} label={quoteattr(str(data.get("canonical_name", node)))}>'
+                f'<attvalues>{self._attr_xml(data, NODE_ATTR_TYPES, node_ids, "attvalue")}</attvalues></node>\n'
+                for node, data in chunk
+            ))
+            stats.nodes += len(chunk)
+        f.write('</nodes>\n<edges>\n')
+
+        for chunk in iter_chunks(self.graph.edges(data=True), self.chunk_size):
+            f.write(''.join(
+                f'<edge id="{stats.edges + i}" source={quoteattr(str(u))} target={quoteattr(str(v))}>'
+                f'<attvalues>{self._attr_xml(data, EDGE_ATTR_TYPES, edge_ids, "attvalue")}</attvalues></edge>\n'
+                for i, (u, v, data) in enumerate(chunk)
+            ))
+            stats.edges += len(chunk)
+        f.write('</edges>\n</graph>\n</gexf>\n')
+
+    def write_graphml(self, f, stats: ExportStats):
+        """写出 GraphML"""
+        node_ids = {name: f'n{i}' for i, name in enumerate(NODE_ATTR_TYPES)}
+        edge_ids = {name: f'e{i}' for i, name in enumerate(EDGE_ATTR_TYPES)}
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+        )
+        for kind, attr_types, ids in (('node', NODE_ATTR_TYPES, node_ids), ('edge', EDGE_ATTR_TYPES, edge_ids)):
+            for name, attr_type in attr_types.items():
+                f.write(
+                    f'<key id="{ids[name]}" for="{kind}" attr.name="{name}" '
+                    f'attr.type="{GRAPHML_TYPES[attr_type]}"/>\n'
+                )
+        f.write('<graph edgedefault="directed">\n')
+
+        for chunk in iter_chunks(self.graph.nodes(data=True), self.chunk_size):
+            f.write(''.join(
+                f'<node id={quoteattr(str(node))}>{self._attr_xml(data, NODE_ATTR_TYPES, node_ids, "data")}</node>\n'
+                for node, data in chunk
+            ))
+            stats.nodes += len(chunk)
+
+        for chunk in iter_chunks(self.graph.edges(data=True), self.chunk_size):
+            f.write(''.join(
+                f'<edge source={quoteattr(str(u))} target={quoteattr(str(v))}>'
+                f'{self._attr_xml(data, EDGE_ATTR_TYPES, edge_ids, "data")}</edge>\n'
+                for u, v, data in chunk
+            ))
+            stats.edges += len(chunk)
+        f.write('</graph>\n</graphml>\n')
+
+    def _edge_frames(self) -> Iterator[pd.DataFrame]:
+        """按批生成边表 DataFrame，附带两端公司名称"""
+        names = self.graph.nodes
+        for chunk in iter_chunks(self.graph.edges(data=True), self.chunk_size):
+            df = pd.DataFrame.from_records(
+                ({'source_node_id': u, 'target_node_id': v, **data} for u, v, data in chunk),
+                columns=EDGE_COLUMNS
+            )
+            df.insert(1, 'source_name', [names[u].get('canonical_name') for u, _, _ in chunk])
+            df.insert(3, 'target_name', [names[v].get('canonical_name') for _, v, _ in chunk])
+            for col in ['procurement_amount', 'procurement_share', 'revenue', 'revenue_share']:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            df['announcement_date'] = df['announcement_date'].astype('string')
+            yield df
+
+    def write_edge_list(self, f, stats: ExportStats, sep: str):
+        """写出 CSV/TSV 边表"""
+        header = True
+        for df in self._edge_frames():
+            df.to_csv(f, sep=sep, index=False, header=header)
+            header = False
+            stats.edges += len(df)
+
+    def write_parquet(self, output_dir: str, compression: Optional[str] = None) -> ExportStats:
+        """写出分区 Parquet 数据集
+
+        目录结构: nodes/part-0.parquet，edges/relationship_type=<类型>/part-0.parquet。
+        每个分区保持一个 ParquetWriter，每批写入一个 row group。
+
+        Args:
+            output_dir (str): 输出目录
+            compression (str, optional): 列压缩编码，如 'snappy'、'gzip'、'zstd'
+
+        Returns:
+            ExportStats: 导出统计
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        codec = compression or 'snappy'
+        root = Path(output_dir)
+        stats = ExportStats(str(root))
+        writers: Dict[Tuple[str, str], pq.ParquetWriter] = {}
+
+        def write(partition: Tuple[str, str], df: pd.DataFrame):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if partition not in writers:
+                directory = root.joinpath(*partition)
+                directory.mkdir(parents=True, exist_ok=True)
+                for stale in directory.glob('part-*.parquet'):
+                    stale.unlink()
+                writers[partition] = pq.ParquetWriter(str(directory / 'part-0.parquet'), table.schema, compression=codec)
+            writers[partition].write_table(table.cast(writers[partition].schema))
+
+        try:
+            for chunk in iter_chunks(self.graph.nodes(data=True), self.chunk_size):
+                df = pd.DataFrame.from_records(
+                    ({**data, 'unique_node_id': node} for node, data in chunk), columns=NODE_COLUMNS
+                )
+                df = df.astype({col: 'string' for col, attr_type in NODE_ATTR_TYPES.items() if attr_type == 'string'})
+                df['unique_node_id'] = df['unique_node_id'].astype('string')
+                for col in ('is_listed', 'shared_degree', 'registered_capital'):
+                    df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+                df['is_shared_supplier'] = df['is_shared_supplier'].astype('boolean')
+                write(('nodes',), df)
+                stats.nodes += len(df)
+
+            for df in self._edge_frames():
+                df = df.astype({'source_node_id': 'string', 'target_node_id': 'string',
+                                'source_name': 'string', 'target_name': 'string'})
+                for edge_type, part in df.groupby('relationship_type', sort=False):
+                    write(('edges', f'relationship_type={edge_type}'), part.drop(columns='relationship_type'))
+                stats.edges += len(df)
+        finally:
+            for writer in writers.values():
+                writer.close()
+        return stats.finish()
+
+
+def export_graph(
+    graph: nx.DiGraph,
+    fmt: str,
+    output_path: str,
+    compression: Optional[str] = None,
+    chunk_size: int = 50_000
+) -> ExportStats:
+    """流式导出网络的便捷函数，参数见 StreamingGraphExporter.export"""
+    return StreamingGraphExporter(graph, chunk_size).export(fmt, output_path, compression)
@@ -0,0 +1,66 @@
+import pandas as pd
+import networkx as nx
+
+# 边表中统一使用的列
+EDGE_COLUMNS = [
+    'source_node_id',
+    'target_node_id',
+    'relationship_type',
+    'procurement_amount',
+    'procurement_share',
+    'revenue',
+    'revenue_share',
+    'announcement_date'
+]
+
+# 节点表中常用的列
+NODE_COLUMNS = [
+    'unique_node_id',
+    'canonical_name',
+    'former_names',
+    'company_id',
+    'company_class',
+    'is_listed',
+    'stock_code',
+    'industry',
+    'area',
+    'registered_capital',
+    'is_shared_supplier',
+    'shared_degree'
+]
+
+
+def edges_to_frame(graph: nx.DiGraph) -> pd.DataFrame:
+    """将网络的边转换为列式DataFrame，便于向量化计算
+
+    Args:
+        graph (nx.DiGraph): 供应链网络
+
+    Returns:
+        pd.DataFrame: 每条边一行，列见 EDGE_COLUMNS
+    """
+    df = pd.DataFrame.from_records(
+        ({'source_node_id': u, 'target_node_id': v, **data} for u, v, data in graph.edges(data=True)),
+        columns=EDGE_COLUMNS
+    )
+    for col in ['procurement_amount', 'procurement_share', 'revenue', 'revenue_share']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def nodes_to_frame(graph: nx.DiGraph) -> pd.DataFrame:
+    """将网络的节点及其属性转换为DataFrame
+
+    Args:
+        graph (nx.DiGraph): 供应链网络
+
+    Returns:
+        pd.DataFrame: 每个节点一行，unique_node_id 为节点ID
+    """
+    df = pd.DataFrame.from_records(
+        ({**data, 'unique_node_id': node} for node, data in graph.nodes(data=True))
+    )
+    for col in NODE_COLUMNS:
+        if col not in df.columns:
+            df[col] = pd.NA
+    return df
@@ -0,0 +1,228 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import networkx as nx
+
+from force_layout import BarnesHutLayout
+
+logger = logging.getLogger(__name__)
+
+# 节点数不超过该值时使用 nx.spring_layout，否则使用 Barnes-Hut 布局
+SPRING_NODE_LIMIT = 2000
+
+# 旧版本布局至少覆盖当前网络这一比例的节点时（增量更新），才在其基础上放置新节点
+WARM_START_MIN_COVERAGE = 0.8
+
+
+class NetworkLayout:
+    """以紧凑坐标数组保存的网络布局
+
+    node_ids 与 coords 一一对应，coords 为 (N, 2) 的 float32 数组。
+    支持 layout[node] 取单个节点坐标，兼容原先 nx.spring_layout 返回的字典用法。
+    """
+
+    def __init__(self, node_ids: np.ndarray, coords: np.ndarray, version: str = '', params: str = ''):
+        self.node_ids = node_ids
+        self.coords = coords.astype(np.float32)
+        self.version = version
+        self.params = params
+        self.node_index: Dict[str, int] = {node: i for i, node in enumerate(node_ids.tolist())}
+
+    def __getitem__(self, node: str) -> np.ndarray:
+        return self.coords[self.node_index[node]]
+
+    def __contains__(self, node: str) -> bool:
+        return node in self.node_index
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def coords_for(self, nodes: Iterable[str]) -> np.ndarray:
+        """批量获取节点坐标
+
+        Args:
+            nodes (Iterable[str]): 节点ID
+
+        Returns:
+            np.ndarray: (len(nodes), 2) 的坐标数组
+        """
+        return self.coords[[self.node_index[node] for node in nodes]]
+
+    def save(self, path: str):
+        """保存布局到 .npz 文件"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            node_ids=self.node_ids,
+            coords=self.coords,
+            version=np.array(self.version),
+            params=np.array(self.params)
+        )
+        logger.info(f"网络布局已保存到: {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'NetworkLayout':
+        """从 .npz 文件加载布局"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['node_ids'], data['coords'], str(data['version']), str(data['params']))
+
+
+def layout_params_key(**params) -> str:
+    """布局参数的短指纹，用于区分不同参数下的布局文件"""
+    text = ','.join(f"{key}={params[key]}" for key in sorted(params))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]
+
+
+def resolve_layout_method(graph: nx.DiGraph, method: str = 'auto') -> str:
+    """确定实际使用的布局算法"""
+    if method == 'auto':
+        return 'spring' if graph.number_of_nodes() <= SPRING_NODE_LIMIT else 'barnes_hut'
+    if method not in ('spring', 'barnes_hut'):
+        raise ValueError(f"不支持的布局算法: {method}")
+    return method
+
+
+def compute_layout(
+    graph: nx.DiGraph,
+    k: float = 1,
+    iterations: int = 50,
+    seed: int = 42,
+    method: str = 'auto',
+    init: Optional[NetworkLayout] = None
+) -> NetworkLayout:
+    """计算完整的力导向布局
+
+    Args:
+        graph (nx.DiGraph): 网络
+        k (float): nx.spring_layout 的节点间最佳距离
+        iterations (int): 迭代次数预算
+        seed (int): 随机种子
+        method (str): 'spring'、'barnes_hut' 或 'auto'（按节点数选择）
+        init (NetworkLayout, optional): 初始布局，Barnes-Hut 布局从该布局继续迭代
+
+    Returns:
+        NetworkLayout: 网络布局
+    """
+    method = resolve_layout_method(graph, method)
+    logger.info(f"开始计算网络布局 ({method}): {graph.number_of_nodes()} 个节点")
+    node_ids = list(graph.nodes())
+    if method == 'spring':
+        pos = nx.spring_layout(graph, k=k, iterations=iterations, seed=seed)
+        coords = np.array([pos[node] for node in node_ids], dtype=np.float32).reshape(-1, 2)
+    else:
+        start = init.coords_for(node_ids) if init is not None else None
+        coords = BarnesHutLayout(iterations=iterations, seed=seed).run(graph, init=start)
+    return NetworkLayout(np.array(node_ids, dtype=str), coords)
+
+
+def extend_layout(previous: NetworkLayout, graph: nx.DiGraph, seed: int = 42) -> NetworkLayout:
+    """在已有布局的基础上只放置新增节点
+
+    已有节点保持原坐标；新节点放在已放置邻居的质心附近，没有已放置邻居的
+    节点随机放在布局范围内。
+
+    Args:
+        previous (NetworkLayout): 旧版本网络的布局
+        graph (nx.DiGraph): 增量更新后的网络
+        seed (int): 随机种子
+
+    Returns:
+        NetworkLayout: 覆盖新网络全部节点的布局
+    """
+    rng = np.random.default_rng(seed)
+    node_ids = list(graph.nodes())
+    kept = [node for node in node_ids if node in previous]
+    new_nodes = [node for node in node_ids if node not in previous]
+
+    positions = {node: previous[node] for node in kept}
+    low = previous.coords.min(axis=0) if len(previous) else np.array([-1, -1], dtype=np.float32)
+    high = previous.coords.max(axis=0) if len(previous) else np.array([1, 1], dtype=np.float32)
+    jitter = 0.02 * float(np.max(high - low) or 1.0)
+
+    pending = new_nodes
+    while pending:
+        remaining = []
+        for node in pending:
+            placed = [
+                positions[neighbor] for neighbor in nx.all_neighbors(graph, node) if neighbor in positions
+            ]
+            if placed:
+                positions[node] = np.mean(placed, axis=0) + rng.normal(0, jitter, size=2)
+            else:
+                remaining.append(node)
+        if len(remaining) == len(pending):
+            for node in remaining:
+                positions[node] = rng.uniform(low, high)
+            break
+        pending = remaining
+
+    logger.info(f"增量布局: 保留 {len(kept)} 个节点坐标，新放置 {len(new_nodes)} 个节点")
+    coords = np.array([positions[node] for node in node_ids], dtype=np.float32).reshape(-1, 2)
+    return NetworkLayout(np.array(node_ids, dtype=str), coords)
+
+
+def load_or_compute_layout(
+    network,
+    k: float = 1,
+    iterations: int = 50,
+    seed: int = 42,
+    method: str = 'auto',
+    refine_iterations: int = 10
+) -> NetworkLayout:
+    """加载与网络版本和布局参数对应的布局，必要时计算并缓存
+
+    1. 当前版本已有缓存时直接加载；
+    2. 否则如有同参数的旧版本布局且覆盖当前网络至少 WARM_START_MIN_COVERAGE
+       的节点（增量更新），只放置新增节点，Barnes-Hut 布局下再固定已有节点、
+       对新节点迭代 refine_iterations 次；
+    3. 否则（如全量重建）计算完整布局。
+
+    保存新布局后删除同参数的旧版本布局。
+
+    Args:
+        network (SupplyChainNetwork): 已加载的供应链网络
+        k (float): 节点间最佳距离
+        iterations (int): 迭代次数预算
+        seed (int): 随机种子，固定后每次重启得到相同的布局
+        method (str): 'spring'、'barnes_hut' 或 'auto'（按节点数选择）
+        refine_iterations (int): 增量放置新节点后的迭代次数
+
+    Returns:
+        NetworkLayout: 网络布局
+    """
+    method = resolve_layout_method(network.graph, method)
+    params = layout_params_key(k=k, iterations=iterations, seed=seed, method=method)
+    name = f'layout_{params}'
+    path = network.artifact_path(name, '.npz')
+    if path.exists():
+        logger.info(f"从 {path} 加载网络布局成功")
+        return NetworkLayout.load(str(path))
+
+    previous = None
+    previous_paths = network.previous_artifacts(name, '.npz')
+    if previous_paths:
+        candidate = NetworkLayout.load(str(previous_paths[0]))
+        node_count = network.graph.number_of_nodes()
+        covered = sum(1 for node in network.graph if node in candidate)
+        if node_count and covered >= WARM_START_MIN_COVERAGE * node_count:
+            previous = candidate
+        else:
+            logger.info(f"旧版本布局只覆盖 {covered}/{node_count} 个节点，重新计算完整布局")
+    if previous is not None:
+        layout = extend_layout(previous, network.graph, seed)
+        if method == 'barnes_hut' and refine_iterations > 0:
+            fixed = np.array([node in previous for node in layout.node_ids.tolist()])
+            layout.coords = BarnesHutLayout(
+                iterations=refine_iterations, initial_temperature=0.02, seed=seed
+            ).run(network.graph, init=layout.coords, fixed=fixed).astype(np.float32)
+    else:
+        layout = compute_layout(network.graph, k=k, iterations=iterations, seed=seed, method=method)
+
+    layout.version = network.graph_version
+    layout.params = params
+    layout.save(str(path))
+    network.prune_artifacts(name, '.npz')
+    return layout
@@ -0,0 +1,416 @@
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+from graph_tables import edges_to_frame, nodes_to_frame
+
+logger = logging.getLogger(__name__)
+
+# 支持的聚合维度
+GROUP_KEYS = ('community', 'industry', 'area')
+
+# 布局网格的最细层级，最细一层为 2^GRID_LEVELS x 2^GRID_LEVELS 个格子
+GRID_LEVELS = 12
+
+
+class LevelOfDetailView:
+    """一次细节层级查询的结果
+
+    units 为图上显示的单元：聚合后的超级节点 (is_cluster=True，unit_id 为
+    可继续下钻的聚合ID) 或单个公司节点 (unit_id 为节点ID)。
+    edges 为单元之间按关系类型汇总的边。
+    """
+
+    def __init__(self, cluster: str, units: pd.DataFrame, edges: pd.DataFrame, total_edges: int):
+        self.cluster = cluster
+        self.units = units
+        self.edges = edges
+        self.total_edges = total_edges
+
+    @property
+    def element_count(self) -> int:
+        """返回给前端的元素数（单元数 + 边数）"""
+        return len(self.units) + len(self.edges)
+
+
+class LevelOfDetailIndex:
+    """按细节层级聚合网络的索引
+
+    每个节点预先计算其所属的社区/行业/地区分组（按分组大小排名编码）和布局
+    网格坐标。聚合ID 形如 "industry|lo|hi|level|cx|cy"，表示排名在 [lo, hi)
+    内的分组中、落在第 level 层网格 (cx, cy) 格子里的节点。查询时对成员
+    节点按 (分组, 格子) 分组，选择单元数不超过上限的最细网格层级，再把成员
+    之间的边按单元对汇总，所以返回的元素数与网络规模无关。
+    """
+
+    def __init__(
+        self,
+        version: str,
+        node_ids: np.ndarray,
+        node_names: np.ndarray,
+        is_listed: np.ndarray,
+        coords: np.ndarray,
+        cells: np.ndarray,
+        group_ranks: Dict[str, np.ndarray],
+        group_labels: Dict[str, np.ndarray],
+        src: np.ndarray,
+        tgt: np.ndarray,
+        is_supplier: np.ndarray,
+        amount: np.ndarray,
+        max_units: int = 1500,
+        max_elements: int = 5000,
+        cache_size: int = 128
+    ):
+        """
+        Args:
+            version (str): 网络版本号
+            node_ids (np.ndarray): 节点ID
+            node_names (np.ndarray): 节点名称
+            is_listed (np.ndarray): 是否上市公司
+            coords (np.ndarray): (N, 2) 布局坐标
+            cells (np.ndarray): (N, 2) 最细一层的网格坐标
+            group_ranks (Dict[str, np.ndarray]): 每种聚合维度下节点所属分组的排名（按分组大小降序）
+            group_labels (Dict[str, np.ndarray]): 每种聚合维度下按排名排列的分组名称
+            src (np.ndarray): 边的起点下标
+            tgt (np.ndarray): 边的终点下标
+            is_supplier (np.ndarray): 是否供应商关系
+            amount (np.ndarray): 边的金额（采购金额或销售收入）
+            max_units (int): 每次返回的最大单元数
+            max_elements (int): 每次返回的最大元素数（单元 + 边）
+            cache_size (int): 缓存的查询结果数量
+        """
+        self.version = version
+        self.node_ids = node_ids
+        self.node_names = node_names
+        self.is_listed = is_listed
+        self.coords = coords
+        self.cells = cells
+        self.group_ranks = group_ranks
+        self.group_labels = group_labels
+        self.src = src
+        self.tgt = tgt
+        self.is_supplier = is_supplier
+        self.amount = amount
+        self.max_units = max_units
+        self.max_elements = max_elements
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple, LevelOfDetailView]' = OrderedDict()
+
+    @staticmethod
+    def _rank_groups(labels: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """把分组名称编码为按分组大小降序的排名"""
+        counts = labels.value_counts(sort=True)
+        order = {label: rank for rank, label in enumerate(counts.index)}
+        return labels.map(order).to_numpy(dtype=np.int32), counts.index.to_numpy(dtype=str)
+
+    @staticmethod
+    def detect_communities(graph: nx.DiGraph, seed: int = 42) -> Dict[str, str]:
+        """用 Louvain 算法在无向化的网络上划分社区
+
+        社区以其中度数最大的公司命名。
+
+        Args:
+            graph (nx.DiGraph): 供应链网络
+            seed (int): 随机种子
+
+        Returns:
+            Dict[str, str]: 节点ID -> 社区名称
+        """
+        communities = nx.community.louvain_communities(graph.to_undirected(as_view=True), seed=seed)
+        degree = dict(graph.degree())
+        membership = {}
+        for members in communities:
+            hub = max(members, key=lambda node: degree[node])
+            label = f"{graph.nodes[hub].get('canonical_name', hub)} 等"
+            for node in members:
+                membership[node] = label
+        logger.info(f"社区划分完成: {len(communities)} 个社区")
+        return membership
+
+    @classmethod
+    def build(cls, graph: nx.DiGraph, layout, version: str = '', seed: int = 42) -> 'LevelOfDetailIndex':
+        """从网络和布局构建细节层级索引
+
+        Args:
+            graph (nx.DiGraph): 供应链网络
+            layout (NetworkLayout): 网络布局
+            version (str): 网络版本号
+            seed (int): 社区划分的随机种子
+
+        Returns:
+            LevelOfDetailIndex: 构建好的索引
+        """
+        df_nodes = nodes_to_frame(graph)
+        node_ids = df_nodes['unique_node_id'].to_numpy(dtype=str)
+        node_index = pd.Series(np.arange(len(node_ids)), index=node_ids)
+        coords = layout.coords_for(node_ids).astype(np.float64).reshape(-1, 2)
+
+        # 网格坐标: 布局范围等分为 2^GRID_LEVELS 份
+        low = coords.min(axis=0) if len(coords) else np.zeros(2)
+        span = max(float(np.ptp(coords, axis=0).max()) if len(coords) else 0.0, 1e-9) * (1 + 1e-9)
+        finest = 2 ** GRID_LEVELS
+        cells = np.minimum(((coords - low) / span * finest).astype(np.int64), finest - 1)
+
+        communities = cls.detect_communities(graph, seed)
+        group_ranks, group_labels = {}, {}
+        for key, labels in (
+            ('community', df_nodes['unique_node_id'].map(communities)),
+            ('industry', df_nodes['industry']),
+            ('area', df_nodes['area'])
+        ):
+            group_ranks[key], group_labels[key] = cls._rank_groups(labels.fillna('未知').astype(str))
+
+        df_edges = edges_to_frame(graph)
+        is_supplier = (df_edges['relationship_type'] == 'supplier').to_numpy()
+        amount = np.where(is_supplier, df_edges['procurement_amount'], df_edges['revenue']).astype(np.float64)
+
+        logger.info(f"细节层级索引构建完成: {len(node_ids)} 个节点, {len(df_edges)} 条边")
+        return cls(
+            version=version,
+            node_ids=node_ids,
+            node_names=df_nodes['canonical_name'].astype(str).to_numpy(dtype=str),
+            is_listed=(df_nodes['is_listed'].to_numpy() == 1),
+            coords=coords,
+            cells=cells.astype(np.int32),
+            group_ranks=group_ranks,
+            group_labels=group_labels,
+            src=node_index[df_edges['source_node_id']].to_numpy(dtype=np.int32),
+            tgt=node_index[df_edges['target_node_id']].to_numpy(dtype=np.int32),
+            is_supplier=is_supplier,
+            amount=np.nan_to_num(amount)
+        )
+
+    def save(self, path: str):
+        """保存索引到 .npz 文件"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            'version': np.array(self.version),
+            'node_ids': self.node_ids,
+            'node_names': self.node_names,
+            'is_listed': self.is_listed,
+            'coords': self.coords,
+            'cells': self.cells,
+            'src': self.src,
+            'tgt': self.tgt,
+            'is_supplier': self.is_supplier,
+            'amount': self.amount
+        }
+        for key in GROUP_KEYS:
+            arrays[f'{key}_ranks'] = self.group_ranks[key]
+            arrays[f'{key}_labels'] = self.group_labels[key]
+        np.savez_compressed(path, **arrays)
+        logger.info(f"细节层级索引已保存到: {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'LevelOfDetailIndex':
+        """从 .npz 文件加载索引"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                version=str(data['version']),
+                node_ids=data['node_ids'],
+                node_names=data['node_names'],
+                is_listed=data['is_listed'],
+                coords=data['coords'],
+                cells=data['cells'],
+                group_ranks={key: data[f'{key}_ranks'] for key in GROUP_KEYS},
+                group_labels={key: data[f'{key}_labels'] for key in GROUP_KEYS},
+                src=data['src'],
+                tgt=data['tgt'],
+                is_supplier=data['is_supplier'],
+                amount=data['amount']
+            )
+
+    @classmethod
+    def load_or_build(cls, network, layout) -> 'LevelOfDetailIndex':
+        """加载当前网络版本和布局对应的索引，不存在时构建并保存
+
+        构建后立即计算各聚合维度的顶层视图，保证首次打开页面时不需要等待。
+
+        Args:
+            network (SupplyChainNetwork): 已加载的供应链网络
+            layout (NetworkLayout): 网络布局
+
+        Returns:
+            LevelOfDetailIndex: 与网络版本一致的索引
+        """
+        name = f'lod_{layout.params}'
+        path = network.artifact_path(name, '.npz')
+        if path.exists():
+            index = cls.load(str(path))
+            logger.info(f"从 {path} 加载细节层级索引成功")
+        else:
+            index = cls.build(network.graph, layout, network.graph_version)
+            index.save(str(path))
+            network.prune_artifacts(name, '.npz')
+        for key in GROUP_KEYS:
+            index.view(cls.root(key))
+        return index
+
+    @staticmethod
+    def root(group_by: str) -> str:
+        """某个聚合维度的顶层聚合ID"""
+        if group_by not in GROUP_KEYS:
+            raise ValueError(f"不支持的聚合维度: {group_by}")
+        return f"{group_by}|0|-1|0|0|0"
+
+    @staticmethod
+    def is_cluster(unit_id: str) -> bool:
+        """判断单元ID是否为可下钻的聚合ID"""
+        return isinstance(unit_id, str) and unit_id.count('|') == 5
+
+    def view(
+        self,
+        cluster: str,
+        bbox: Optional[Tuple[float, float, float, float]] = None
+    ) -> LevelOfDetailView:
+        """查询一个聚合内部（可限定在可视范围内）的下一级视图
+
+        Args:
+            cluster (str): 聚合ID，顶层为 root(group_by)
+            bbox (Tuple[float, float, float, float], optional): 可视范围 (x0, x1, y0, y1)
+
+        Returns:
+            LevelOfDetailView: 单元数不超过 max_units、元素数不超过 max_elements 的视图
+        """
+        if bbox is not None:
+            bbox = tuple(round(float(v), 4) for v in bbox)
+        key = (cluster, bbox)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        result = self._compute_view(cluster, bbox)
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def _members(self, cluster: str, bbox) -> Tuple[str, np.ndarray]:
+        """聚合ID对应的成员节点下标"""
+        group_by, lo, hi, level, cx, cy = cluster.split('|')
+        lo, hi, level, cx, cy = int(lo), int(hi), int(level), int(cx), int(cy)
+        ranks = self.group_ranks[group_by]
+        mask = ranks >= lo
+        if hi >= 0:
+            mask &= ranks < hi
+        if level > 0:
+            shift = GRID_LEVELS - level
+            mask &= ((self.cells[:, 0] >> shift) == cx) & ((self.cells[:, 1] >> shift) == cy)
+        if bbox is not None:
+            x0, x1, y0, y1 = bbox
+            x, y = self.coords[:, 0], self.coords[:, 1]
+            mask &= (x >= min(x0, x1)) & (x <= max(x0, x1)) & (y >= min(y0, y1)) & (y <= max(y0, y1))
+        return group_by, np.flatnonzero(mask)
+
+    def _unit_codes(self, group_by: str, members: np.ndarray) -> Tuple[np.ndarray, int, int]:
+        """为成员节点选择聚合粒度
+
+        依次尝试更细的网格层级，取单元数不超过 max_units 的最细一层；
+        顶层分组数已超过上限时，排名靠后的分组合并为"其他"。
+
+        Returns:
+            Tuple[np.ndarray, int, int]: 每个成员的单元编码、网格层级、排名上限
+        """
+        ranks = self.group_ranks[group_by][members].astype(np.int64)
+        if len(np.unique(ranks)) > self.max_units:
+            clip = self.max_units - 1
+            return np.minimum(ranks, clip) << (2 * GRID_LEVELS), 0, clip
+
+        best = ranks << (2 * GRID_LEVELS), 0
+        for level in range(1, GRID_LEVELS + 1):
+            shift = GRID_LEVELS - level
+            codes = (
+                (ranks << (2 * GRID_LEVELS)) |
+                ((self.cells[members, 0].astype(np.int64) >> shift) << GRID_LEVELS) |
+                (self.cells[members, 1].astype(np.int64) >> shift)
+            )
+            if len(np.unique(codes)) > self.max_units:
+                break
+            best = codes, level
+        return best[0], best[1], -1
+
+    def _compute_view(self, cluster: str, bbox) -> LevelOfDetailView:
+        """计算视图：成员节点分组为单元，边按单元对汇总"""
+        group_by, members = self._members(cluster, bbox)
+        group_labels = self.group_labels[group_by]
+        n_groups = len(group_labels)
+
+        if len(members) <= self.max_units:
+            unit_of_member = np.arange(len(members))
+            units = pd.DataFrame({
+                'unit_id': self.node_ids[members],
+                'label': self.node_names[members],
+                'x': self.coords[members, 0],
+                'y': self.coords[members, 1],
+                'size': 1,
+                'listed': self.is_listed[members].astype(np.int64),
+                'is_cluster': False
+            })
+        else:
+            codes, level, clip = self._unit_codes(group_by, members)
+            unique_codes, unit_of_member = np.unique(codes, return_inverse=True)
+            size = np.bincount(unit_of_member)
+            rank = unique_codes >> (2 * GRID_LEVELS)
+            cx = (unique_codes >> GRID_LEVELS) & (2 ** GRID_LEVELS - 1)
+            cy = unique_codes & (2 ** GRID_LEVELS - 1)
+            merged = (rank == clip) if clip >= 0 else np.zeros(len(rank), dtype=bool)
+            hi = np.where(merged, n_groups, rank + 1)
+            labels = np.where(
+                merged,
+                '其他',
+                group_labels[np.minimum(rank, n_groups - 1)]
+            ).astype(object)
+            if level > 0:
+                labels = labels + ' #' + cx.astype(str) + '-' + cy.astype(str)
+            unit_ids = (
+                f'{group_by}|' + pd.Series(rank).astype(str) + '|' + pd.Series(hi).astype(str) +
+                f'|{level}|' + pd.Series(cx).astype(str) + '|' + pd.Series(cy).astype(str)
+            ).to_numpy()
+            # 只有一个成员的单元直接显示为公司节点
+            single = size == 1
+            first = np.full(len(unique_codes), -1, dtype=np.int64)
+            first[unit_of_member[::-1]] = members[::-1]
+            unit_ids = np.where(single, self.node_ids[first], unit_ids)
+            labels = np.where(single, self.node_names[first], labels)
+            units = pd.DataFrame({
+                'unit_id': unit_ids,
+                'label': labels,
+                'x': np.bincount(unit_of_member, weights=self.coords[members, 0]) / size,
+                'y': np.bincount(unit_of_member, weights=self.coords[members, 1]) / size,
+                'size': size,
+                'listed': np.bincount(unit_of_member, weights=self.is_listed[members]).astype(np.int64),
+                'is_cluster': ~single
+            })
+
+        # 成员之间的边按 (起点单元, 终点单元, 关系类型) 汇总，单元内部的边不显示
+        unit_of = np.full(len(self.node_ids), -1, dtype=np.int64)
+        unit_of[members] = unit_of_member
+        su, tu = unit_of[self.src], unit_of[self.tgt]
+        inside = (su >= 0) & (tu >= 0)
+        total_edges = int(inside.sum())
+        inside &= su != tu
+        df = pd.DataFrame({
+            'source': su[inside],
+            'target': tu[inside],
+            'relationship_type': np.where(self.is_supplier[inside], 'supplier', 'customer'),
+            'amount': self.amount[inside]
+        })
+        edges = (
+            df.groupby(['source', 'target', 'relationship_type'], sort=False)
+            .agg(count=('amount', 'size'), amount=('amount', 'sum'))
+            .reset_index()
+        )
+        budget = max(self.max_elements - len(units), 0)
+        if len(edges) > budget:
+            edges = edges.nlargest(budget, ['count', 'amount'])
+        edges = edges.reset_index(drop=True)
+
+        logger.info(
+            f"细节层级视图 {cluster}: {len(members)} 个节点 -> {len(units)} 个单元, "
+            f"{total_edges} 条边 -> {len(edges)} 条汇总边"
+        )
+        return LevelOfDetailView(cluster, units, edges, total_edges)
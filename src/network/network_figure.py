@@ -0,0 +1,341 @@
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+import plotly.graph_objects as go
+
+from graph_tables import edges_to_frame, nodes_to_frame
+
+logger = logging.getLogger(__name__)
+
+# 边类型及颜色
+EDGE_TYPE_COLORS = [('supplier', '#ff7f0e'), ('customer', '#1f77b4')]
+
+# 节点数不超过该值时在图上显示公司名称
+LABEL_NODE_LIMIT = 300
+
+# 轨迹顺序固定为: 每种边类型的线段和悬停轨迹、节点轨迹、选中节点高亮轨迹，
+# 局部更新 (dash.Patch) 按下标修改轨迹
+NODE_TRACE_INDEX = 2 * len(EDGE_TYPE_COLORS)
+HIGHLIGHT_TRACE_INDEX = NODE_TRACE_INDEX + 1
+
+
+class NetworkFigureData:
+    """构建 Plotly 网络图所需的预计算数组
+
+    节点坐标、大小、颜色、悬停文本以及每种边类型的线段坐标 (每条边三个点，
+    第三个点为 NaN 断开线段) 都一次性按列计算，构建图形时直接传入数组。
+    悬停文本预先格式化为一维字符串数组：Plotly 会逐元素复制二维 object
+    类型的 customdata，大图上构建图形会慢一个数量级。
+    """
+
+    def __init__(self, graph: nx.DiGraph, pos):
+        """
+        Args:
+            graph (nx.DiGraph): 供应链网络
+            pos (NetworkLayout): 与网络对应的布局
+        """
+        df_nodes = nodes_to_frame(graph)
+        self.node_ids = df_nodes['unique_node_id'].to_numpy()
+        self.node_index: Dict[str, int] = {node: i for i, node in enumerate(self.node_ids)}
+        coords = pos.coords_for(self.node_ids).astype(np.float64).reshape(-1, 2)
+        self.node_x = coords[:, 0]
+        self.node_y = coords[:, 1]
+        self.node_text = df_nodes['canonical_name'].astype(str).to_numpy()
+
+        shared_degree = pd.to_numeric(df_nodes['shared_degree'], errors='coerce').fillna(0).to_numpy()
+        is_shared = df_nodes['is_shared_supplier'].fillna(False).astype(bool).to_numpy()
+        self.node_size = np.where(is_shared, 20 + shared_degree * 5, 10)
+        self.node_color = np.where(is_shared, shared_degree, 0)
+        node_type = np.where(df_nodes['is_listed'].to_numpy() == 1, '上市公司', '供应商/客户')
+        self.node_hovertext = (
+            '<b>' + df_nodes['canonical_name'].astype(str) + '</b><br>' +
+            '共享供应商度: ' + pd.Series(self.node_color, index=df_nodes.index).astype(str) + '<br>' +
+            '节点类型: ' + pd.Series(node_type, index=df_nodes.index) + '<br>' +
+            '行业: ' + df_nodes['industry'].fillna('未知').astype(str) + '<br>' +
+            '地区: ' + df_nodes['area'].fillna('未知').astype(str)
+        ).to_numpy()
+
+        df_edges = edges_to_frame(graph)
+        self.edges: Dict[str, Dict[str, np.ndarray]] = {}
+        for edge_type, _ in EDGE_TYPE_COLORS:
+            df = df_edges[df_edges['relationship_type'] == edge_type]
+            self.edges[edge_type] = self._edge_arrays(df, edge_type)
+        logger.info(f"图形数据预计算完成: {len(self.node_ids)} 个节点, {len(df_edges)} 条边")
+
+    def _edge_arrays(self, df: pd.DataFrame, edge_type: str) -> Dict[str, np.ndarray]:
+        """计算一种边类型的线段坐标和悬停信息"""
+        source = df['source_node_id'].map(self.node_index).to_numpy(dtype=np.int64)
+        target = df['target_node_id'].map(self.node_index).to_numpy(dtype=np.int64)
+        gap = np.full(len(df), np.nan)
+        x = np.column_stack([self.node_x[source], self.node_x[target], gap]).ravel()
+        y = np.column_stack([self.node_y[source], self.node_y[target], gap]).ravel()
+
+        amount = df['procurement_amount'].where(df['procurement_amount'].fillna(0) != 0, df['revenue'])
+        share = df['procurement_share'].where(df['procurement_share'].fillna(0) != 0, df['revenue_share'])
+        date = df['announcement_date'].where(df['announcement_date'].notna(), '未知').astype(str)
+        hovertext = (
+            '<b>' + pd.Series(self.node_text[source], index=df.index) + '</b> → <b>' +
+            pd.Series(self.node_text[target], index=df.index) + '</b><br>' +
+            '关系类型: ' + edge_type + '<br>' +
+            '金额: ' + amount.fillna(0).map('{:,.2f}'.format) + '<br>' +
+            '占比: ' + share.fillna(0).map('{:.2%}'.format) + '<br>' +
+            '公告日期: ' + date
+        )
+        return {
+            'x': x,
+            'y': y,
+            # 悬停信息放在每条边的中点上
+            'mid_x': (self.node_x[source] + self.node_x[target]) / 2,
+            'mid_y': (self.node_y[source] + self.node_y[target]) / 2,
+            'hovertext': hovertext.to_numpy()
+        }
+
+
+def trace_visibility(view_type: str = 'all') -> List[bool]:
+    """按视图类型返回每条轨迹是否可见，顺序与 build_network_figure 的轨迹一致"""
+    visible = []
+    for edge_type, _ in EDGE_TYPE_COLORS:
+        visible += [view_type in ('all', edge_type)] * 2
+    return visible + [True, True]
+
+
+def build_highlight_trace(x: List[float] = (), y: List[float] = (), text: List[str] = ()) -> go.Scattergl:
+    """构建选中节点的高亮轨迹，未选中节点时为空轨迹"""
+    return go.Scattergl(
+        x=list(x),
+        y=list(y),
+        text=list(text),
+        mode='markers+text',
+        textposition='top center',
+        marker=dict(size=28, color='rgba(0, 0, 0, 0)', line=dict(width=3, color='#d62728')),
+        hoverinfo='skip',
+        name='selected',
+        showlegend=False
+    )
+
+
+def build_edge_traces(data: NetworkFigureData, view_type: str = 'all') -> List[go.Scattergl]:
+    """构建边轨迹
+
+    每种边类型对应两条轨迹：线段轨迹和位于边中点、用于悬停的透明点轨迹。
+    轨迹始终全部生成，不属于 view_type 的轨迹设为不可见，保证轨迹下标固定。
+    """
+    traces = []
+    for edge_type, color in EDGE_TYPE_COLORS:
+        visible = view_type in ('all', edge_type)
+        arrays = data.edges[edge_type]
+        traces.append(go.Scattergl(
+            x=arrays['x'],
+            y=arrays['y'],
+            line=dict(width=0.5, color=color),
+            hoverinfo='skip',
+            mode='lines',
+            name=edge_type,
+            legendgroup=edge_type,
+            visible=visible
+        ))
+        traces.append(go.Scattergl(
+            x=arrays['mid_x'],
+            y=arrays['mid_y'],
+            mode='markers',
+            marker=dict(size=4, color=color, opacity=0),
+            hoverinfo='text',
+            hovertext=arrays['hovertext'],
+            name=edge_type,
+            legendgroup=edge_type,
+            showlegend=False,
+            visible=visible
+        ))
+    return traces
+
+
+def build_node_trace(data: NetworkFigureData) -> go.Scattergl:
+    """构建节点轨迹"""
+    return go.Scattergl(
+        x=data.node_x,
+        y=data.node_y,
+        text=data.node_text,
+        customdata=data.node_ids,
+        mode='markers+text' if len(data.node_ids) <= LABEL_NODE_LIMIT else 'markers',
+        hoverinfo='text',
+        name='node',
+        marker=dict(
+            showscale=True,
+            colorscale='YlGnBu',
+            size=data.node_size,
+            color=data.node_color,
+            colorbar=dict(
+                thickness=15,
+                title=dict(text='共享供应商度', side='right'),
+                xanchor='left'
+            ),
+            line=dict(width=2, color='#666')
+        ),
+        hovertext=data.node_hovertext
+    )
+
+
+def build_network_figure(data: NetworkFigureData, view_type: str = 'all') -> go.Figure:
+    """用预计算数组一次性构建 WebGL 网络图
+
+    Args:
+        data (NetworkFigureData): 预计算的图形数据
+        view_type (str): 'all'、'supplier' 或 'customer'
+
+    Returns:
+        go.Figure: 网络图
+    """
+    return go.Figure(
+        data=build_edge_traces(data, view_type) + [build_node_trace(data), build_highlight_trace()],
+        layout=go.Layout(
+            title=dict(
+                text='供应链网络可视化',
+                x=0.5,
+                y=0.95,
+                xanchor='center',
+                yanchor='top'
+            ),
+            showlegend=True,
+            hovermode='closest',
+            margin=dict(b=20, l=5, r=5, t=40),
+            xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+            yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+            plot_bgcolor='white',
+            legend=dict(
+                yanchor="top",
+                y=0.99,
+                xanchor="left",
+                x=0.01
+            ),
+            annotations=[
+                dict(
+                    text="提示：<br>1. 节点大小表示共享供应商度<br>2. 节点颜色深浅表示共享供应商度<br>3. 橙色边表示供应商关系<br>4. 蓝色边表示客户关系",
+                    showarrow=False,
+                    xref="paper",
+                    yref="paper",
+                    x=0.01,
+                    y=0.01,
+                    align="left",
+                    bgcolor="rgba(255, 255, 255, 0.8)",
+                    bordercolor="black",
+                    borderwidth=1
+                )
+            ]
+        )
+    )
+
+
+def build_lod_figure(view, view_type: str = 'all') -> go.Figure:
+    """用细节层级视图构建网络图
+
+    超级节点的大小按成员数取对数，节点的 customdata 为单元ID，点击超级节点
+    可下钻到下一级。
+
+    Args:
+        view (LevelOfDetailView): 细节层级视图
+        view_type (str): 'all'、'supplier' 或 'customer'
+
+    Returns:
+        go.Figure: 网络图
+    """
+    units, edges = view.units, view.edges
+    x = units['x'].to_numpy()
+    y = units['y'].to_numpy()
+    traces = []
+    for edge_type, color in EDGE_TYPE_COLORS:
+        visible = view_type in ('all', edge_type)
+        df = edges[edges['relationship_type'] == edge_type]
+        source = df['source'].to_numpy(dtype=np.int64)
+        target = df['target'].to_numpy(dtype=np.int64)
+        gap = np.full(len(df), np.nan)
+        traces.append(go.Scattergl(
+            x=np.column_stack([x[source], x[target], gap]).ravel(),
+            y=np.column_stack([y[source], y[target], gap]).ravel(),
+            line=dict(width=0.5, color=color),
+            hoverinfo='skip',
+            mode='lines',
+            name=edge_type,
+            legendgroup=edge_type,
+            visible=visible
+        ))
+        hovertext = (
+            '<b>' + units['label'].to_numpy()[source].astype(object) + '</b> → <b>' +
+            units['label'].to_numpy()[target].astype(object) + '</b><br>' +
+            '关系数: ' + df['count'].astype(str).to_numpy().astype(object) + '<br>' +
+            '金额合计: ' + df['amount'].map('{:,.2f}'.format).to_numpy().astype(object)
+        )
+        traces.append(go.Scattergl(
+            x=(x[source] + x[target]) / 2,
+            y=(y[source] + y[target]) / 2,
+            mode='markers',
+            marker=dict(size=4, color=color, opacity=0),
+            hoverinfo='text',
+            hovertext=hovertext,
+            name=edge_type,
+            legendgroup=edge_type,
+            showlegend=False,
+            visible=visible
+        ))
+
+    size = units['size'].to_numpy(dtype=np.float64)
+    is_cluster = units['is_cluster'].to_numpy(dtype=bool)
+    hovertext = np.where(
+        is_cluster,
+        '<b>' + units['label'].astype(str) + '</b><br>' +
+        '公司数: ' + units['size'].astype(str) + '<br>' +
+        '上市公司数: ' + units['listed'].astype(str) + '<br>点击展开',
+        '<b>' + units['label'].astype(str) + '</b>'
+    )
+    traces.append(go.Scattergl(
+        x=x,
+        y=y,
+        text=units['label'].to_numpy(),
+        customdata=units['unit_id'].to_numpy(),
+        mode='markers+text' if len(units) <= LABEL_NODE_LIMIT else 'markers',
+        hoverinfo='text',
+        hovertext=hovertext,
+        name='node',
+        marker=dict(
+            showscale=True,
+            colorscale='YlGnBu',
+            size=10 + 4 * np.log2(size),
+            color=np.log10(size),
+            colorbar=dict(
+                thickness=15,
+                title=dict(text='公司数 (log10)', side='right'),
+                xanchor='left'
+            ),
+            line=dict(width=np.where(is_cluster, 2, 1), color='#666')
+        )
+    ))
+    traces.append(build_highlight_trace())
+
+    return go.Figure(
+        data=traces,
+        layout=go.Layout(
+            title=dict(
+                text=f'供应链网络可视化（{len(units)} 个单元，{view.total_edges} 条关系）',
+                x=0.5,
+                y=0.95,
+                xanchor='center',
+                yanchor='top'
+            ),
+            showlegend=True,
+            hovermode='closest',
+            margin=dict(b=20, l=5, r=5, t=40),
+            xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+            yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+            plot_bgcolor='white',
+            # 同一聚合内保持用户的缩放状态
+            uirevision=view.cluster,
+            legend=dict(
+                yanchor="top",
+                y=0.99,
+                xanchor="left",
+                x=0.01
+            )
+        )
+    )
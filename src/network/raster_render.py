@@ -0,0 +1,268 @@
+import base64
+import logging
+import struct
+import time
+import zlib
+from html import escape
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import networkx as nx
+
+from graph_tables import nodes_to_frame
+
+logger = logging.getLogger(__name__)
+
+# 行业分类色板，排名靠后的行业合并为"其他"
+CATEGORY_PALETTE = [
+    '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+    '#8c564b', '#e377c2', '#bcbd22', '#17becf', '#7f7f7f'
+]
+OTHER_COLOR = '#c7c7c7'
+
+# 共享供应商度的连续色带 (YlGnBu)
+DEGREE_COLORSCALE = ['#ffffd9', '#c7e9b4', '#7fcdbb', '#41b6c4', '#1d91c0', '#225ea8', '#0c2c84']
+
+# 每批光栅化的线段采样点数，限制内存占用；需小于 2^24 以保证 float32 偏移精确
+SAMPLES_PER_CHUNK = 8_000_000
+
+
+def hex_to_rgb(color: str) -> np.ndarray:
+    """'#rrggbb' 转为 [r, g, b]"""
+    color = color.lstrip('#')
+    return np.array([int(color[i:i + 2], 16) for i in (0, 2, 4)], dtype=np.float64)
+
+
+def write_png(image: np.ndarray, path: str):
+    """用 zlib 把 (H, W, 4) 的 RGBA 数组写为 PNG 文件
+
+    Args:
+        image (np.ndarray): uint8 RGBA 图像
+        path (str): 输出路径
+    """
+    height, width, _ = image.shape
+    # 每行前加过滤类型字节 0
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)]).tobytes()
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw, 6)))
+        f.write(chunk(b'IEND', b''))
+
+
+class RasterRenderer:
+    """把整个网络光栅化为固定大小画布的静态渲染器
+
+    与 datashader 的思路相同：边按像素采样累加为密度图，节点按像素累加
+    颜色分量，再对密度取对数映射为透明度后合成。耗时和内存只取决于画布
+    大小和线段总长度，不随节点/边数生成图形对象，适合全量网络的周报配图。
+    """
+
+    def __init__(
+        self,
+        width: int = 2000,
+        height: int = 2000,
+        padding: float = 0.02,
+        node_spread: int = 1,
+        edge_color: str = '#4a5a70',
+        edge_max_alpha: float = 0.6,
+        background: str = '#ffffff'
+    ):
+        """
+        Args:
+            width (int): 画布宽度（像素）
+            height (int): 画布高度（像素）
+            padding (float): 四周留白占画布的比例
+            node_spread (int): 节点向四周扩展的像素半径
+            edge_color (str): 边的颜色
+            edge_max_alpha (float): 最密集处边的不透明度
+            background (str): 背景色
+        """
+        self.width = width
+        self.height = height
+        self.padding = padding
+        self.node_spread = node_spread
+        self.edge_color = edge_color
+        self.edge_max_alpha = edge_max_alpha
+        self.background = background
+
+    def _to_pixels(self, coords: np.ndarray) -> np.ndarray:
+        """布局坐标映射为像素坐标（浮点），y 轴向上"""
+        low = coords.min(axis=0)
+        span = np.ptp(coords, axis=0)
+        span = np.where(span > 0, span, 1.0)
+        unit = (coords - low) / span
+        unit = self.padding + unit * (1 - 2 * self.padding)
+        return np.column_stack([
+            unit[:, 0] * (self.width - 1),
+            (1 - unit[:, 1]) * (self.height - 1)
+        ])
+
+    def _edge_density(self, pixels: np.ndarray, src: np.ndarray, tgt: np.ndarray) -> np.ndarray:
+        """按像素采样线段并累加为密度图
+
+        每条边按其像素长度采样，所有边的采样点分批展开后用 np.bincount 累加。
+        """
+        density = np.zeros(self.width * self.height, dtype=np.float64)
+        if len(src) == 0:
+            return density
+        start = pixels[src].astype(np.float32) + 0.5
+        delta = (pixels[tgt] - pixels[src]).astype(np.float32)
+        samples = np.ceil(np.abs(delta).max(axis=1)).astype(np.int64) + 1
+        step = delta / np.maximum(samples - 1, 1).astype(np.float32)[:, None]
+        bounds = np.searchsorted(np.cumsum(samples), np.arange(0, samples.sum(), SAMPLES_PER_CHUNK), side='right')
+        bounds = np.unique(np.concatenate([[0], bounds, [len(src)]]))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            counts = samples[lo:hi]
+            # 每个采样点在所属线段内的序号，按线段 np.repeat 起点和步长后原地插值
+            offset = np.arange(int(counts.sum()), dtype=np.float32)
+            offset -= np.repeat((np.cumsum(counts) - counts).astype(np.float32), counts)
+            x = np.repeat(start[lo:hi, 0], counts)
+            x += offset * np.repeat(step[lo:hi, 0], counts)
+            y = np.repeat(start[lo:hi, 1], counts)
+            y += offset * np.repeat(step[lo:hi, 1], counts)
+            flat = y.astype(np.int32)
+            flat *= self.width
+            flat += x.astype(np.int32)
+            density += np.bincount(flat, minlength=self.width * self.height)
+        return density
+
+    def _spread(self, values: np.ndarray) -> np.ndarray:
+        """把每个像素的值扩展到 node_spread 半径内"""
+        if self.node_spread <= 0:
+            return values
+        r = self.node_spread
+        grid = values.reshape(self.height, self.width)
+        padded = np.pad(grid, r)
+        result = np.zeros_like(grid)
+        for dy in range(-r, r + 1):
+            for dx in range(-r, r + 1):
+                if dx * dx + dy * dy > r * r:
+                    continue
+                shifted = padded[r + dy:r + dy + self.height, r + dx:r + dx + self.width]
+                result = result + shifted
+        return result.ravel()
+
+    def node_colors(self, graph: nx.DiGraph, color_by: str) -> Tuple[np.ndarray, np.ndarray, List[Tuple[str, str]]]:
+        """计算节点颜色
+
+        Args:
+            graph (nx.DiGraph): 供应链网络
+            color_by (str): 'industry' 按行业着色，'shared_degree' 按共享供应商度着色
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, List[Tuple[str, str]]]:
+                节点ID、(N, 3) RGB 颜色、图例 [(名称, 颜色)]
+        """
+        df_nodes = nodes_to_frame(graph)
+        node_ids = df_nodes['unique_node_id'].to_numpy()
+        if color_by == 'industry':
+            industry = df_nodes['industry'].fillna('未知').astype(str)
+            top = industry.value_counts().index[:len(CATEGORY_PALETTE)].tolist()
+            palette = {name: CATEGORY_PALETTE[i] for i, name in enumerate(top)}
+            colors = np.array([hex_to_rgb(palette.get(name, OTHER_COLOR)) for name in top + ['其他']])
+            codes = industry.map({name: i for i, name in enumerate(top)}).fillna(len(top)).to_numpy(dtype=np.int64)
+            legend = list(palette.items()) + ([('其他', OTHER_COLOR)] if (codes == len(top)).any() else [])
+            return node_ids, colors[codes], legend
+        if color_by == 'shared_degree':
+            degree = df_nodes['shared_degree'].astype('float64').fillna(0).to_numpy()
+            scale = np.log1p(degree) / max(np.log1p(degree.max()), 1e-9)
+            stops = np.array([hex_to_rgb(c) for c in DEGREE_COLORSCALE])
+            position = scale * (len(stops) - 1)
+            low = np.floor(position).astype(np.int64).clip(0, len(stops) - 2)
+            frac = (position - low)[:, None]
+            colors = stops[low] * (1 - frac) + stops[low + 1] * frac
+            max_degree = int(degree.max()) if len(degree) else 0
+            legend = [('共享供应商度 0', DEGREE_COLORSCALE[0]), (f'共享供应商度 {max_degree}', DEGREE_COLORSCALE[-1])]
+            return node_ids, colors, legend
+        raise ValueError(f"不支持的着色方式: {color_by}")
+
+    def render(self, graph: nx.DiGraph, layout, color_by: str = 'industry') -> Tuple[np.ndarray, List[Tuple[str, str]]]:
+        """光栅化整个网络
+
+        Args:
+            graph (nx.DiGraph): 供应链网络
+            layout (NetworkLayout): 网络布局
+            color_by (str): 'industry' 或 'shared_degree'
+
+        Returns:
+            Tuple[np.ndarray, List[Tuple[str, str]]]: (H, W, 4) 的 uint8 RGBA 图像和图例
+        """
+        start_time = time.perf_counter()
+        node_ids, colors, legend = self.node_colors(graph, color_by)
+        node_index = {node: i for i, node in enumerate(node_ids)}
+        pixels = self._to_pixels(layout.coords_for(node_ids).astype(np.float64).reshape(-1, 2))
+        edges = np.array(
+            [(node_index[u], node_index[v]) for u, v in graph.edges()], dtype=np.int64
+        ).reshape(-1, 2)
+
+        # 1. 边密度 -> 透明度
+        density = self._edge_density(pixels, edges[:, 0], edges[:, 1])
+        edge_alpha = self.edge_max_alpha * np.log1p(density) / max(np.log1p(density.max()), 1e-9)
+
+        # 2. 节点: 按像素累加颜色分量，取平均色；密度 -> 透明度
+        flat = np.rint(pixels[:, 1]).astype(np.int64) * self.width + np.rint(pixels[:, 0]).astype(np.int64)
+        size = self.width * self.height
+        count = self._spread(np.bincount(flat, minlength=size).astype(np.float64))
+        channel_sums = [
+            self._spread(np.bincount(flat, weights=colors[:, c], minlength=size)) for c in range(3)
+        ]
+        has_node = count > 0
+        node_rgb = np.column_stack([s / np.maximum(count, 1) for s in channel_sums])
+        node_alpha = np.where(has_node, 0.4 + 0.6 * np.log1p(count) / max(np.log1p(count.max()), 1e-9), 0)
+
+        # 3. 合成: 背景 <- 边 <- 节点
+        rgb = np.broadcast_to(hex_to_rgb(self.background), (size, 3)).copy()
+        rgb += (hex_to_rgb(self.edge_color) - rgb) * edge_alpha[:, None]
+        rgb += (node_rgb - rgb) * node_alpha[:, None]
+        image = np.empty((size, 4), dtype=np.uint8)
+        image[:, :3] = np.clip(np.rint(rgb), 0, 255)
+        image[:, 3] = 255
+
+        logger.info(
+            f"网络光栅化完成: {len(node_ids)} 个节点, {len(edges)} 条边, "
+            f"{self.width}x{self.height} 像素, 耗时 {time.perf_counter() - start_time:.1f} 秒"
+        )
+        return image.reshape(self.height, self.width, 4), legend
+
+    def save(self, image: np.ndarray, legend: List[Tuple[str, str]], output_path: str, title: Optional[str] = None):
+        """按扩展名保存为 PNG 或 SVG
+
+        SVG 以内嵌 PNG 作为底图，标题和图例为矢量文本。
+
+        Args:
+            image (np.ndarray): render 返回的图像
+            legend (List[Tuple[str, str]]): 图例
+            output_path (str): 输出路径，.png 或 .svg
+            title (str, optional): SVG 标题
+        """
+        path = Path(output_path)
+        if path.suffix.lower() == '.png':
+            write_png(image, str(path))
+        elif path.suffix.lower() == '.svg':
+            tmp_path = path.with_suffix('.tmp.png')
+            write_png(image, str(tmp_path))
+            encoded = base64.b64encode(tmp_path.read_bytes()).decode('ascii')
+            tmp_path.unlink()
+            items = ''.join(
+                f'<rect x="20" y="{60 + 24 * i}" width="16" height="16" fill="{color}"/>'
+                f'<text x="44" y="{73 + 24 * i}" font-size="14">{escape(name)}</text>'
+                for i, (name, color) in enumerate(legend)
+            )
+            path.write_text(
+                f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" '
+                f'viewBox="0 0 {self.width} {self.height}">'
+                f'<image width="{self.width}" height="{self.height}" href="data:image/png;base64,{encoded}"/>'
+                f'<text x="20" y="36" font-size="22" font-weight="bold">{escape(title or "供应链网络")}</text>'
+                f'<g font-family="sans-serif">{items}</g></svg>',
+                encoding='utf-8'
+            )
+        else:
+            raise ValueError(f"不支持的输出格式: {path.suffix}")
+        logger.info(f"静态网络图已保存到: {path}")
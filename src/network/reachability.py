@@ -0,0 +1,231 @@
+import logging
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import networkx as nx
+
+logger = logging.getLogger(__name__)
+
+# 每个字节中置位数量的查找表
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.int32)
+
+
+class ReachabilityIndex:
+    """供应链网络的可达性索引
+
+    先将网络按强连通分量缩合为DAG，再在DAG上按逆拓扑序计算每个分量
+    能够到达的上市公司集合，以压缩位图 (np.packbits 格式) 保存。
+    "哪些上市公司依赖供应商X" 和 "依赖数量" 均为一次位图查询；
+    任意两点的可达性用拓扑序剪枝后在缩合图上搜索。
+    """
+
+    def __init__(
+        self,
+        version: str,
+        node_ids: np.ndarray,
+        scc: np.ndarray,
+        topo_rank: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        listed_ids: np.ndarray,
+        listed_pos: np.ndarray,
+        bits: np.ndarray,
+        dependent_counts: np.ndarray
+    ):
+        self.version = version
+        self.node_ids = node_ids
+        self.scc = scc
+        self.topo_rank = topo_rank
+        self.indptr = indptr
+        self.indices = indices
+        self.listed_ids = listed_ids
+        self.listed_pos = listed_pos
+        self.bits = bits
+        self.dependent_counts = dependent_counts
+        self.node_index: Dict[str, int] = {node: i for i, node in enumerate(node_ids.tolist())}
+
+    @classmethod
+    def build(cls, graph: nx.DiGraph, version: str = '') -> 'ReachabilityIndex':
+        """从网络构建可达性索引
+
+        Args:
+            graph (nx.DiGraph): 供应链网络，边方向为 上游 -> 下游
+            version (str): 网络版本号
+
+        Returns:
+            ReachabilityIndex: 构建好的索引
+        """
+        node_ids = list(graph.nodes())
+        node_index = {node: i for i, node in enumerate(node_ids)}
+
+        # 1. 强连通分量缩合，分量编号按拓扑序排列
+        condensed = nx.condensation(graph)
+        order = list(nx.topological_sort(condensed))
+        topo_rank = np.empty(len(order), dtype=np.int32)
+        topo_rank[order] = np.arange(len(order), dtype=np.int32)
+        scc = np.empty(len(node_ids), dtype=np.int32)
+        for component, members in condensed.nodes(data='members'):
+            scc[[node_index[node] for node in members]] = component
+
+        # 2. 缩合图的邻接表 (CSR)
+        successors = [sorted(condensed.successors(c)) for c in range(len(order))]
+        indptr = np.zeros(len(order) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(s) for s in successors])
+        indices = np.fromiter(
+            (c for s in successors for c in s), dtype=np.int32, count=int(indptr[-1])
+        )
+
+        # 3. 上市公司位图
+        listed_ids = [
+            node for node in node_ids if graph.nodes[node].get('is_listed', 0) == 1
+        ]
+        listed_pos = np.full(len(node_ids), -1, dtype=np.int32)
+        listed_pos[[node_index[node] for node in listed_ids]] = np.arange(len(listed_ids))
+        n_bytes = (len(listed_ids) + 7) // 8
+        bits = np.zeros((len(order), n_bytes), dtype=np.uint8)
+        for pos, node in enumerate(listed_ids):
+            bits[scc[node_index[node]], pos // 8] |= np.uint8(1 << (7 - pos % 8))
+
+        # 4. 按逆拓扑序合并后继分量的位图
+        for component in reversed(order):
+            children = indices[indptr[component]:indptr[component + 1]]
+            if len(children):
+                bits[component] |= np.bitwise_or.reduce(bits[children], axis=0)
+
+        # 5. 预计算每个节点的下游上市公司数量（不含自身）
+        scc_counts = np.zeros(len(order), dtype=np.int32)
+        for start in range(0, len(order), 4096):
+            scc_counts[start:start + 4096] = POPCOUNT_TABLE[bits[start:start + 4096]].sum(axis=1)
+        dependent_counts = scc_counts[scc] - (listed_pos >= 0)
+
+        logger.info(
+            f"可达性索引构建完成: {len(node_ids)} 个节点, {len(order)} 个强连通分量, "
+            f"{len(listed_ids)} 家上市公司, 位图 {bits.nbytes / 1e6:.1f} MB"
+        )
+        return cls(
+            version=version,
+            node_ids=np.array(node_ids, dtype=str),
+            scc=scc,
+            topo_rank=topo_rank,
+            indptr=indptr,
+            indices=indices,
+            listed_ids=np.array(listed_ids, dtype=str),
+            listed_pos=listed_pos,
+            bits=bits,
+            dependent_counts=dependent_counts.astype(np.int32)
+        )
+
+    def save(self, path: str):
+        """保存索引到 .npz 文件"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            version=np.array(self.version),
+            node_ids=self.node_ids,
+            scc=self.scc,
+            topo_rank=self.topo_rank,
+            indptr=self.indptr,
+            indices=self.indices,
+            listed_ids=self.listed_ids,
+            listed_pos=self.listed_pos,
+            bits=self.bits,
+            dependent_counts=self.dependent_counts
+        )
+        logger.info(f"可达性索引已保存到: {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'ReachabilityIndex':
+        """从 .npz 文件加载索引"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                version=str(data['version']),
+                node_ids=data['node_ids'],
+                scc=data['scc'],
+                topo_rank=data['topo_rank'],
+                indptr=data['indptr'],
+                indices=data['indices'],
+                listed_ids=data['listed_ids'],
+                listed_pos=data['listed_pos'],
+                bits=data['bits'],
+                dependent_counts=data['dependent_counts']
+            )
+
+    @classmethod
+    def load_or_build(cls, network) -> 'ReachabilityIndex':
+        """加载当前网络版本的索引，不存在时构建并保存
+
+        Args:
+            network (SupplyChainNetwork): 已加载的供应链网络
+
+        Returns:
+            ReachabilityIndex: 与网络版本一致的索引
+        """
+        path = network.artifact_path('reachability', '.npz')
+        if path.exists():
+            index = cls.load(str(path))
+            logger.info(f"从 {path} 加载可达性索引成功")
+            return index
+        index = cls.build(network.graph, network.graph_version)
+        index.save(str(path))
+        network.prune_artifacts('reachability', '.npz')
+        return index
+
+    def _listed_bit(self, component: int, pos: int) -> bool:
+        """检查分量位图中的某一位"""
+        return bool(self.bits[component, pos // 8] & (1 << (7 - pos % 8)))
+
+    def count_dependents(self, node: str) -> int:
+        """下游（直接或间接）依赖该节点的上市公司数量"""
+        i = self.node_index.get(node)
+        return int(self.dependent_counts[i]) if i is not None else 0
+
+    def dependents(self, node: str) -> List[str]:
+        """下游（直接或间接）依赖该节点的上市公司列表"""
+        i = self.node_index.get(node)
+        if i is None:
+            return []
+        positions = np.flatnonzero(np.unpackbits(self.bits[self.scc[i]])[:len(self.listed_ids)])
+        return [
+            company for company in self.listed_ids[positions].tolist() if company != node
+        ]
+
+    def reachable(self, source: str, target: str) -> bool:
+        """判断 target 是否（直接或间接）依赖 source
+
+        Args:
+            source (str): 上游节点ID
+            target (str): 下游节点ID
+
+        Returns:
+            bool: 是否存在从 source 到 target 的路径
+        """
+        i = self.node_index.get(source)
+        j = self.node_index.get(target)
+        if i is None or j is None:
+            return False
+        cs, ct = self.scc[i], self.scc[j]
+        if cs == ct:
+            return True
+        rank_target = self.topo_rank[ct]
+        if self.topo_rank[cs] > rank_target:
+            return False
+        if self.listed_pos[j] >= 0:
+            return self._listed_bit(cs, self.listed_pos[j])
+
+        # 非上市公司目标：在缩合图上做拓扑序剪枝的深度优先搜索
+        stack = [cs]
+        visited = {cs}
+        while stack:
+            component = stack.pop()
+            for child in self.indices[self.indptr[component]:self.indptr[component + 1]]:
+                if child == ct:
+                    return True
+                if child not in visited and self.topo_rank[child] < rank_target:
+                    visited.add(child)
+                    stack.append(child)
+        return False
+
+    def depends_on(self, company: str, supplier: str) -> bool:
+        """判断公司是否（直接或间接）依赖某供应商"""
+        return self.reachable(supplier, company)
@@ -0,0 +1,258 @@
+import logging
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+from scipy import sparse
+
+from graph_tables import edges_to_frame, nodes_to_frame
+
+logger = logging.getLogger(__name__)
+
+
+class SupplyShockSimulator:
+    """供应冲击传播模拟器
+
+    基于供应商边上的 procurement_share 构建行归一化的依赖矩阵 W，其中
+    W[i, j] 表示节点 i 对上游节点 j 的采购依赖占比。冲击向量 s 沿着
+    W 逐级向下游传播：第 t 级暴露为 W^t s。
+
+    客户边上的 revenue_share (Custincrt) 是上市公司对客户的收入依赖，
+    方向与采购依赖相反，不计入 W。
+    """
+
+    def __init__(self, graph: nx.DiGraph, max_tiers: int = 3, normalize: str = 'cap'):
+        """
+        Args:
+            graph (nx.DiGraph): 供应链网络，边方向为 上游 -> 下游
+            max_tiers (int): 冲击向下游传播的最大层数
+            normalize (str): 行归一化方式，'cap' 仅将占比之和超过1的行缩放到1，
+                'full' 将每一行都缩放到和为1
+        """
+        if normalize not in ('cap', 'full'):
+            raise ValueError(f"不支持的归一化方式: {normalize}")
+        self.graph = graph
+        self.max_tiers = max_tiers
+        self.normalize = normalize
+
+        self.df_nodes = nodes_to_frame(graph)
+        self.node_ids = self.df_nodes['unique_node_id'].to_numpy()
+        self.node_index: Dict[str, int] = {node: i for i, node in enumerate(self.node_ids)}
+        self.df_edges = edges_to_frame(graph)
+        self.dependency_matrix = self._build_dependency_matrix()
+        self.estimated_procurement = self._estimate_total_procurement()
+
+    def _build_dependency_matrix(self) -> sparse.csr_matrix:
+        """构建行归一化的依赖矩阵"""
+        n = len(self.node_ids)
+        # 只用供应商边: 下游上市公司对供应商的采购占比
+        df = self.df_edges[self.df_edges['relationship_type'] == 'supplier']
+        share = df['procurement_share']
+        missing = int(share.isna().sum())
+        if missing:
+            logger.info(f"依赖矩阵中有 {missing} 条边缺少占比，按0处理")
+        share = share.fillna(0).clip(lower=0).to_numpy(dtype=np.float64)
+
+        rows = df['target_node_id'].map(self.node_index).to_numpy()
+        cols = df['source_node_id'].map(self.node_index).to_numpy()
+        matrix = sparse.csr_matrix((share, (rows, cols)), shape=(n, n))
+        matrix.eliminate_zeros()
+
+        row_sums = np.asarray(matrix.sum(axis=1)).ravel()
+        if self.normalize == 'full':
+            scale = np.divide(1.0, row_sums, out=np.zeros(n), where=row_sums > 0)
+        else:
+            scale = np.divide(1.0, row_sums, out=np.ones(n), where=row_sums > 1)
+        matrix = sparse.diags(scale) @ matrix
+
+        logger.info(f"依赖矩阵构建完成: {n} 个节点, {matrix.nnz} 个非零元素")
+        return matrix.tocsr()
+
+    def _estimate_total_procurement(self) -> np.ndarray:
+        """根据 采购金额 / 采购占比 估算每个节点的总采购额"""
+        df = self.df_edges
+        valid = (
+            (df['relationship_type'] == 'supplier') &
+            (df['procurement_share'] > 0) &
+            df['procurement_amount'].notna()
+        )
+        estimate = (
+            (df.loc[valid, 'procurement_amount'] / df.loc[valid, 'procurement_share'])
+            .groupby(df.loc[valid, 'target_node_id'])
+            .median()
+        )
+        return (
+            pd.Series(self.node_ids)
+            .map(estimate)
+            .fillna(0)
+            .to_numpy(dtype=np.float64)
+        )
+
+    def shock_vector(
+        self,
+        node_ids: Optional[Iterable[str]] = None,
+        area: Optional[str] = None,
+        industry: Optional[str] = None,
+        severity: float = 1.0
+    ) -> np.ndarray:
+        """构建冲击向量
+
+        Args:
+            node_ids (Iterable[str], optional): 失效的节点ID
+            area (str, optional): 失效的地区，该地区所有节点都受冲击
+            industry (str, optional): 失效的行业，该行业所有节点都受冲击
+            severity (float): 冲击强度，1 表示完全失效
+
+        Returns:
+            np.ndarray: 长度为节点数的冲击向量
+        """
+        mask = np.zeros(len(self.node_ids), dtype=bool)
+        if node_ids is not None:
+            indices = [self.node_index[node] for node in node_ids if node in self.node_index]
+            mask[indices] = True
+        if area is not None:
+            mask |= (self.df_nodes['area'] == area).to_numpy(dtype=bool)
+        if industry is not None:
+            mask |= (self.df_nodes['industry'] == industry).to_numpy(dtype=bool)
+        return mask.astype(np.float64) * severity
+
+    def propagate(self, shock: np.ndarray) -> np.ndarray:
+        """将冲击沿依赖矩阵逐级传播
+
+        Args:
+            shock (np.ndarray): 冲击向量 (n,) 或冲击矩阵 (n, k)
+
+        Returns:
+            np.ndarray: 各级暴露，形状为 (max_tiers, n) 或 (max_tiers, n, k)
+        """
+        tiers = []
+        exposure = shock
+        for _ in range(self.max_tiers):
+            exposure = self.dependency_matrix @ exposure
+            tiers.append(exposure)
+        return np.stack(tiers)
+
+    def simulate(
+        self,
+        node_ids: Optional[Iterable[str]] = None,
+        area: Optional[str] = None,
+        industry: Optional[str] = None,
+        severity: float = 1.0,
+        listed_only: bool = True
+    ) -> pd.DataFrame:
+        """模拟单个冲击情景并返回每个公司的暴露表
+
+        Args:
+            node_ids (Iterable[str], optional): 失效的节点ID
+            area (str, optional): 失效的地区
+            industry (str, optional): 失效的行业
+            severity (float): 冲击强度
+            listed_only (bool): 是否只返回上市公司
+
+        Returns:
+            pd.DataFrame: 每个公司一行，包含各级暴露、总暴露占比及暴露采购额
+        """
+        shock = self.shock_vector(node_ids, area, industry, severity)
+        if not shock.any():
+            logger.warning("冲击向量为空，没有匹配的失效节点")
+        tiers = self.propagate(shock)
+
+        result = self._base_table()
+        for level, exposure in enumerate(tiers, start=1):
+            result[f'tier_{level}_exposure'] = exposure
+        result['shocked'] = shock > 0
+        result['total_exposure'] = np.clip(tiers.sum(axis=0), 0, 1)
+        result['exposed_procurement'] = result['total_exposure'] * self.estimated_procurement
+        return self._finalize(result, listed_only, 'total_exposure')
+
+    def monte_carlo(
+        self,
+        n_scenarios: int = 1000,
+        failure_prob: float = 0.01,
+        candidates: Optional[Iterable[str]] = None,
+        batch_size: int = 1000,
+        exposure_threshold: float = 0.1,
+        seed: Optional[int] = None,
+        listed_only: bool = True
+    ) -> pd.DataFrame:
+        """批量蒙特卡洛模拟随机供应商失效
+
+        每一批情景构成一个稀疏冲击矩阵 S (n x batch)，通过一次稀疏矩阵乘法
+        W @ S 完成整批传播。失效节点采用有放回抽样，重复抽中按一次失效计。
+
+        Args:
+            n_scenarios (int): 情景总数，至少为1
+            failure_prob (float): 每个候选节点在单个情景中的失效概率
+            candidates (Iterable[str], optional): 候选失效节点，默认所有有下游的节点
+            batch_size (int): 每批情景数
+            exposure_threshold (float): 统计暴露超过该阈值的概率
+            seed (int, optional): 随机种子
+            listed_only (bool): 是否只返回上市公司
+
+        Returns:
+            pd.DataFrame: 每个公司一行，包含平均暴露、最大暴露、超阈值概率及平均暴露采购额
+        """
+        if n_scenarios < 1:
+            raise ValueError(f"情景总数至少为1: {n_scenarios}")
+        rng = np.random.default_rng(seed)
+        n = len(self.node_ids)
+        if candidates is None:
+            candidate_idx = np.flatnonzero(np.asarray(self.dependency_matrix.sum(axis=0)).ravel() > 0)
+        else:
+            candidate_idx = np.array(
+                [self.node_index[node] for node in candidates if node in self.node_index],
+                dtype=np.int64
+            )
+        if len(candidate_idx) == 0:
+            raise ValueError("没有可用的候选失效节点")
+
+        exposure_sum = np.zeros(n)
+        exposure_max = np.zeros(n)
+        exceed_count = np.zeros(n)
+        done = 0
+        while done < n_scenarios:
+            size = min(batch_size, n_scenarios - done)
+            counts = rng.binomial(len(candidate_idx), failure_prob, size=size)
+            rows = candidate_idx[rng.integers(0, len(candidate_idx), size=counts.sum())]
+            cols = np.repeat(np.arange(size), counts)
+            shocks = sparse.csr_matrix(
+                (np.ones(len(rows)), (rows, cols)), shape=(n, size)
+            )
+            shocks.data = np.minimum(shocks.data, 1.0)
+
+            total = sparse.csr_matrix((n, size))
+            exposure = shocks
+            for _ in range(self.max_tiers):
+                exposure = self.dependency_matrix @ exposure
+                total = total + exposure
+            total.data = np.minimum(total.data, 1.0)
+
+            exposure_sum += np.asarray(total.sum(axis=1)).ravel()
+            exposure_max = np.maximum(exposure_max, total.max(axis=1).toarray().ravel())
+            exceed_count += np.asarray((total > exposure_threshold).sum(axis=1)).ravel()
+            done += size
+            logger.info(f"蒙特卡洛模拟进度: {done}/{n_scenarios}")
+
+        result = self._base_table()
+        result['mean_exposure'] = exposure_sum / n_scenarios
+        result['max_exposure'] = exposure_max
+        result['exceed_prob'] = exceed_count / n_scenarios
+        result['mean_exposed_procurement'] = result['mean_exposure'] * self.estimated_procurement
+        return self._finalize(result, listed_only, 'mean_exposure')
+
+    def _base_table(self) -> pd.DataFrame:
+        """结果表的公共列"""
+        return pd.DataFrame({
+            'unique_node_id': self.node_ids,
+            'canonical_name': self.df_nodes['canonical_name'].to_numpy(),
+            'is_listed': self.df_nodes['is_listed'].to_numpy(),
+            'estimated_procurement': self.estimated_procurement
+        })
+
+    @staticmethod
+    def _finalize(result: pd.DataFrame, listed_only: bool, sort_column: str) -> pd.DataFrame:
+        """筛选并排序结果表"""
+        if listed_only:
+            result = result[result['is_listed'] == 1]
+        return result.sort_values(sort_column, ascending=False).reset_index(drop=True)
@@ -0,0 +1,183 @@
+import logging
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+from scipy import sparse
+
+from graph_tables import edges_to_frame
+
+logger = logging.getLogger(__name__)
+
+# 相似度结果表的列及类型
+SIMILARITY_DTYPES = {
+    'company_id': 'object', 'peer_id': 'object', 'rank': 'int32',
+    'shared_suppliers': 'int32', 'jaccard': 'float64', 'cosine': 'float64'
+}
+SIMILARITY_COLUMNS = list(SIMILARITY_DTYPES)
+
+
+class SupplierSimilarityIndex:
+    """公司间供应商重叠相似度索引
+
+    以 采购金额 为权重构建稀疏的 公司 x 供应商 关联矩阵 A，按行分块计算
+    A_blk @ A.T，得到共享供应商数、Jaccard 和余弦相似度，每个公司只保留
+    最相似的 top_k 个同行，不会生成稠密的 N x N 矩阵。
+    """
+
+    def __init__(self, df_similarity: pd.DataFrame, version: str = ''):
+        self.df_similarity = df_similarity
+        self.version = version
+        self._groups: Dict[str, pd.DataFrame] = None
+
+    @staticmethod
+    def incidence_matrix(graph: nx.DiGraph):
+        """构建 公司 x 供应商 关联矩阵
+
+        Args:
+            graph (nx.DiGraph): 供应链网络
+
+        Returns:
+            tuple: (采购金额加权的稀疏矩阵, 公司ID数组, 供应商ID数组)
+        """
+        df = edges_to_frame(graph)
+        df = df[df['relationship_type'] == 'supplier']
+        companies, company_codes = np.unique(df['target_node_id'].to_numpy(dtype=str), return_inverse=True)
+        suppliers, supplier_codes = np.unique(df['source_node_id'].to_numpy(dtype=str), return_inverse=True)
+
+        # 缺失的采购金额用该公司的采购金额中位数补齐，保证每条关系权重为正
+        amount = df['procurement_amount'].where(df['procurement_amount'] > 0)
+        amount = amount.fillna(amount.groupby(df['target_node_id']).transform('median')).fillna(1.0)
+
+        matrix = sparse.csr_matrix(
+            (amount.to_numpy(dtype=np.float64), (company_codes, supplier_codes)),
+            shape=(len(companies), len(suppliers))
+        )
+        return matrix, companies, suppliers
+
+    @classmethod
+    def build(
+        cls,
+        graph: nx.DiGraph,
+        top_k: int = 20,
+        block_size: int = 2048,
+        rank_by: str = 'jaccard',
+        version: str = ''
+    ) -> 'SupplierSimilarityIndex':
+        """分块计算相似度并保留每个公司的 top_k 同行
+
+        Args:
+            graph (nx.DiGraph): 供应链网络
+            top_k (int): 每个公司保留的同行数量
+            block_size (int): 每块计算的公司行数
+            rank_by (str): 排序依据，'jaccard' 或 'cosine'
+            version (str): 网络版本号
+
+        Returns:
+            SupplierSimilarityIndex: 构建好的索引
+        """
+        if rank_by not in ('jaccard', 'cosine'):
+            raise ValueError(f"不支持的排序依据: {rank_by}")
+        weighted, companies, _ = cls.incidence_matrix(graph)
+        binary = weighted.copy()
+        binary.data = np.ones_like(binary.data)
+        degree = np.asarray(binary.sum(axis=1)).ravel()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        normalized = sparse.diags(1.0 / np.where(norms > 0, norms, 1.0)) @ weighted
+
+        binary_t = binary.T.tocsr()
+        normalized_t = normalized.T.tocsr()
+        frames = []
+        for start in range(0, len(companies), block_size):
+            stop = min(start + block_size, len(companies))
+            # 权重均为正，两个乘积的稀疏结构一致
+            shared = (binary[start:stop] @ binary_t).tocoo()
+            cosine = (normalized[start:stop] @ normalized_t).tocoo()
+            order_shared = np.lexsort((shared.col, shared.row))
+            order_cosine = np.lexsort((cosine.col, cosine.row))
+            rows = shared.row[order_shared] + start
+            cols = shared.col[order_shared]
+            inter = shared.data[order_shared]
+            cos = cosine.data[order_cosine]
+
+            not_self = rows != cols
+            rows, cols, inter, cos = rows[not_self], cols[not_self], inter[not_self], cos[not_self]
+            jaccard = inter / (degree[rows] + degree[cols] - inter)
+
+            score = jaccard if rank_by == 'jaccard' else cos
+            order = np.lexsort((-inter, -score, rows))
+            rows, cols, inter, jaccard, cos = (
+                rows[order], cols[order], inter[order], jaccard[order], cos[order]
+            )
+            # 行内名次 = 位置 - 该行第一个元素的位置
+            first = np.searchsorted(rows, rows, side='left')
+            rank = np.arange(len(rows)) - first
+            keep = rank < top_k
+
+            frames.append(pd.DataFrame({
+                'company_id': companies[rows[keep]],
+                'peer_id': companies[cols[keep]],
+                'rank': rank[keep].astype(np.int32) + 1,
+                'shared_suppliers': inter[keep].astype(np.int32),
+                'jaccard': jaccard[keep],
+                'cosine': np.clip(cos[keep], 0, 1)
+            }))
+            logger.info(f"供应商相似度计算进度: {stop}/{len(companies)}")
+
+        df_similarity = (
+            pd.concat(frames, ignore_index=True) if frames
+            else pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in SIMILARITY_DTYPES.items()})
+        )
+        logger.info(f"供应商相似度计算完成: {len(companies)} 家公司, {len(df_similarity)} 条同行记录")
+        return cls(df_similarity, version)
+
+    def save(self, path: str):
+        """保存相似度表到 Parquet 文件"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.df_similarity.to_parquet(path, index=False)
+        logger.info(f"供应商相似度已保存到: {path}")
+
+    @classmethod
+    def load(cls, path: str, version: str = '') -> 'SupplierSimilarityIndex':
+        """从 Parquet 文件加载相似度表"""
+        return cls(pd.read_parquet(path), version)
+
+    @classmethod
+    def load_or_build(cls, network, top_k: int = 20) -> 'SupplierSimilarityIndex':
+        """加载当前网络版本的相似度表，不存在时计算并保存
+
+        Args:
+            network (SupplyChainNetwork): 已加载的供应链网络
+            top_k (int): 每个公司保留的同行数量
+
+        Returns:
+            SupplierSimilarityIndex: 与网络版本一致的相似度索引
+        """
+        name = f'supplier_similarity_top{top_k}'
+        path = network.artifact_path(name, '.parquet')
+        if path.exists():
+            logger.info(f"从 {path} 加载供应商相似度成功")
+            return cls.load(str(path), network.graph_version)
+        index = cls.build(network.graph, top_k=top_k, version=network.graph_version)
+        index.save(str(path))
+        network.prune_artifacts(name, '.parquet')
+        return index
+
+    def peers(self, company_id: str, k: int = None) -> pd.DataFrame:
+        """查询与某公司供应商重叠最多的同行
+
+        Args:
+            company_id (str): 公司节点ID
+            k (int, optional): 返回数量，默认返回全部已保存的同行
+
+        Returns:
+            pd.DataFrame: 按名次排序的同行表
+        """
+        if self._groups is None:
+            self._groups = dict(tuple(self.df_similarity.groupby('company_id', sort=False)))
+        df = self._groups.get(company_id)
+        if df is None:
+            return self.df_similarity.iloc[0:0]
+        return df.head(k) if k else df
@@ -7,10 +7,21 @@ import logging
 from thefuzz import fuzz
 import re
 from typing import Dict, List, Set, Tuple, Optional
-import plotly.graph_objects as go
 from datetime import datetime
 import json
 import pickle
+import hashlib
+import os
+import duckdb
+
+from graph_tables import NODE_COLUMNS, edges_to_frame, nodes_to_frame
+from concentration import compute_concentration_metrics
+from temporal_metrics import METRIC_DTYPES, TemporalNetworkMetrics, disclosure_edges
+from supplier_similarity import SupplierSimilarityIndex
+from layout_cache import load_or_compute_layout
+from network_figure import NetworkFigureData, build_network_figure, trace_visibility
+from raster_render import RasterRenderer
+from graph_export import ExportStats, export_graph
 
 # 设置日志
 logging.basicConfig(
@@ -95,13 +106,109 @@ class SupplyChainNetwork:
         self.resolver = CompanyEntityResolver()
         self.graph = nx.DiGraph()
         self.df_nodes = None
+        self.df_concentration = None
         self.graph_path = graph_path
+        # 上次导出后新增的披露，导出时增量追加到时间序列指标
+        self.history_delta = None
+    
+    @property
+    def graph_version(self) -> str:
+        """网络版本号
+        
+        版本号由网络的节点和边内容计算得到，随网络一起保存。网络内容变化时
+        需调用 invalidate_version 使其重新计算。派生的索引、布局等缓存文件
+        均以版本号区分。
+        """
+        if 'version' not in self.graph.graph:
+            self.graph.graph['version'] = self._compute_graph_version()
+        return self.graph.graph['version']
+    
+    @property
+    def edge_history(self) -> Optional[pd.DataFrame]:
+        """披露级的边历史，列见 graph_tables.EDGE_COLUMNS
+        
+        网络中每对节点只保留最后一次披露的边，完整的披露历史随网络一起保存，
+        加载网络后也能计算时间序列指标。旧版本保存的网络没有该历史，返回 None。
+        """
+        return self.graph.graph.get('edge_history')
+    
+    @edge_history.setter
+    def edge_history(self, df_history: pd.DataFrame):
+        self.graph.graph['edge_history'] = df_history
+    
+    def invalidate_version(self):
+        """网络内容变化后清除版本号"""
+        self.graph.graph.pop('version', None)
+    
+    def _compute_graph_version(self) -> str:
+        """根据节点及其属性和边及其属性计算网络内容指纹"""
+        hasher = hashlib.sha1()
+        for node, data in sorted(self.graph.nodes(data=True), key=lambda n: n[0]):
+            hasher.update(f"{node}:{sorted(data.items())}\n".encode('utf-8'))
+        for source, target, data in sorted(self.graph.edges(data=True), key=lambda e: (e[0], e[1])):
+            hasher.update(f"{source}>{target}:{sorted(data.items())}\n".encode('utf-8'))
+        return hasher.hexdigest()
+    
+    def artifact_path(self, name: str, suffix: str) -> Path:
+        """获取与当前网络版本绑定的派生文件路径，与网络文件放在同一目录
+        
+        Args:
+            name (str): 派生文件名称，如 'reachability'
+            suffix (str): 文件后缀，如 '.npz'
+        
+        Returns:
+            Path: 形如 supply_chain_graph.reachability.<version>.npz 的路径
+        """
+        graph_path = Path(self.graph_path)
+        return graph_path.parent / f"{graph_path.stem}.{name}.{self.graph_version[:12]}{suffix}"
+    
+    def previous_artifacts(self, name: str, suffix: str) -> List[Path]:
+        """获取同名派生文件的其他版本，最近写入的在前
+        
+        Args:
+            name (str): 派生文件名称，如 'reachability'
+            suffix (str): 文件后缀，如 '.npz'
+        
+        Returns:
+            List[Path]: 除当前版本外的文件路径
+        """
+        graph_path = Path(self.graph_path)
+        current = self.artifact_path(name, suffix)
+        paths = [
+            path for path in graph_path.parent.glob(f"{graph_path.stem}.{name}.{'?' * 12}{suffix}")
+            if path != current
+        ]
+        return sorted(paths, key=lambda path: path.stat().st_mtime, reverse=True)
+    
+    def prune_artifacts(self, name: str, suffix: str) -> int:
+        """删除同名派生文件的其他版本，只保留当前版本，在保存新版本后调用
+        
+        Args:
+            name (str): 派生文件名称，如 'reachability'
+            suffix (str): 文件后缀，如 '.npz'
+        
+        Returns:
+            int: 删除的文件数
+        """
+        removed = 0
+        for path in self.previous_artifacts(name, suffix):
+            try:
+                path.unlink()
+                removed += 1
+            except OSError as e:
+                logger.warning(f"删除旧版本派生文件失败: {path}: {e}")
+        if removed:
+            logger.info(f"已删除 {removed} 个旧版本的 {name}{suffix} 文件")
+        return removed
     
     def save_network(self):
         """保存网络到文件"""
         try:
             Path(self.graph_path).parent.mkdir(parents=True, exist_ok=True)
-            nx.write_gpickle(self.graph, self.graph_path)
+            # 确保版本号随网络一起保存
+            self.graph_version
+            with open(self.graph_path, 'wb') as f:
+                pickle.dump(self.graph, f, pickle.HIGHEST_PROTOCOL)
             logger.info(f"网络已保存到: {self.graph_path}")
         except Exception as e:
             logger.error(f"保存网络时出错: {str(e)}")
@@ -115,7 +222,8 @@ class SupplyChainNetwork:
         """
         try:
             if Path(self.graph_path).exists():
-                self.graph = nx.read_gpickle(self.graph_path)
+                with open(self.graph_path, 'rb') as f:
+                    self.graph = pickle.load(f)
                 logger.info(f"从 {self.graph_path} 加载网络成功")
                 return True
             return False
@@ -133,10 +241,12 @@ class SupplyChainNetwork:
             return
         
         logger.info("开始构建网络...")
+        self.invalidate_version()
         self.load_data()
         self.resolve_entities()
         self.build_network()
         self.identify_shared_suppliers()
+        self.update_concentration_metrics()
         self.save_network()
         logger.info("网络构建完成")
     
@@ -171,6 +281,7 @@ class SupplyChainNetwork:
             if node_id:
                 self.resolver.add_company_attributes(node_id, {
                     'canonical_name': row['Comname'],
+                    'former_names': row.get('Usednm'),
                     'company_id': row['Conumb'],
                     'company_class': row['Coclasf'],
                     'is_listed': row['Lstrorn'],
@@ -180,8 +291,32 @@ class SupplyChainNetwork:
                     'registered_capital': row['Rgscpt']
                 })
         
-        # 2. 处理供应商关系
-        for _, row in self.df_suppliers.iterrows():
+        # 2. 处理供应商和客户关系中的公司
+        self._resolve_relationship_companies(self.df_suppliers, self.df_customers)
+        
+        # 3. 创建节点DataFrame
+        self.df_nodes = pd.DataFrame.from_dict(
+            self.resolver.id_to_attributes,
+            orient='index'
+        ).reset_index()
+        self.df_nodes.rename(columns={'index': 'unique_node_id'}, inplace=True)
+        
+        logger.info(f"\n解析后的唯一公司数量: {len(self.df_nodes)}")
+    
+    def _resolve_relationship_companies(
+        self,
+        df_suppliers: Optional[pd.DataFrame],
+        df_customers: Optional[pd.DataFrame]
+    ) -> Set[str]:
+        """解析供应商/客户关系中出现的公司
+        
+        Returns:
+            Set[str]: 涉及的公司节点ID
+        """
+        node_ids = set()
+        
+        # 1. 处理供应商关系
+        for _, row in (df_suppliers if df_suppliers is not None else pd.DataFrame()).iterrows():
             # 处理上市公司
             listed_company_id = self.resolver.get_unique_id(row['Coname'])
             if listed_company_id:
@@ -190,6 +325,7 @@ class SupplyChainNetwork:
                     'stock_code': row['Scode'],
                     'is_listed': 1
                 })
+                node_ids.add(listed_company_id)
             
             # 处理供应商
             supplier_id = self.resolver.get_unique_id(row['Suplnm'])
@@ -199,9 +335,10 @@ class SupplyChainNetwork:
                     'company_id': row['Conumb'],
                     'is_listed': row['Lstrorn']
                 })
+                node_ids.add(supplier_id)
         
-        # 3. 处理客户关系
-        for _, row in self.df_customers.iterrows():
+        # 2. 处理客户关系
+        for _, row in (df_customers if df_customers is not None else pd.DataFrame()).iterrows():
             # 处理上市公司
             listed_company_id = self.resolver.get_unique_id(row['Coname'])
             if listed_company_id:
@@ -210,6 +347,7 @@ class SupplyChainNetwork:
                     'stock_code': row['Scode'],
                     'is_listed': 1
                 })
+                node_ids.add(listed_company_id)
             
             # 处理客户
             customer_id = self.resolver.get_unique_id(row['Custnm'])
@@ -219,15 +357,9 @@ class SupplyChainNetwork:
                     'company_id': row['Conumb'],
                     'is_listed': row['Lstrorn']
                 })
+                node_ids.add(customer_id)
         
-        # 4. 创建节点DataFrame
-        self.df_nodes = pd.DataFrame.from_dict(
-            self.resolver.id_to_attributes,
-            orient='index'
-        ).reset_index()
-        self.df_nodes.rename(columns={'index': 'unique_node_id'}, inplace=True)
-        
-        logger.info(f"\n解析后的唯一公司数量: {len(self.df_nodes)}")
+        return node_ids
     
     def build_network(self):
         """构建网络"""
@@ -238,8 +370,22 @@ class SupplyChainNetwork:
                 **row.to_dict()
             )
         
-        # 2. 添加供应商关系边
-        for _, row in self.df_suppliers.iterrows():
+        # 2. 添加供应商和客户关系边，并保留完整的披露历史
+        self._add_relationship_edges(self.df_suppliers, self.df_customers)
+        self.edge_history = disclosure_edges(self.df_suppliers, self.df_customers, self.resolver.get_unique_id)
+        
+        logger.info(f"\n网络统计:")
+        logger.info(f"节点数: {self.graph.number_of_nodes()}")
+        logger.info(f"边数: {self.graph.number_of_edges()}")
+    
+    def _add_relationship_edges(
+        self,
+        df_suppliers: Optional[pd.DataFrame],
+        df_customers: Optional[pd.DataFrame]
+    ):
+        """将供应商/客户记录添加为网络的边"""
+        # 1. 添加供应商关系边
+        for _, row in (df_suppliers if df_suppliers is not None else pd.DataFrame()).iterrows():
             supplier_id = self.resolver.get_unique_id(row['Suplnm'])
             listed_company_id = self.resolver.get_unique_id(row['Coname'])
             
@@ -253,8 +399,8 @@ class SupplyChainNetwork:
                     announcement_date=row['Anncdate']
                 )
         
-        # 3. 添加客户关系边
-        for _, row in self.df_customers.iterrows():
+        # 2. 添加客户关系边
+        for _, row in (df_customers if df_customers is not None else pd.DataFrame()).iterrows():
             listed_company_id = self.resolver.get_unique_id(row['Coname'])
             customer_id = self.resolver.get_unique_id(row['Custnm'])
             
@@ -267,16 +413,18 @@ class SupplyChainNetwork:
                     revenue_share=row['Custincrt'],
                     announcement_date=row['Anncdate']
                 )
-        
-        logger.info(f"\n网络统计:")
-        logger.info(f"节点数: {self.graph.number_of_nodes()}")
-        logger.info(f"边数: {self.graph.number_of_edges()}")
     
-    def identify_shared_suppliers(self):
-        """识别共享供应商"""
+    def identify_shared_suppliers(self, node_ids: Optional[Set[str]] = None):
+        """识别共享供应商
+        
+        Args:
+            node_ids (Set[str], optional): 只更新这些节点，默认更新全部节点
+        """
+        nodes = list(self.graph.nodes()) if node_ids is None else [n for n in node_ids if n in self.graph]
+        
         # 计算每个供应商的客户数量
         supplier_customer_counts = {}
-        for node in self.graph.nodes():
+        for node in nodes:
             if self.graph.out_degree(node) > 0:  # 有出边的节点可能是供应商
                 customer_count = len(set(
                     target for _, target in self.graph.out_edges(node)
@@ -286,152 +434,261 @@ class SupplyChainNetwork:
                     supplier_customer_counts[node] = customer_count
         
         # 更新节点属性
-        for node in self.graph.nodes():
+        for node in nodes:
             is_shared = node in supplier_customer_counts
             self.graph.nodes[node]['is_shared_supplier'] = is_shared
             if is_shared:
                 self.graph.nodes[node]['shared_degree'] = supplier_customer_counts[node]
+            else:
+                self.graph.nodes[node].pop('shared_degree', None)
         
         logger.info(f"\n共享供应商数量: {len(supplier_customer_counts)}")
     
-    def visualize_network(self, output_path: str = 'data/processed/network_visualization.html'):
-        """使用Plotly可视化网络，添加交互功能和性能优化"""
-        # 准备节点位置
-        pos = nx.spring_layout(self.graph, k=1, iterations=50)
-        
-        # 准备节点轨迹
-        node_trace = go.Scatter(
-            x=[],
-            y=[],
-            text=[],
-            mode='markers+text',
-            hoverinfo='text',
-            marker=dict(
-                showscale=True,
-                colorscale='YlGnBu',
-                size=[],
-                color=[],
-                colorbar=dict(
-                    thickness=15,
-                    title='共享供应商度',
-                    xanchor='left',
-                    titleside='right'
-                ),
-                line=dict(width=2, color='#666')
-            ),
-            customdata=[],  # 用于存储节点详细信息
-            hovertemplate=(
-                "<b>%{text}</b><br>" +
-                "共享供应商度: %{marker.color}<br>" +
-                "节点类型: %{customdata[0]}<br>" +
-                "行业: %{customdata[1]}<br>" +
-                "地区: %{customdata[2]}<br>" +
-                "<extra></extra>"  # 移除次要信息
-            )
-        )
+    def _sync_resolver_from_graph(self):
+        """从已加载的网络恢复实体解析器的状态，保证增量更新时ID一致"""
+        if self.resolver.name_to_id or self.graph.number_of_nodes() == 0:
+            return
+        max_id = 0
+        for node, data in self.graph.nodes(data=True):
+            normalized_name = self.resolver.normalize_company_name(data.get('canonical_name'))
+            if normalized_name:
+                self.resolver.name_to_id.setdefault(normalized_name, node)
+            self.resolver.id_to_attributes[node] = {
+                key: value for key, value in data.items() if key != 'unique_node_id'
+            }
+            match = re.match(r'node_id_(\d+)$', str(node))
+            if match:
+                max_id = max(max_id, int(match.group(1)))
+        self.resolver.next_id = max_id + 1
+    
+    def add_relationships(
+        self,
+        df_suppliers: Optional[pd.DataFrame] = None,
+        df_customers: Optional[pd.DataFrame] = None,
+        save: bool = True
+    ) -> Set[str]:
+        """增量添加新披露的供应商/客户关系
         
-        # 添加节点
-        for node in self.graph.nodes():
-            x, y = pos[node]
-            node_trace['x'] += tuple([x])
-            node_trace['y'] += tuple([y])
-            node_trace['text'] += tuple([self.graph.nodes[node]['canonical_name']])
-            
-            # 设置节点大小和颜色
-            if self.graph.nodes[node].get('is_shared_supplier', False):
-                size = 20 + self.graph.nodes[node].get('shared_degree', 0) * 5
-                color = self.graph.nodes[node].get('shared_degree', 0)
-            else:
-                size = 10
-                color = 0
-            
-            # 添加节点详细信息
-            node_type = '上市公司' if self.graph.nodes[node].get('is_listed', 0) == 1 else '供应商/客户'
-            industry = self.graph.nodes[node].get('industry', '未知')
-            area = self.graph.nodes[node].get('area', '未知')
-            
-            node_trace['marker']['size'] += tuple([size])
-            node_trace['marker']['color'] += tuple([color])
-            node_trace['customdata'] += tuple([[node_type, industry, area]])
-        
-        # 准备边轨迹
-        edge_traces = []
-        for edge_type, color in [('supplier', '#ff7f0e'), ('customer', '#1f77b4')]:
-            edge_trace = go.Scatter(
-                x=[],
-                y=[],
-                line=dict(width=0.5, color=color),
-                hoverinfo='text',
-                mode='lines',
-                name=edge_type,
-                customdata=[],  # 用于存储边详细信息
-                hovertemplate=(
-                    "<b>%{customdata[0]}</b> → <b>%{customdata[1]}</b><br>" +
-                    "关系类型: %{customdata[2]}<br>" +
-                    "金额: %{customdata[3]:,.2f}<br>" +
-                    "占比: %{customdata[4]:.2%}<br>" +
-                    "公告日期: %{customdata[5]}<br>" +
-                    "<extra></extra>"
-                )
+        只更新受影响节点的共享供应商标记和集中度指标，不重建整个网络。
+        
+        Args:
+            df_suppliers (pd.DataFrame, optional): 新的供应商记录，列同原始供应商数据
+            df_customers (pd.DataFrame, optional): 新的客户记录，列同原始客户数据
+            save (bool): 是否保存网络并重新导出 DuckDB 数据库
+        
+        Returns:
+            Set[str]: 受影响的节点ID
+        """
+        self._sync_resolver_from_graph()
+        node_ids = self._resolve_relationship_companies(df_suppliers, df_customers)
+        for node_id in node_ids:
+            attributes = self.resolver.id_to_attributes.get(node_id, {})
+            self.graph.add_node(node_id, unique_node_id=node_id, **attributes)
+        self._add_relationship_edges(df_suppliers, df_customers)
+        df_new = disclosure_edges(df_suppliers, df_customers, self.resolver.get_unique_id)
+        if self.edge_history is not None:
+            self.edge_history = pd.concat([self.edge_history, df_new], ignore_index=True)
+            self.history_delta = df_new if self.history_delta is None else pd.concat(
+                [self.history_delta, df_new], ignore_index=True
             )
-            
-            for edge in self.graph.edges():
-                if self.graph.edges[edge]['relationship_type'] == edge_type:
-                    x0, y0 = pos[edge[0]]
-                    x1, y1 = pos[edge[1]]
-                    edge_trace['x'] += tuple([x0, x1, None])
-                    edge_trace['y'] += tuple([y0, y1, None])
-                    
-                    # 添加边详细信息
-                    source_name = self.graph.nodes[edge[0]]['canonical_name']
-                    target_name = self.graph.nodes[edge[1]]['canonical_name']
-                    amount = self.graph.edges[edge].get('procurement_amount', 0) or self.graph.edges[edge].get('revenue', 0)
-                    share = self.graph.edges[edge].get('procurement_share', 0) or self.graph.edges[edge].get('revenue_share', 0)
-                    date = self.graph.edges[edge].get('announcement_date', '未知')
-                    
-                    edge_trace['customdata'] += tuple([[source_name, target_name, edge_type, amount, share, date]])
-            
-            edge_traces.append(edge_trace)
-        
-        # 创建图形
-        fig = go.Figure(
-            data=edge_traces + [node_trace],
-            layout=go.Layout(
-                title=dict(
-                    text='供应链网络可视化',
-                    x=0.5,
-                    y=0.95,
-                    xanchor='center',
-                    yanchor='top'
-                ),
-                showlegend=True,
-                hovermode='closest',
-                margin=dict(b=20, l=5, r=5, t=40),
-                xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                plot_bgcolor='white',
-                legend=dict(
-                    yanchor="top",
-                    y=0.99,
-                    xanchor="left",
-                    x=0.01
+        self.invalidate_version()
+        
+        self.identify_shared_suppliers(node_ids)
+        self.update_concentration_metrics(node_ids)
+        logger.info(f"增量更新完成，受影响节点数: {len(node_ids)}")
+        
+        if save:
+            self.save_network()
+            self.export_to_duckdb()
+        return node_ids
+    
+    def update_concentration_metrics(self, node_ids: Optional[Set[str]] = None) -> pd.DataFrame:
+        """计算或增量更新每个节点的供应商/客户集中度指标
+        
+        Args:
+            node_ids (Set[str], optional): 只重新计算这些节点，默认全部重新计算
+        
+        Returns:
+            pd.DataFrame: 集中度指标表，见 concentration.CONCENTRATION_COLUMNS
+        """
+        if node_ids is None or self.df_concentration is None:
+            self.df_concentration = compute_concentration_metrics(edges_to_frame(self.graph))
+            return self.df_concentration
+        
+        # 只取受影响节点相关的边
+        edges = [
+            (u, v, data) for node in node_ids if node in self.graph
+            for u, v, data in list(self.graph.in_edges(node, data=True)) + list(self.graph.out_edges(node, data=True))
+        ]
+        subgraph = nx.DiGraph()
+        subgraph.add_edges_from(edges)
+        updated = compute_concentration_metrics(edges_to_frame(subgraph), node_ids)
+        self.df_concentration = pd.concat([
+            self.df_concentration[~self.df_concentration['unique_node_id'].isin(node_ids)],
+            updated
+        ], ignore_index=True)
+        return self.df_concentration
+    
+    def export_to_duckdb(self, db_path: str = 'data/processed/supply_chain_network.duckdb'):
+        """导出网络到 DuckDB 数据库，供 DuckDB 看板使用
+        
+        先写入临时文件再整体替换目标文件，看板不会读到写了一半的数据库。
+        
+        Args:
+            db_path (str): DuckDB 数据库文件路径
+        """
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = db_path.with_name(db_path.name + '.tmp')
+        tmp_path.unlink(missing_ok=True)
+        
+        if self.df_concentration is None:
+            self.update_concentration_metrics()
+        # 按披露期的网络指标时间序列，看板的趋势视图直接读取；
+        # 网络没有披露历史时沿用已有数据库中的时间序列，不用合并后的边覆盖
+        df_temporal = TemporalNetworkMetrics.compute_and_save(self, new_edges=self.history_delta)
+        if df_temporal is None:
+            df_temporal = self._previous_temporal_metrics(db_path)
+        self.history_delta = None
+        # 每家公司供应商重叠最多的 top-k 同行（按网络版本缓存）
+        df_similarity = SupplierSimilarityIndex.load_or_build(self).df_similarity
+        df_nodes = nodes_to_frame(self.graph)[NODE_COLUMNS]
+        df_edges = edges_to_frame(self.graph)
+        df_edges['announcement_date'] = pd.to_datetime(df_edges['announcement_date'], errors='coerce')
+        
+        with duckdb.connect(str(tmp_path)) as conn:
+            for table, df in [
+                ('nodes', df_nodes),
+                ('edges', df_edges),
+                ('node_concentration', self.df_concentration),
+                ('supplier_similarity', df_similarity),
+                ('temporal_metrics', df_temporal)
+            ]:
+                conn.register('df_export', df)
+                conn.execute(f"CREATE TABLE {table} AS SELECT * FROM df_export")
+                conn.unregister('df_export')
+            # 预先关联两端公司的名称和共享供应商标记，看板查询不再重复关联 nodes 表；
+            # 按表格默认排序写入，分页时 zonemap 可以跳过数据块
+            conn.execute("""
+                CREATE TABLE edges_enriched AS
+                SELECT
+                    e.*,
+                    s.canonical_name AS source_name,
+                    t.canonical_name AS target_name,
+                    s.is_shared_supplier AS source_is_shared,
+                    t.is_shared_supplier AS target_is_shared
+                FROM edges e
+                JOIN nodes s ON e.source_node_id = s.unique_node_id
+                JOIN nodes t ON e.target_node_id = t.unique_node_id
+                ORDER BY
+                    coalesce(source_name, ''), coalesce(target_name, ''),
+                    e.source_node_id, e.target_node_id
+            """)
+            # 每家公司一行的自我网络记录：详情、集中度和按展示顺序排好的全部关系，
+            # 看板点击公司时只需按节点ID查找一行
+            conn.execute("""
+                CREATE TABLE ego_networks AS
+                WITH ego_edges AS (
+                    SELECT
+                        source_node_id AS unique_node_id,
+                        '出向' AS direction,
+                        target_name AS connected_company,
+                        relationship_type,
+                        procurement_amount,
+                        revenue,
+                        target_node_id AS connected_node_id,
+                        source_is_shared,
+                        target_is_shared
+                    FROM edges_enriched
+                    UNION ALL
+                    SELECT
+                        target_node_id AS unique_node_id,
+                        '入向' AS direction,
+                        source_name AS connected_company,
+                        relationship_type,
+                        procurement_amount,
+                        revenue,
+                        source_node_id AS connected_node_id,
+                        source_is_shared,
+                        target_is_shared
+                    FROM edges_enriched
                 ),
-                annotations=[
-                    dict(
-                        text="提示：<br>1. 节点大小表示共享供应商度<br>2. 节点颜色深浅表示共享供应商度<br>3. 橙色边表示供应商关系<br>4. 蓝色边表示客户关系",
-                        showarrow=False,
-                        xref="paper",
-                        yref="paper",
-                        x=0.01,
-                        y=0.01,
-                        align="left",
-                        bgcolor="rgba(255, 255, 255, 0.8)",
-                        bordercolor="black",
-                        borderwidth=1
-                    )
-                ]
+                ego AS (
+                    SELECT
+                        unique_node_id,
+                        list(
+                            struct_pack(
+                                direction, connected_company, relationship_type, procurement_amount,
+                                revenue, connected_node_id, source_is_shared, target_is_shared
+                            )
+                            ORDER BY direction, connected_company
+                        ) AS relationships
+                    FROM ego_edges
+                    GROUP BY unique_node_id
+                )
+                SELECT
+                    n.unique_node_id,
+                    n.canonical_name,
+                    n.former_names,
+                    n.company_id,
+                    n.company_class,
+                    n.is_listed,
+                    n.stock_code,
+                    n.industry,
+                    n.area,
+                    n.registered_capital,
+                    n.is_shared_supplier,
+                    n.shared_degree,
+                    c.supplier_count,
+                    c.supplier_hhi,
+                    c.supplier_top5_share,
+                    c.supplier_max_share,
+                    c.customer_count,
+                    c.customer_hhi,
+                    c.customer_top5_share,
+                    c.customer_max_share,
+                    ego.relationships
+                FROM nodes n
+                LEFT JOIN node_concentration c ON n.unique_node_id = c.unique_node_id
+                LEFT JOIN ego ON n.unique_node_id = ego.unique_node_id
+                ORDER BY n.unique_node_id
+            """)
+            conn.execute(
+                "CREATE TABLE build_meta AS SELECT ? AS graph_version, CAST(now() AS TIMESTAMP) AS built_at",
+                [self.graph_version]
             )
-        )
+            conn.execute("CREATE UNIQUE INDEX idx_nodes_id ON nodes (unique_node_id)")
+            conn.execute("CREATE UNIQUE INDEX idx_concentration_id ON node_concentration (unique_node_id)")
+            conn.execute("CREATE INDEX idx_supplier_similarity_id ON supplier_similarity (company_id)")
+            conn.execute("CREATE UNIQUE INDEX idx_ego_networks_id ON ego_networks (unique_node_id)")
+            # 看板按公司查询出向、入向关系，关系表格以 源-目标 作为分页的唯一排序键
+            conn.execute("CREATE INDEX idx_edges_source ON edges (source_node_id)")
+            conn.execute("CREATE INDEX idx_edges_target ON edges (target_node_id)")
+            conn.execute("CREATE INDEX idx_edges_enriched_source ON edges_enriched (source_node_id)")
+            conn.execute("CREATE INDEX idx_edges_enriched_target ON edges_enriched (target_node_id)")
+        
+        os.replace(tmp_path, db_path)
+        logger.info(f"\n网络已导出到 DuckDB: {db_path}")
+    
+    def _previous_temporal_metrics(self, db_path: Path) -> pd.DataFrame:
+        """读取已有数据库中的时间序列指标表，没有时返回空表"""
+        if db_path.exists():
+            try:
+                with duckdb.connect(str(db_path), read_only=True) as conn:
+                    df = conn.execute("SELECT * FROM temporal_metrics ORDER BY period_end").df()
+                logger.info(f"沿用 {db_path} 中的时间序列指标")
+                return df
+            except duckdb.Error as e:
+                logger.warning(f"读取已有时间序列指标失败: {e}")
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in METRIC_DTYPES.items()})
+    
+    def visualize_network(self, output_path: str = 'data/processed/network_visualization.html'):
+        """使用Plotly可视化网络，添加交互功能和性能优化"""
+        # 准备节点位置（按网络版本缓存）
+        pos = load_or_compute_layout(self)
+        
+        # 由预计算数组一次性构建 WebGL 图形
+        fig = build_network_figure(NetworkFigureData(self.graph, pos))
         
         # 添加交互功能
         fig.update_layout(
@@ -444,17 +701,17 @@ class SupplyChainNetwork:
                     showactive=True,
                     buttons=list([
                         dict(
-                            args=[{"visible": [True, True, True]}],
+                            args=[{"visible": trace_visibility('all')}],
                             label="显示全部",
                             method="update"
                         ),
                         dict(
-                            args=[{"visible": [True, False, True]}],
+                            args=[{"visible": trace_visibility('supplier')}],
                             label="仅显示供应商关系",
                             method="update"
                         ),
                         dict(
-                            args=[{"visible": [False, True, True]}],
+                            args=[{"visible": trace_visibility('customer')}],
                             label="仅显示客户关系",
                             method="update"
                         )
@@ -468,11 +725,61 @@ class SupplyChainNetwork:
         fig.write_html(output_path, include_plotlyjs='cdn')
         logger.info(f"\n网络可视化已保存到: {output_path}")
     
-    def export_to_gexf(self, output_path: str = 'data/processed/supply_chain_network.gexf'):
-        """导出网络到GEXF格式"""
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        nx.write_gexf(self.graph, output_path)
-        logger.info(f"\n网络已导出到: {output_path}")
+    def render_static(
+        self,
+        output_path: str = 'data/processed/network_overview.png',
+        color_by: str = 'industry',
+        width: int = 2000,
+        height: int = 2000
+    ):
+        """把整个网络光栅化为静态 PNG/SVG 图片，用于周报
+        
+        Args:
+            output_path (str): 输出路径，扩展名 .png 或 .svg
+            color_by (str): 'industry' 按行业着色，'shared_degree' 按共享供应商度着色
+            width (int): 图片宽度（像素）
+            height (int): 图片高度（像素）
+        """
+        pos = load_or_compute_layout(self)
+        renderer = RasterRenderer(width=width, height=height)
+        image, legend = renderer.render(self.graph, pos, color_by)
+        renderer.save(image, legend, output_path, title=f"供应链网络（{self.graph.number_of_nodes()} 家公司）")
+    
+    def export_to_gexf(
+        self,
+        output_path: str = 'data/processed/supply_chain_network.gexf',
+        compression: Optional[str] = None
+    ) -> ExportStats:
+        """流式导出网络到GEXF格式
+        
+        Args:
+            output_path (str): 输出路径
+            compression (str, optional): None、'gzip' 或 'zstd'
+        
+        Returns:
+            ExportStats: 导出统计
+        """
+        return export_graph(self.graph, 'gexf', output_path, compression)
+    
+    def export_graph(
+        self,
+        fmt: str,
+        output_path: str,
+        compression: Optional[str] = None,
+        chunk_size: int = 50_000
+    ) -> ExportStats:
+        """流式导出网络，支持 GEXF、GraphML、CSV/TSV 边表和分区 Parquet
+        
+        Args:
+            fmt (str): 'gexf'、'graphml'、'csv'、'tsv' 或 'parquet'
+            output_path (str): 输出路径；parquet 为输出目录
+            compression (str, optional): 文本格式为 None、'gzip'、'zstd'，parquet 为列压缩编码
+            chunk_size (int): 每批处理的节点/边数
+        
+        Returns:
+            ExportStats: 导出统计
+        """
+        return export_graph(self.graph, fmt, output_path, compression, chunk_size)
 
 def main():
     """主函数"""
@@ -483,9 +790,15 @@ def main():
         # 构建或加载网络
         network.build_or_load_network(force_rebuild=False)
         
+        # 导出到 DuckDB 供看板使用
+        network.export_to_duckdb()
+        
         # 可视化网络
         network.visualize_network()
         
+        # 全量网络的静态图片
+        network.render_static()
+        
     except Exception as e:
         logger.error(f"处理过程中出错: {str(e)}")
         raise
@@ -0,0 +1,320 @@
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from graph_tables import EDGE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 时间序列表的列及类型，每个披露期一行
+METRIC_DTYPES = {
+    'period': 'string', 'period_end': 'datetime64[ns]',
+    'nodes': 'int64', 'edges': 'int64', 'added_edges': 'int64', 'removed_edges': 'int64',
+    'density': 'float64', 'mean_degree': 'float64',
+    'median_degree': 'int64', 'p90_degree': 'int64', 'max_degree': 'int64',
+    'shared_suppliers': 'int64', 'supplier_hhi_mean': 'float64', 'customer_hhi_mean': 'float64'
+}
+METRIC_COLUMNS = list(METRIC_DTYPES)
+
+
+def disclosure_edges(
+    df_suppliers: Optional[pd.DataFrame],
+    df_customers: Optional[pd.DataFrame],
+    get_unique_id: Callable[[str], Optional[str]]
+) -> pd.DataFrame:
+    """把原始供应商/客户记录转换为披露级的边表
+
+    网络中每对节点只保留最后一次披露的边，这里保留每一期披露，随网络一起
+    保存（见 SupplyChainNetwork.edge_history），用于计算时间序列指标。
+
+    Args:
+        df_suppliers (pd.DataFrame, optional): 供应商记录，列同原始供应商数据
+        df_customers (pd.DataFrame, optional): 客户记录，列同原始客户数据
+        get_unique_id (Callable): 公司名称到节点ID的映射，如 CompanyEntityResolver.get_unique_id
+
+    Returns:
+        pd.DataFrame: 列见 EDGE_COLUMNS 的边表
+    """
+    def resolve(names: pd.Series) -> pd.Series:
+        unique_names = names.dropna().unique()
+        mapping = {name: get_unique_id(name) for name in unique_names}
+        return names.map(mapping)
+
+    frames = []
+    if df_suppliers is not None and not df_suppliers.empty:
+        frames.append(pd.DataFrame({
+            'source_node_id': resolve(df_suppliers['Suplnm']),
+            'target_node_id': resolve(df_suppliers['Coname']),
+            'relationship_type': 'supplier',
+            'procurement_amount': df_suppliers['Suplpa'],
+            'procurement_share': df_suppliers['Suplpart'],
+            'announcement_date': df_suppliers['Anncdate']
+        }))
+    if df_customers is not None and not df_customers.empty:
+        frames.append(pd.DataFrame({
+            'source_node_id': resolve(df_customers['Coname']),
+            'target_node_id': resolve(df_customers['Custnm']),
+            'relationship_type': 'customer',
+            'revenue': df_customers['Custinc'],
+            'revenue_share': df_customers['Custincrt'],
+            'announcement_date': df_customers['Anncdate']
+        }))
+    if not frames:
+        return pd.DataFrame(columns=EDGE_COLUMNS)
+    df = pd.concat(frames, ignore_index=True).reindex(columns=EDGE_COLUMNS)
+    return df.dropna(subset=['source_node_id', 'target_node_id']).reset_index(drop=True)
+
+
+class TemporalNetworkMetrics:
+    """按披露期切片的网络指标
+
+    每家上市公司在某一期的披露会整体替换其此前披露的同类关系（供应商或客户）。
+    各期快照由上一期快照加上边的增量（新增/移除）得到，度数直方图、共享
+    供应商数和集中度等状态均按增量更新，不重建整个快照。
+    """
+
+    def __init__(self, df_edges: pd.DataFrame, freq: str = 'Q'):
+        """
+        Args:
+            df_edges (pd.DataFrame): 边表，列见 EDGE_COLUMNS
+            freq (str): 披露期粒度，pandas 周期代码，如 'Q'、'Y'
+        """
+        self.freq = freq
+        df = df_edges.copy()
+        df['period'] = pd.to_datetime(df['announcement_date'], errors='coerce').dt.to_period(freq)
+        dropped = int(df['period'].isna().sum())
+        if dropped:
+            logger.info(f"{dropped} 条边缺少公告日期，不计入时间序列")
+        df = df.dropna(subset=['period'])
+
+        # 披露方: 供应商关系由下游上市公司披露，客户关系由上游上市公司披露
+        is_supplier = (df['relationship_type'] == 'supplier').to_numpy()
+        df['reporter'] = np.where(is_supplier, df['target_node_id'], df['source_node_id'])
+        df['share'] = np.where(is_supplier, df['procurement_share'], df['revenue_share'])
+        df['share'] = pd.to_numeric(df['share'], errors='coerce').fillna(0)
+        df = (
+            df.sort_values(['period', 'announcement_date'])
+            .drop_duplicates(['period', 'reporter', 'relationship_type', 'source_node_id', 'target_node_id'], keep='last')
+            .reset_index(drop=True)
+        )
+        self.df_edges = df
+
+        self.node_ids, codes = np.unique(
+            np.concatenate([df['source_node_id'].to_numpy(dtype=str), df['target_node_id'].to_numpy(dtype=str)]),
+            return_inverse=True
+        )
+        self.src = codes[:len(df)]
+        self.tgt = codes[len(df):]
+        self.is_supplier = (df['relationship_type'] == 'supplier').to_numpy()
+        self.share_sq = df['share'].to_numpy(dtype=np.float64) ** 2
+        self.reporter = np.where(self.is_supplier, self.tgt, self.src)
+
+    def compute(self) -> pd.DataFrame:
+        """逐期应用边增量并计算指标
+
+        Returns:
+            pd.DataFrame: 每个披露期一行的时间序列表，列见 METRIC_COLUMNS
+        """
+        n = len(self.node_ids)
+        degree = np.zeros(n, dtype=np.int64)
+        supplier_out = np.zeros(n, dtype=np.int64)
+        supplier_hhi = np.zeros(n)
+        customer_hhi = np.zeros(n)
+        degree_hist = np.zeros(1, dtype=np.int64)
+        degree_hist[0] = n
+        active: Dict[Tuple[int, bool], np.ndarray] = {}
+        state = {
+            'edges': 0, 'shared': 0,
+            'supplier_reporters': 0, 'customer_reporters': 0,
+            'supplier_hhi_sum': 0.0, 'customer_hhi_sum': 0.0
+        }
+
+        records = []
+        groups = self.df_edges.groupby('period', sort=True).indices
+        for period, rows in groups.items():
+            # 按 (披露方, 关系类型) 分组，本期的披露整体替换此前的同类关系
+            sorted_rows = rows[np.lexsort((self.is_supplier[rows], self.reporter[rows]))]
+            split_at = np.flatnonzero(
+                np.diff(self.reporter[sorted_rows]) | np.diff(self.is_supplier[sorted_rows].astype(np.int8))
+            ) + 1
+            removed = []
+            for chunk in np.split(sorted_rows, split_at):
+                key = (int(self.reporter[chunk[0]]), bool(self.is_supplier[chunk[0]]))
+                if key in active:
+                    removed.append(active[key])
+                active[key] = chunk
+            removed = np.concatenate(removed) if removed else np.array([], dtype=np.int64)
+
+            touched = np.unique(np.concatenate([
+                self.src[removed], self.tgt[removed], self.src[rows], self.tgt[rows]
+            ]))
+            touched_sources = np.unique(np.concatenate([
+                self.src[removed][self.is_supplier[removed]], self.src[rows][self.is_supplier[rows]]
+            ]))
+            touched_reporters = np.unique(np.concatenate([self.reporter[removed], self.reporter[rows]]))
+
+            # 1. 度数直方图: 先移除受影响节点的旧度数
+            np.subtract.at(degree_hist, degree[touched], 1)
+            shared_before = int((supplier_out[touched_sources] > 1).sum())
+            sup_before = supplier_hhi[touched_reporters]
+            cus_before = customer_hhi[touched_reporters]
+
+            # 2. 应用边增量
+            for sign, idx in ((-1, removed), (1, rows)):
+                np.add.at(degree, self.src[idx], sign)
+                np.add.at(degree, self.tgt[idx], sign)
+                np.add.at(supplier_out, self.src[idx][self.is_supplier[idx]], sign)
+                np.add.at(supplier_hhi, self.reporter[idx][self.is_supplier[idx]], sign * self.share_sq[idx][self.is_supplier[idx]])
+                np.add.at(customer_hhi, self.reporter[idx][~self.is_supplier[idx]], sign * self.share_sq[idx][~self.is_supplier[idx]])
+            state['edges'] += len(rows) - len(removed)
+
+            # 3. 用受影响节点的新值更新汇总状态
+            max_degree = int(degree[touched].max(initial=0))
+            if max_degree >= len(degree_hist):
+                degree_hist = np.concatenate([degree_hist, np.zeros(max_degree + 1 - len(degree_hist), dtype=np.int64)])
+            np.add.at(degree_hist, degree[touched], 1)
+            state['shared'] += int((supplier_out[touched_sources] > 1).sum()) - shared_before
+            for name, before, values in (
+                ('supplier', sup_before, supplier_hhi),
+                ('customer', cus_before, customer_hhi)
+            ):
+                after = values[touched_reporters]
+                state[f'{name}_hhi_sum'] += float(after.sum() - before.sum())
+                state[f'{name}_reporters'] += int((after > 1e-12).sum() - (before > 1e-12).sum())
+
+            records.append(self._summarize(period, state, degree_hist, len(rows), len(removed)))
+
+        df_metrics = pd.DataFrame.from_records(records, columns=METRIC_COLUMNS).astype(METRIC_DTYPES)
+        logger.info(f"时间序列指标计算完成: {len(df_metrics)} 个披露期")
+        return df_metrics
+
+    @staticmethod
+    def _summarize(period, state: Dict, degree_hist: np.ndarray, added: int, removed: int) -> Dict:
+        """根据增量维护的状态生成一期的指标"""
+        active_hist = degree_hist.copy()
+        active_hist[0] = 0
+        nodes = int(active_hist.sum())
+        degrees = np.arange(len(active_hist))
+        cumulative = np.cumsum(active_hist)
+
+        def percentile(q: float) -> int:
+            return int(np.searchsorted(cumulative, q * nodes)) if nodes else 0
+
+        edges = state['edges']
+        return {
+            'period': str(period),
+            'period_end': period.end_time.normalize(),
+            'nodes': nodes,
+            'edges': edges,
+            'added_edges': added,
+            'removed_edges': removed,
+            'density': edges / (nodes * (nodes - 1)) if nodes > 1 else 0.0,
+            'mean_degree': float((degrees * active_hist).sum() / nodes) if nodes else 0.0,
+            'median_degree': percentile(0.5),
+            'p90_degree': percentile(0.9),
+            'max_degree': int(np.flatnonzero(active_hist).max(initial=0)),
+            'shared_suppliers': state['shared'],
+            'supplier_hhi_mean': (
+                state['supplier_hhi_sum'] / state['supplier_reporters'] if state['supplier_reporters'] else 0.0
+            ),
+            'customer_hhi_mean': (
+                state['customer_hhi_sum'] / state['customer_reporters'] if state['customer_reporters'] else 0.0
+            )
+        }
+
+    def snapshot(self) -> pd.DataFrame:
+        """最后一期的网络快照：每个 (披露方, 关系类型) 最近一期披露的边
+
+        Returns:
+            pd.DataFrame: 列见 EDGE_COLUMNS 的边表
+        """
+        df = self.df_edges
+        latest = df.groupby(['reporter', 'relationship_type'])['period'].transform('max')
+        return df.loc[df['period'] == latest, EDGE_COLUMNS].reset_index(drop=True)
+
+    @classmethod
+    def update(
+        cls,
+        df_metrics: pd.DataFrame,
+        df_history: pd.DataFrame,
+        df_new: pd.DataFrame,
+        freq: str = 'Q'
+    ) -> Optional[pd.DataFrame]:
+        """把新增披露作为增量追加到已有的时间序列
+
+        各期状态只取决于当期的快照，因此以已有序列最后一期的快照作为一期，
+        再逐期应用新增披露，只计算新的披露期。
+
+        Args:
+            df_metrics (pd.DataFrame): 已有的时间序列表
+            df_history (pd.DataFrame): 包含新增披露的完整披露历史
+            df_new (pd.DataFrame): 新增披露的边表
+            freq (str): 披露期粒度，与 df_metrics 一致
+
+        Returns:
+            pd.DataFrame: 更新后的时间序列表；新增披露不晚于已有最后一期时
+                无法追加，返回 None，需全量计算
+        """
+        if df_metrics.empty:
+            return None
+        last_period = pd.Period(df_metrics['period'].iloc[-1], freq)
+        new_dates = pd.to_datetime(df_new['announcement_date'], errors='coerce')
+        df_new = df_new.assign(announcement_date=new_dates)[new_dates.notna()]
+        if df_new.empty:
+            return df_metrics
+        if (df_new['announcement_date'].dt.to_period(freq) <= last_period).any():
+            return None
+
+        periods = pd.to_datetime(df_history['announcement_date'], errors='coerce').dt.to_period(freq)
+        seed = cls(df_history[periods <= last_period], freq).snapshot()
+        seed['announcement_date'] = last_period.end_time.normalize()
+        records = cls(pd.concat([seed, df_new], ignore_index=True), freq).compute().iloc[1:]
+        logger.info(f"时间序列指标增量更新: 新增 {len(records)} 个披露期")
+        return pd.concat([df_metrics, records], ignore_index=True)
+
+    @classmethod
+    def compute_and_save(
+        cls,
+        network,
+        freq: str = 'Q',
+        new_edges: Optional[pd.DataFrame] = None
+    ) -> Optional[pd.DataFrame]:
+        """计算时间序列指标并保存到网络文件旁的 Parquet 文件
+
+        当前网络版本已有结果时直接加载；给出新增披露且有上一版本的结果时
+        增量追加，否则按网络的披露历史全量计算。
+
+        Args:
+            network (SupplyChainNetwork): 供应链网络
+            freq (str): 披露期粒度
+            new_edges (pd.DataFrame, optional): 上次导出后新增的披露，列见 EDGE_COLUMNS
+
+        Returns:
+            pd.DataFrame: 时间序列指标表；网络没有披露历史时返回 None
+        """
+        name = f'temporal_metrics_{freq}'
+        path = network.artifact_path(name, '.parquet')
+        if path.exists():
+            logger.info(f"从 {path} 加载时间序列指标成功")
+            return pd.read_parquet(path)
+
+        df_history = network.edge_history
+        if df_history is None:
+            logger.warning("网络没有保存披露历史，不计算时间序列指标")
+            return None
+
+        df_metrics = None
+        previous_paths = network.previous_artifacts(name, '.parquet')
+        if new_edges is not None and previous_paths:
+            df_metrics = cls.update(pd.read_parquet(previous_paths[0]), df_history, new_edges, freq)
+        if df_metrics is None:
+            df_metrics = cls(df_history, freq).compute()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        df_metrics.to_parquet(path, index=False)
+        logger.info(f"时间序列指标已保存到: {path}")
+        network.prune_artifacts(name, '.parquet')
+        return df_metrics
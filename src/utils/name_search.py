@@ -0,0 +1,250 @@
+import bisect
+import logging
+import re
+import time
+import unicodedata
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 曾用名字段中多个名称的分隔符
+FORMER_NAME_SEPARATORS = r'[,，;；、|/]'
+
+# 匹配方式优先级: 完全匹配 < 前缀匹配 < 包含匹配
+MATCH_EXACT, MATCH_PREFIX, MATCH_SUBSTRING = 0, 1, 2
+
+# 名称类型优先级: 公司名称 < 股票代码 < 曾用名
+KIND_PRIORITY = {'name': 0, 'code': 1, 'former': 2}
+
+
+def normalize_name(text) -> str:
+    """规范化检索键：全角转半角、转小写、去掉空白和常见标点"""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    return re.sub(r'[\s()\[\]（）·.,，\-_]+', '', text)
+
+
+def normalize_stock_code(code) -> str:
+    """规范化股票代码，数值型代码补齐为 6 位"""
+    if code is None or pd.isna(code):
+        return ''
+    text = str(code).strip()
+    if text.endswith('.0'):
+        text = text[:-2]
+    return text.zfill(6) if text.isdigit() else normalize_name(text)
+
+
+def split_former_names(value) -> List[str]:
+    """拆分曾用名字段"""
+    if value is None or (not isinstance(value, (list, tuple)) and pd.isna(value)):
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [name.strip() for name in re.split(FORMER_NAME_SEPARATORS, str(value)) if name.strip()]
+
+
+class CompanyNameIndex:
+    """公司名称检索索引
+
+    每个检索键（公司名称、曾用名、股票代码）规范化后按字典序排序，前缀查询
+    用二分查找定位区间；包含查询用单字/双字 n-gram 倒排表求交集后再校验。
+    结果按 完全匹配 > 前缀匹配 > 包含匹配、公司名称 > 股票代码 > 曾用名、
+    上市公司优先、名称较短优先 排序，同一公司只保留最佳的一条。
+    """
+
+    def __init__(self, df_nodes: pd.DataFrame, version: str = ''):
+        """
+        Args:
+            df_nodes (pd.DataFrame): 节点表，需包含 unique_node_id、canonical_name，
+                可选 former_names、stock_code、is_listed
+            version (str): 网络版本号
+        """
+        start_time = time.perf_counter()
+        self.version = version
+        df_nodes = df_nodes.reset_index(drop=True)
+        self.node_ids = df_nodes['unique_node_id'].astype(str).to_numpy()
+        self.names = df_nodes['canonical_name'].fillna('').astype(str).to_numpy()
+        stock_codes = df_nodes.get('stock_code', pd.Series(index=df_nodes.index, dtype=object))
+        self.stock_codes = np.array([normalize_stock_code(code) for code in stock_codes], dtype=object)
+        is_listed = df_nodes.get('is_listed', pd.Series(0, index=df_nodes.index))
+        self.is_listed = pd.to_numeric(is_listed, errors='coerce').fillna(0).to_numpy() == 1
+
+        # 1. 展开检索键
+        keys, key_node, key_kind, key_text = [], [], [], []
+        former_names = df_nodes.get('former_names', pd.Series(index=df_nodes.index, dtype=object))
+        for row, (name, code, formers) in enumerate(zip(self.names, self.stock_codes, former_names)):
+            for kind, text in (
+                [('name', name), ('code', code)] + [('former', former) for former in split_former_names(formers)]
+            ):
+                key = normalize_name(text) if kind != 'code' else text
+                if key:
+                    keys.append(key)
+                    key_node.append(row)
+                    key_kind.append(KIND_PRIORITY[kind])
+                    key_text.append(text)
+
+        # 2. 按检索键排序，支持二分前缀查询
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys: List[str] = [keys[i] for i in order]
+        self.key_node = np.array(key_node, dtype=np.int64)[order] if keys else np.zeros(0, dtype=np.int64)
+        self.key_kind = np.array(key_kind, dtype=np.int8)[order] if keys else np.zeros(0, dtype=np.int8)
+        self.key_text = np.array(key_text, dtype=object)[order] if keys else np.zeros(0, dtype=object)
+        self.key_length = np.array([len(key) for key in self.keys], dtype=np.int32)
+
+        # 3. 单字和双字倒排表，倒排列表为升序的检索键下标
+        grams = pd.Series(
+            [[key[i:i + n] for n in (1, 2) for i in range(len(key) - n + 1)] for key in self.keys],
+            dtype=object
+        ).explode().dropna()
+        self.postings: Dict[str, np.ndarray] = {
+            gram: np.unique(idx) for gram, idx in
+            pd.Series(grams.index.to_numpy(dtype=np.int64), index=grams.to_numpy()).groupby(level=0)
+        } if len(grams) else {}
+
+        logger.info(
+            f"公司名称索引构建完成: {len(self.node_ids)} 家公司, {len(self.keys)} 个检索键, "
+            f"{len(self.postings)} 个 n-gram, 耗时 {time.perf_counter() - start_time:.2f} 秒"
+        )
+
+    @classmethod
+    def from_graph(cls, graph, version: str = '') -> 'CompanyNameIndex':
+        """从 networkx 网络构建索引"""
+        df_nodes = pd.DataFrame.from_records(
+            ({**data, 'unique_node_id': node} for node, data in graph.nodes(data=True))
+        )
+        if 'canonical_name' not in df_nodes.columns:
+            df_nodes['canonical_name'] = df_nodes['unique_node_id']
+        return cls(df_nodes, version)
+
+    def _substring_matches(self, query: str, exclude: np.ndarray, k: int) -> np.ndarray:
+        """用 n-gram 倒排表找出包含查询串的检索键
+
+        候选键先按排序规则排好，再分批校验是否真正包含查询串，凑够 k 家
+        公司即停止，常见词（如"有限公司"）不需要校验全部候选。
+        """
+        n = 1 if len(query) == 1 else 2
+        grams = {query[i:i + n] for i in range(len(query) - n + 1)}
+        lists = [self.postings.get(gram) for gram in grams]
+        if any(postings is None for postings in lists):
+            return np.zeros(0, dtype=np.int64)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for postings in lists[1:]:
+            candidates = np.intersect1d(candidates, postings, assume_unique=True)
+            if len(candidates) == 0:
+                return candidates
+        candidates = np.setdiff1d(candidates, exclude, assume_unique=True)
+        candidates = candidates[self._rank(candidates, np.zeros(len(candidates), dtype=np.int8))]
+        if n == 1 or len(query) == 2:
+            return candidates
+
+        matched, nodes = [], set()
+        for start in range(0, len(candidates), 256):
+            chunk = candidates[start:start + 256]
+            chunk = chunk[[query in self.keys[i] for i in chunk]]
+            matched.append(chunk)
+            nodes.update(self.key_node[chunk].tolist())
+            if len(nodes) >= k:
+                break
+        return np.concatenate(matched) if matched else np.zeros(0, dtype=np.int64)
+
+    def _rank(self, keys: np.ndarray, match: np.ndarray) -> np.ndarray:
+        """检索键的排序下标"""
+        node = self.key_node[keys]
+        return np.lexsort((self.key_length[keys], ~self.is_listed[node], self.key_kind[keys], match))
+
+    def search(self, query: str, k: int = 10) -> List[Dict]:
+        """检索公司名称、曾用名和股票代码
+
+        Args:
+            query (str): 检索词
+            k (int): 返回的最大条数
+
+        Returns:
+            List[Dict]: 按相关度排序的结果，包含 unique_node_id、canonical_name、
+                stock_code、is_listed、matched（命中的名称）、match_type（name/code/former）
+        """
+        query = normalize_name(query)
+        if not query or not self.keys:
+            return []
+
+        # 前缀区间（包含完全匹配）
+        lo = bisect.bisect_left(self.keys, query)
+        hi = bisect.bisect_left(self.keys, query + '\U0010ffff')
+        prefix = np.arange(lo, hi, dtype=np.int64)
+        match = np.where(self.key_length[prefix] == len(query), MATCH_EXACT, MATCH_PREFIX)
+
+        # 前缀结果不足时补充包含匹配
+        if len(prefix) < k:
+            substring = self._substring_matches(query, prefix, k)
+            prefix = np.concatenate([prefix, substring])
+            match = np.concatenate([match, np.full(len(substring), MATCH_SUBSTRING)])
+
+        if len(prefix) == 0:
+            return []
+        node = self.key_node[prefix]
+        order = self._rank(prefix, match)
+        # 同一公司只保留排序最靠前的检索键
+        _, first = np.unique(node[order], return_index=True)
+        best = order[np.sort(first)][:k]
+
+        kinds = {priority: kind for kind, priority in KIND_PRIORITY.items()}
+        return [
+            {
+                'unique_node_id': self.node_ids[node[i]],
+                'canonical_name': self.names[node[i]],
+                'stock_code': self.stock_codes[node[i]] or None,
+                'is_listed': bool(self.is_listed[node[i]]),
+                'matched': self.key_text[prefix[i]],
+                'match_type': kinds[int(self.key_kind[prefix[i]])]
+            }
+            for i in best
+        ]
+
+    def dropdown_options(self, query: str, k: int = 10) -> List[Dict]:
+        """生成 dcc.Dropdown 的下拉选项"""
+        options = []
+        for result in self.search(query, k):
+            label = result['canonical_name']
+            if result['stock_code']:
+                label += f" ({result['stock_code']})"
+            if result['match_type'] == 'former':
+                label += f" 曾用名: {result['matched']}"
+            options.append({'label': label, 'value': result['unique_node_id']})
+        return options
+
+
+def register_search_endpoint(
+    server,
+    get_index: Callable[[], CompanyNameIndex],
+    route: str = '/api/search'
+):
+    """在 Flask 服务上注册自动补全接口
+
+    GET {route}?q=检索词&k=10，返回 JSON：query、version、elapsed_ms、results。
+
+    Args:
+        server (flask.Flask): Dash 应用的 Flask 服务 (app.server)
+        get_index (Callable[[], CompanyNameIndex]): 返回当前索引的函数
+        route (str): 接口路径
+    """
+    from flask import jsonify, request
+
+    def search_companies():
+        query = request.args.get('q', '')
+        k = min(max(request.args.get('k', 10, type=int), 1), 100)
+        start_time = time.perf_counter()
+        index = get_index()
+        results = index.search(query, k)
+        return jsonify({
+            'query': query,
+            'version': index.version,
+            'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 3),
+            'results': results
+        })
+
+    server.add_url_rule(route, 'search_companies', search_companies, methods=['GET'])
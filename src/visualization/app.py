@@ -1,26 +1,154 @@
 import dash
-from dash import dcc, html, dash_table, callback, Input, Output, State
+from dash import dcc, html, dash_table, Input, Output, State, DiskcacheManager
+from dash.dash_table.Format import Format, Group, Scheme
 import dash_bootstrap_components as dbc
 import dash_cytoscape as cyto
-import duckdb
+import diskcache
 import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from pathlib import Path
 import json
 import atexit
+import logging
+import sys
+
+# 与网络看板共用 src/utils 下的公司名称检索
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from utils.name_search import CompanyNameIndex, register_search_endpoint
+from db_pool import DuckDBPool
+from queries import QUERY_SQL, add_query_observer, explain_analyze_sql, run_query, run_sql
+from query_cache import QueryResultCache, register_cache_endpoint
+from table_paging import build_count_query, build_page_query
+from cytoscape_elements import (
+    count_elements, format_amounts, merge_elements, relationship_elements, subgraph_elements
+)
+from ego_network import node_relationship_frame, relationship_frame
+from graph_loading import (
+    ELEMENTS_PER_EXPANDED_EDGE, ELEMENTS_PER_PAGE_EDGE,
+    edge_budget, expand_neighbourhood, initial_subgraph, next_edge_page
+)
+from instrumentation import Instrumentation, register_metrics_endpoints
+from data_api import register_data_endpoints
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 数据库路径
+DB_PATH = Path("data/processed/supply_chain_network.duckdb")
+
+# 后台回调：耗时的回调在本地子进程中执行，任务和结果存放在磁盘上 (diskcache)，
+# 不需要 Celery/Redis；相同参数的结果按数据库版本缓存 10 分钟
+background_callback_manager = DiskcacheManager(
+    diskcache.Cache(str(DB_PATH.parent / "background_jobs")),
+    cache_by=[lambda: db_pool.version],
+    expire=600
+)
 
 # 初始化 Dash 应用
 app = dash.Dash(
     __name__, 
     external_stylesheets=[dbc.themes.BOOTSTRAP],
-    suppress_callback_exceptions=True
+    suppress_callback_exceptions=True,
+    background_callback_manager=background_callback_manager
 )
 server = app.server
 
-# 数据库路径
-DB_PATH = Path("data/processed/supply_chain_network.duckdb")
+# 关系表格每页行数
+RELATIONSHIP_PAGE_SIZE = 20
+
+# 图形视图渐进加载：初始只显示流量最大的公司，点击公司展开邻域、
+# "加载更多"按流量追加关系，元素总数不超过 GRAPH_MAX_ELEMENTS
+GRAPH_INITIAL_NODES = 150
+GRAPH_INITIAL_EDGES = 300
+GRAPH_PAGE_EDGES = 200
+GRAPH_EXPAND_EDGES = 100
+GRAPH_MAX_ELEMENTS = 2000
+
+# 进程内共享一个只读连接，每个请求借用游标；后台线程做健康检查，
+# 数据库文件被替换时自动切换到新连接
+db_pool = DuckDBPool(DB_PATH)
+db_pool.start()
+atexit.register(db_pool.close)
 
 def get_conn():
-    return duckdb.connect(str(DB_PATH), read_only=True)
+    return db_pool.cursor()
+
+# 公司名称检索索引，数据库文件更新后按新的网络版本重建
+_name_index = {"index": CompanyNameIndex(pd.DataFrame(columns=["unique_node_id", "canonical_name"]))}
+
+def get_name_index():
+    version = db_pool.version
+    if not version or version == _name_index["index"].version:
+        return _name_index["index"]
+    try:
+        with get_conn() as conn:
+            df_nodes = conn.execute("SELECT * FROM nodes").df()
+        _name_index["index"] = CompanyNameIndex(df_nodes, version)
+    except Exception as e:
+        logger.warning(f"公司名称索引构建失败: {e}")
+    return _name_index["index"]
+
+# 查询结果缓存：进程内 LRU 加本地磁盘共享，按数据库版本区分，统计见 /api/cache/stats
+query_cache = QueryResultCache(DB_PATH.parent / "query_cache")
+register_cache_endpoint(server, query_cache)
+
+def cached_query(name, **params):
+    def run():
+        with get_conn() as conn:
+            return run_query(conn, name, **params)
+    return query_cache.get_or_run(name, params, db_pool.version, run)
+
+# 回调和查询的耗时统计：/metrics 为各项分位数，/debug/slow-queries 为慢查询及
+# EXPLAIN ANALYZE 计划，仅本机可访问
+def profile_query(sql, params):
+    with get_conn() as conn:
+        return explain_analyze_sql(conn, sql, params)
+
+def callback_names():
+    # 客户端回调在浏览器中执行，没有服务端函数
+    return {output: spec["callback"].__name__ for output, spec in app.callback_map.items() if "callback" in spec}
+
+instrumentation = Instrumentation(profile=profile_query, inbox_directory=DB_PATH.parent / "metrics_inbox")
+add_query_observer(instrumentation.observe_query)
+register_metrics_endpoints(server, instrumentation, callback_names)
+
+# 自动补全接口 /api/search，与网络看板相同；启动时先构建一次索引
+register_search_endpoint(server, get_name_index)
+get_name_index()
+
+# 批量数据接口 /api/data/{nodes,neighbours,subgraph,edges}：Arrow IPC 流或 Parquet，
+# 由 DuckDB 的 Arrow 输出逐批编码，不经过 pandas
+register_data_endpoints(server, get_conn)
+
+# 关系表格的列，全部关系（服务端分页）和选中公司的关系（客户端筛选）共用
+RELATIONSHIP_TABLE_COLUMNS = [
+    {"name": "源公司", "id": "source_name", "type": "text"},
+    {"name": "目标公司", "id": "target_name", "type": "text"},
+    {"name": "关系类型", "id": "relationship_type", "type": "text"},
+    {"name": "采购金额", "id": "procurement_amount", "type": "numeric"},
+    {"name": "收入", "id": "revenue", "type": "numeric"},
+    {"name": "是否共享供应商", "id": "is_shared", "type": "text"}
+]
+RELATIONSHIP_TABLE_STYLE = dict(
+    style_table={"overflowX": "auto"},
+    style_cell={
+        "textAlign": "left",
+        "padding": "10px",
+        "whiteSpace": "normal",
+        "height": "auto"
+    },
+    style_header={
+        "backgroundColor": "rgb(230, 230, 230)",
+        "fontWeight": "bold"
+    }
+)
+# 客户端表格中的金额保留数值以便排序，显示为带千分位的两位小数
+AMOUNT_FORMAT = Format(group=Group.yes, precision=2, scheme=Scheme.fixed)
 
 # 创建初始 Cytoscape 组件
 initial_elements = []
@@ -80,6 +208,16 @@ app.layout = dbc.Container([
             dbc.Card([
                 dbc.CardHeader("数据筛选"),
                 dbc.CardBody([
+                    dbc.Row([
+                        dbc.Col([
+                            dbc.Label("公司检索："),
+                            dcc.Dropdown(
+                                id="company-search",
+                                placeholder="搜索公司名称、曾用名或股票代码...",
+                                options=[]
+                            )
+                        ], width=12, className="mb-3")
+                    ]),
                     dbc.Row([
                         dbc.Col([
                             dbc.Label("共享供应商筛选："),
@@ -107,7 +245,8 @@ app.layout = dbc.Container([
                 id="view-selector",
                 options=[
                     {"label": "表格视图", "value": "table"},
-                    {"label": "图形视图", "value": "graph"}
+                    {"label": "图形视图", "value": "graph"},
+                    {"label": "趋势视图", "value": "trend"}
                 ],
                 value="table",
                 inline=True,
@@ -127,14 +266,85 @@ app.layout = dbc.Container([
     
     # 主视图区域
     html.Div([
-        # 表格视图
+        # 表格视图：未选中公司时显示全部关系，分页、排序和筛选由 update_relationships_page
+        # 在 DuckDB 中完成；选中公司后显示该公司的全部关系，筛选、排序和分页都在浏览器中
         dcc.Loading(
             id="loading-table",
             type="circle",
-            children=html.Div(id="table-view", style={"display": "block"})
+            children=html.Div(id="table-view", style={"display": "block"}, children=[
+                html.Div(id="all-relationships-container", children=[
+                    dash_table.DataTable(
+                        id="relationships-table",
+                        columns=RELATIONSHIP_TABLE_COLUMNS,
+                        data=[],
+                        page_current=0,
+                        page_size=RELATIONSHIP_PAGE_SIZE,
+                        page_action="custom",
+                        sort_action="custom",
+                        sort_mode="single",
+                        sort_by=[],
+                        filter_action="custom",
+                        filter_query="",
+                        **RELATIONSHIP_TABLE_STYLE
+                    )
+                ]),
+                html.Div(id="node-relationships-container", style={"display": "none"}, children=[
+                    dash_table.DataTable(
+                        id="node-relationships-table",
+                        columns=[
+                            {**column, "format": AMOUNT_FORMAT} if column["type"] == "numeric" else column
+                            for column in RELATIONSHIP_TABLE_COLUMNS
+                        ],
+                        data=[],
+                        page_size=RELATIONSHIP_PAGE_SIZE,
+                        page_action="native",
+                        sort_action="native",
+                        sort_mode="single",
+                        filter_action="native",
+                        **RELATIONSHIP_TABLE_STYLE
+                    )
+                ])
+            ])
         ),
         # 图形视图
-        html.Div(id="graph-view", style={"display": "none"}, children=[initial_cyto])
+        html.Div(id="graph-view", style={"display": "none"}, children=[
+            dbc.Row([
+                dbc.Col([
+                    dbc.Label("点击公司展开：", className="me-2"),
+                    dbc.RadioItems(
+                        id="graph-expand-hops",
+                        options=[
+                            {"label": "1 层关联", "value": 1},
+                            {"label": "2 层关联", "value": 2}
+                        ],
+                        value=1,
+                        inline=True,
+                        className="d-inline-block"
+                    )
+                ], width=5),
+                dbc.Col([
+                    dbc.Button("加载更多", id="graph-load-more", color="secondary", size="sm", className="me-2"),
+                    dbc.Button(
+                        "取消", id="graph-cancel", color="outline-secondary", size="sm",
+                        className="me-3", style={"display": "none"}
+                    ),
+                    html.Span(id="graph-load-progress", className="text-primary me-2"),
+                    html.Span(id="graph-load-status", className="text-muted")
+                ], width=7)
+            ], className="mb-2 align-items-center"),
+            initial_cyto
+        ]),
+        # 趋势视图：按披露期的网络指标时间序列
+        html.Div(id="trend-view", style={"display": "none"}, children=[
+            dcc.Loading(
+                id="loading-trend",
+                type="circle",
+                children=[
+                    html.Div(id="temporal-metrics-message", className="text-muted"),
+                    dcc.Graph(id="temporal-metrics-graph", figure=go.Figure())
+                ]
+            )
+        ])
     ], id="main-view"),
     
     # 公司详情和关系区域
@@ -220,8 +430,33 @@ app.layout = dbc.Container([
                                 minZoom=0.1,
                                 maxZoom=2
                             ),
-                            # 关系数据表
-                            html.Div(id="company-relationships-table", className="mt-4")
+                            # 提示信息
+                            html.Div(id="company-relationships-table", className="mt-4"),
+                            # 关系数据表，数据由客户端按方向筛选
+                            html.Div(
+                                id="company-relationships-table-container",
+                                className="mt-4",
+                                style={"display": "none"},
+                                children=dash_table.DataTable(
+                                    id="company-relationships-datatable",
+                                    columns=[
+                                        {"name": "方向", "id": "direction"},
+                                        {"name": "关联公司", "id": "connected_company"},
+                                        {"name": "关系类型", "id": "relationship_type"},
+                                        {"name": "采购金额", "id": "procurement_amount"},
+                                        {"name": "收入", "id": "revenue"}
+                                    ],
+                                    data=[],
+                                    page_size=10,
+                                    style_table={"overflowX": "auto"},
+                                    style_cell={
+                                        "textAlign": "left",
+                                        "padding": "10px",
+                                        "whiteSpace": "normal",
+                                        "height": "auto"
+                                    }
+                                )
+                            )
                         ]
                     )
                 ])
@@ -231,12 +466,36 @@ app.layout = dbc.Container([
     
     # 存储组件
     dcc.Store(id="selected-node-store"),
+    # 图形视图已加载的全部元素，共享供应商筛选由客户端回调完成
     dcc.Store(id="graph-elements-store"),
-    dcc.Store(id="relation-direction-store", data="all")
+    # 切换到图形视图且尚未加载时触发初始加载
+    dcc.Store(id="graph-load-request"),
+    # 图形视图已加载的范围：筛选条件和"加载更多"的键集位置
+    dcc.Store(id="graph-load-store"),
+    dcc.Store(id="relation-direction-store", data="all"),
+    # 关系表格的总行数和已加载各页末行的排序键
+    dcc.Store(id="relationships-page-store"),
+    # 全部关系表格使用的共享供应商筛选，选中公司期间不更新
+    dcc.Store(id="all-relationships-filter-store"),
+    # 选中公司的全部关系（各方向、各筛选条件），由客户端回调筛选显示
+    dcc.Store(id="company-relationships-store"),
+    dcc.Store(id="node-relationships-store")
 ], fluid=True)
 
-# 添加关系方向切换回调
-@app.callback(
+# 关系方向切换回调（客户端）：只更新按钮颜色和方向，不请求服务端
+app.clientside_callback(
+    """
+    function(allClicks, incomingClicks, outgoingClicks) {
+        var triggered = window.dash_clientside.callback_context.triggered;
+        var buttonId = triggered.length ? triggered[0].prop_id.split(".")[0] : "all-relations-btn";
+        if (buttonId === "incoming-relations-btn") {
+            return ["secondary", "primary", "secondary", "incoming"];
+        } else if (buttonId === "outgoing-relations-btn") {
+            return ["secondary", "secondary", "primary", "outgoing"];
+        }
+        return ["primary", "secondary", "secondary", "all"];
+    }
+    """,
     [Output("all-relations-btn", "color"),
      Output("incoming-relations-btn", "color"),
      Output("outgoing-relations-btn", "color"),
@@ -246,413 +505,351 @@ app.layout = dbc.Container([
      Input("outgoing-relations-btn", "n_clicks")],
     prevent_initial_call=True
 )
-def update_relation_direction(all_clicks, incoming_clicks, outgoing_clicks):
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        return "primary", "secondary", "secondary", "all"
-    
-    button_id = ctx.triggered[0]["prop_id"].split(".")[0]
-    if button_id == "all-relations-btn":
-        return "primary", "secondary", "secondary", "all"
-    elif button_id == "incoming-relations-btn":
-        return "secondary", "primary", "secondary", "incoming"
-    else:
-        return "secondary", "secondary", "primary", "outgoing"
 
-# 修改视图切换回调，修复共享供应商筛选
+# 视图切换回调：表格和图形视图、全部关系和选中公司关系的切换，
+# 表格都是固定组件，共享供应商筛选不经过这里
 @app.callback(
     [Output("table-view", "style"),
      Output("graph-view", "style"),
-     Output("table-view", "children"),
-     Output("network-graph", "elements")],
+     Output("trend-view", "style"),
+     Output("all-relationships-container", "style"),
+     Output("node-relationships-container", "style")],
     [Input("view-selector", "value"),
-     Input("selected-node-store", "data"),
-     Input("supplier-filter", "value")],
-    [State("network-graph", "elements")]
+     Input("selected-node-store", "data")]
 )
-def update_view(view_type, selected_node, supplier_filter, current_elements):
-    print(f"视图切换回调触发，view_type: {view_type}, selected_node: {selected_node}, supplier_filter: {supplier_filter}")
-    
-    # 构建共享供应商筛选条件
-    supplier_condition = ""
-    if supplier_filter == "shared":
-        supplier_condition = """
-        AND (
-            (s.is_shared_supplier = true AND e.source_node_id = s.unique_node_id) OR
-            (t.is_shared_supplier = true AND e.target_node_id = t.unique_node_id)
-        )
-        """
-    elif supplier_filter == "non-shared":
-        supplier_condition = """
-        AND (
-            (s.is_shared_supplier = false OR s.is_shared_supplier IS NULL) AND
-            (t.is_shared_supplier = false OR t.is_shared_supplier IS NULL)
-        )
-        """
+@instrumentation.instrument
+def update_view(view_type, selected_node):
+    logger.debug(f"视图切换回调触发，view_type: {view_type}, selected_node: {selected_node}")
+    shown, hidden = {"display": "block"}, {"display": "none"}
+    tables = (hidden, shown) if selected_node else (shown, hidden)
     
-    # 获取表格数据
-    if selected_node:
-        query = f"""
-        WITH company_relationships AS (
-            -- 出向关系
-            SELECT 
-                s.canonical_name AS source_name,
-                t.canonical_name AS target_name,
-                e.source_node_id,
-                e.target_node_id,
-                e.relationship_type,
-                e.procurement_amount,
-                e.revenue,
-                s.is_shared_supplier as source_is_shared,
-                t.is_shared_supplier as target_is_shared
-            FROM edges e
-            JOIN nodes s ON e.source_node_id = s.unique_node_id
-            JOIN nodes t ON e.target_node_id = t.unique_node_id
-            WHERE e.source_node_id = '{selected_node}'
-            UNION ALL
-            -- 入向关系
-            SELECT 
-                s.canonical_name AS source_name,
-                t.canonical_name AS target_name,
-                e.source_node_id,
-                e.target_node_id,
-                e.relationship_type,
-                e.procurement_amount,
-                e.revenue,
-                s.is_shared_supplier as source_is_shared,
-                t.is_shared_supplier as target_is_shared
-            FROM edges e
-            JOIN nodes s ON e.source_node_id = s.unique_node_id
-            JOIN nodes t ON e.target_node_id = t.unique_node_id
-            WHERE e.target_node_id = '{selected_node}'
-        )
-        SELECT *
-        FROM company_relationships
-        WHERE 1=1 {supplier_condition}
-        ORDER BY source_name, target_name
-        """
+    # 根据视图类型返回不同的显示样式
+    if view_type == "table":
+        return (shown, hidden, hidden) + tables
+    elif view_type == "trend":
+        return (hidden, hidden, shown) + tables
     else:
-        query = f"""
-        SELECT 
-            s.canonical_name AS source_name,
-            t.canonical_name AS target_name,
-            e.source_node_id,
-            e.target_node_id,
-            e.relationship_type,
-            e.procurement_amount,
-            e.revenue,
-            s.is_shared_supplier as source_is_shared,
-            t.is_shared_supplier as target_is_shared
-        FROM edges e
-        JOIN nodes s ON e.source_node_id = s.unique_node_id
-        JOIN nodes t ON e.target_node_id = t.unique_node_id
-        WHERE 1=1 {supplier_condition}
-        ORDER BY source_name, target_name
-        """
-    
+        return (hidden, shown, hidden) + tables
+
+# 趋势视图回调：读取导出时计算好的 temporal_metrics 表，切换到趋势视图时才查询
+@app.callback(
+    [Output("temporal-metrics-graph", "figure"),
+     Output("temporal-metrics-message", "children")],
+    Input("view-selector", "value")
+)
+@instrumentation.instrument
+def update_temporal_metrics(view_type):
+    if view_type != "trend":
+        return dash.no_update, dash.no_update
+    if not check_db_connection():
+        return go.Figure(), "数据库连接异常，请刷新页面重试"
     try:
-        with get_conn() as conn:
-            df = conn.execute(query).df()
-            print("表格数据查询结果：")
-            print(f"数据框形状: {df.shape}")
-            print("数据框列名:", df.columns.tolist())
-            print("数据框前5行:", df.head())
+        df = cached_query("temporal_metrics")
     except Exception as e:
-        print(f"表格数据查询错误: {e}")
-        df = pd.DataFrame()
+        logger.error(f"查询时间序列指标时发生错误: {e}")
+        return go.Figure(), f"查询出错: {str(e)}"
+    if df.empty:
+        return go.Figure(), "没有带公告日期的关系，无法计算时间序列指标"
     
-    # 格式化数值
-    for col in ['procurement_amount', 'revenue']:
-        if col in df.columns:
-            df[col] = df[col].apply(lambda x: f"{x:,.2f}" if pd.notna(x) and x != 0 else "0")
-    
-    # 添加共享供应商标记列
-    if 'source_is_shared' in df.columns and 'target_is_shared' in df.columns:
-        df['is_shared'] = df.apply(
-            lambda row: '是' if row['source_is_shared'] or row['target_is_shared'] else '否',
-            axis=1
+    fig = make_subplots(
+        rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+        subplot_titles=("公司数和关系数", "共享供应商数", "平均集中度(HHI)")
+    )
+    for row, column, name in [
+        (1, "nodes", "公司数"),
+        (1, "edges", "关系数"),
+        (2, "shared_suppliers", "共享供应商数"),
+        (3, "supplier_hhi_mean", "供应商集中度"),
+        (3, "customer_hhi_mean", "客户集中度")
+    ]:
+        fig.add_trace(
+            go.Scatter(x=df["period_end"], y=df[column], name=name, mode="lines+markers",
+                       customdata=df["period"], hovertemplate="%{customdata}: %{y}<extra>" + name + "</extra>"),
+            row=row, col=1
         )
-    
-    table = dash_table.DataTable(
-        id="relationships-table",
-        columns=[
-            {"name": "源公司", "id": "source_name"},
-            {"name": "目标公司", "id": "target_name"},
-            {"name": "关系类型", "id": "relationship_type"},
-            {"name": "采购金额", "id": "procurement_amount"},
-            {"name": "收入", "id": "revenue"},
-            {"name": "是否共享供应商", "id": "is_shared"}
-        ],
-        data=df.to_dict("records"),
-        page_size=20,
-        style_table={"overflowX": "auto"},
-        style_cell={
-            "textAlign": "left",
-            "padding": "10px",
-            "whiteSpace": "normal",
-            "height": "auto"
-        },
-        style_header={
-            "backgroundColor": "rgb(230, 230, 230)",
-            "fontWeight": "bold"
+    fig.update_layout(height=700, margin=dict(l=40, r=20, t=40, b=30), legend=dict(orientation="h"))
+    return fig, ""
+
+# 全部关系表格的筛选条件：选中公司期间共享供应商筛选只在浏览器中生效，
+# 不触发服务端查询；回到全部关系时带上当前筛选并回到第一页
+app.clientside_callback(
+    """
+    function(supplierFilter, selectedNode) {
+        if (selectedNode) {
+            return [window.dash_clientside.no_update, window.dash_clientside.no_update];
         }
-    )
+        return [supplierFilter || "all", 0];
+    }
+    """,
+    [Output("all-relationships-filter-store", "data"),
+     Output("relationships-table", "page_current")],
+    [Input("supplier-filter", "value"),
+     Input("selected-node-store", "data")]
+)
+
+# 图形视图的加载请求（客户端）：只有切换到图形视图且还没有加载过元素时
+# 才触发后台加载，切换到其他视图不启动后台任务
+app.clientside_callback(
+    """
+    function(viewType, elements) {
+        if (viewType !== "graph" || (elements && elements.length)) {
+            return window.dash_clientside.no_update;
+        }
+        return Date.now();
+    }
+    """,
+    Output("graph-load-request", "data"),
+    Input("view-selector", "value"),
+    State("graph-elements-store", "data")
+)
+
+# 图形视图渐进加载回调：收到加载请求时加载初始子图，点击公司合并其
+# k 层邻域，"加载更多"按流量追加下一页关系；加载的是未经筛选的全部元素。
+# 在后台子进程中执行并报告进度；同一回调再次触发时上一次任务被终止，
+# 也可以点击"取消"终止
+@app.callback(
+    [Output("graph-elements-store", "data"),
+     Output("graph-load-store", "data"),
+     Output("graph-load-status", "children"),
+     Output("graph-load-more", "disabled")],
+    [Input("graph-load-request", "data"),
+     Input("network-graph", "tapNodeData"),
+     Input("graph-load-more", "n_clicks")],
+    [State("graph-expand-hops", "value"),
+     State("graph-elements-store", "data"),
+     State("graph-load-store", "data")],
+    prevent_initial_call=True,
+    background=True,
+    progress=[Output("graph-load-progress", "children")],
+    progress_default=[""],
+    running=[(Output("graph-cancel", "style"), {"display": "inline-block"}, {"display": "none"})],
+    cancel=[Input("graph-cancel", "n_clicks")],
+    interval=300
+)
+@instrumentation.instrument
+def update_graph_elements(set_progress, load_request, tap_node, load_more_clicks, hops, current_elements, load_state):
+    ctx = dash.callback_context
+    trigger = ctx.triggered[0]["prop_id"].split(".")[0] if ctx.triggered else None
     
-    # 获取图形数据
-    if view_type == "graph":
-        if current_elements and len(current_elements) > 0:
-            print("使用当前图形元素")
-            elements = current_elements
+    # 数据库变化后重新加载初始子图（后台任务在子进程中执行，用数据库版本而非连接代数）
+    signature = json.dumps([db_pool.version])
+    reload = (
+        trigger not in ("network-graph", "graph-load-more")
+        or not current_elements
+        or not load_state
+        or load_state.get("signature") != signature
+    )
+    try:
+        if reload:
+            set_progress(["正在加载流量最大的公司…"])
+            edges_df, nodes_df = initial_subgraph(cached_query, GRAPH_INITIAL_NODES, GRAPH_INITIAL_EDGES)
+            elements = subgraph_elements(edges_df, nodes_df)
+            load_state = {"signature": signature, "after": None, "exhausted": False}
+            message = "已加载流量最大的公司"
+        elif trigger == "network-graph":
+            if not tap_node:
+                return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+            limit = edge_budget(len(current_elements), GRAPH_MAX_ELEMENTS, GRAPH_EXPAND_EDGES, ELEMENTS_PER_EXPANDED_EDGE)
+            if limit == 0:
+                elements, message = current_elements, "已达到显示上限，请调整筛选条件后重新加载"
+            else:
+                edges_df = expand_neighbourhood(
+                    cached_query, tap_node["id"], hops or 1, limit,
+                    on_hop=lambda hop: set_progress([f"正在展开第 {hop} 层关联…"])
+                )
+                elements, added = merge_elements(current_elements, subgraph_elements(edges_df))
+                message = f"已展开 {tap_node.get('label') or tap_node['id']}，新增 {added} 个元素"
         else:
-            print("重新查询图形数据")
-            graph_query = f"""
-            WITH initial_nodes AS (
-                SELECT DISTINCT n.unique_node_id, n.canonical_name
-                FROM nodes n
-                JOIN edges e ON n.unique_node_id IN (e.source_node_id, e.target_node_id)
-                JOIN nodes s ON e.source_node_id = s.unique_node_id
-                JOIN nodes t ON e.target_node_id = t.unique_node_id
-                WHERE 1=1 {supplier_condition}
-            ),
-            node_edges AS (
-                SELECT DISTINCT
-                    n.unique_node_id,
-                    n.canonical_name,
-                    e.source_node_id,
-                    e.target_node_id,
-                    e.procurement_amount,
-                    e.revenue
-                FROM initial_nodes n
-                JOIN edges e ON n.unique_node_id IN (e.source_node_id, e.target_node_id)
-                JOIN nodes s ON e.source_node_id = s.unique_node_id
-                JOIN nodes t ON e.target_node_id = t.unique_node_id
-                WHERE 1=1 {supplier_condition}
-            )
-            SELECT 
-                ne.unique_node_id,
-                ne.canonical_name,
-                ne.source_node_id,
-                ne.target_node_id,
-                t.canonical_name as target_name,
-                ne.procurement_amount,
-                ne.revenue
-            FROM node_edges ne
-            JOIN nodes t ON ne.target_node_id = t.unique_node_id
-            """
-            try:
-                with get_conn() as conn:
-                    graph_df = conn.execute(graph_query).df()
-                    print("图形数据查询结果：")
-                    print(f"数据框形状: {graph_df.shape}")
-                    print("数据框列名:", graph_df.columns.tolist())
-                    print("数据框前5行:", graph_df.head())
-                    
-                    # 构建 Cytoscape 元素
-                    elements = []
-                    nodes = set()
-                    
-                    # 计算节点大小范围
-                    max_amount = max(
-                        graph_df['procurement_amount'].max() if 'procurement_amount' in graph_df.columns else 0,
-                        graph_df['revenue'].max() if 'revenue' in graph_df.columns else 0
-                    )
-                    min_size = 20
-                    max_size = 100
-                    
-                    # 先添加所有节点
-                    for _, row in graph_df.iterrows():
-                        if pd.notna(row["unique_node_id"]) and row["unique_node_id"] not in nodes:
-                            # 计算节点大小
-                            amount = max(
-                                row['procurement_amount'] if pd.notna(row['procurement_amount']) else 0,
-                                row['revenue'] if pd.notna(row['revenue']) else 0
-                            )
-                            size = min_size + (max_size - min_size) * (amount / max_amount) if max_amount > 0 else min_size
-                            
-                            elements.append({
-                                "data": {
-                                    "id": row["unique_node_id"],
-                                    "label": row["canonical_name"],
-                                    "size": size
-                                }
-                            })
-                            nodes.add(row["unique_node_id"])
-                        
-                        if pd.notna(row["target_node_id"]) and row["target_node_id"] not in nodes:
-                            # 计算目标节点大小
-                            amount = max(
-                                row['procurement_amount'] if pd.notna(row['procurement_amount']) else 0,
-                                row['revenue'] if pd.notna(row['revenue']) else 0
-                            )
-                            size = min_size + (max_size - min_size) * (amount / max_amount) if max_amount > 0 else min_size
-                            
-                            elements.append({
-                                "data": {
-                                    "id": row["target_node_id"],
-                                    "label": row["target_name"],
-                                    "size": size
-                                }
-                            })
-                            nodes.add(row["target_node_id"])
-                    
-                    # 再添加边
-                    for _, row in graph_df.iterrows():
-                        if (pd.notna(row["source_node_id"]) and 
-                            pd.notna(row["target_node_id"]) and 
-                            row["source_node_id"] in nodes and 
-                            row["target_node_id"] in nodes):
-                            elements.append({
-                                "data": {
-                                    "source": row["source_node_id"],
-                                    "target": row["target_node_id"]
-                                }
-                            })
-                    
-                    print(f"构建的图形元素数量: {len(elements)}")
-                    print(f"节点数量: {len(nodes)}")
-            except Exception as e:
-                print(f"图形数据查询错误: {e}")
-                elements = []
-    else:
-        elements = []
+            limit = edge_budget(len(current_elements), GRAPH_MAX_ELEMENTS, GRAPH_PAGE_EDGES, ELEMENTS_PER_PAGE_EDGE)
+            if limit == 0 or load_state.get("exhausted"):
+                elements, message = current_elements, "没有更多可加载的关系"
+            else:
+                set_progress(["正在加载更多关系…"])
+                edges_df, after = next_edge_page(cached_query, load_state.get("after"), limit)
+                elements, added = merge_elements(current_elements, subgraph_elements(edges_df))
+                load_state = {**load_state, "after": after, "exhausted": after is None}
+                message = f"新增 {added} 个元素"
+    except Exception as e:
+        logger.error(f"图形数据查询错误: {e}")
+        return dash.no_update, dash.no_update, f"图形数据查询错误: {e}", False
     
-    # 根据视图类型返回不同的显示样式
-    if view_type == "table":
-        return {"display": "block"}, {"display": "none"}, table, elements
-    else:
-        return {"display": "none"}, {"display": "block"}, table, elements
+    nodes, edges = count_elements(elements)
+    status = f"{message}；当前 {nodes} 家公司、{edges} 条关系（上限 {GRAPH_MAX_ELEMENTS} 个元素）"
+    full = edge_budget(len(elements), GRAPH_MAX_ELEMENTS, GRAPH_PAGE_EDGES, ELEMENTS_PER_PAGE_EDGE) == 0
+    return elements, load_state, status, full or load_state["exhausted"]
 
-# 修改数据库连接检查函数
-def check_db_connection():
+# 图形视图的共享供应商筛选（客户端）：筛选已加载的元素，不请求服务端。
+# 保留符合条件的关系及其两端公司；已加载元素中没有关系的公司按自身标记筛选
+app.clientside_callback(
+    """
+    function(elements, supplierFilter) {
+        if (!elements) {
+            return [];
+        }
+        if (!supplierFilter || supplierFilter === "all") {
+            return elements;
+        }
+        var shared = supplierFilter === "shared";
+        var isEdge = function(element) { return element.data.source !== undefined; };
+        var linked = {};
+        var connected = {};
+        var edges = elements.filter(function(element) {
+            if (!isEdge(element)) {
+                return false;
+            }
+            linked[element.data.source] = true;
+            linked[element.data.target] = true;
+            var either = Boolean(element.data.source_is_shared) || Boolean(element.data.target_is_shared);
+            if (either !== shared) {
+                return false;
+            }
+            connected[element.data.source] = true;
+            connected[element.data.target] = true;
+            return true;
+        });
+        var nodes = elements.filter(function(element) {
+            if (isEdge(element)) {
+                return false;
+            }
+            if (connected[element.data.id]) {
+                return true;
+            }
+            return !linked[element.data.id] && Boolean(element.data.is_shared) === shared;
+        });
+        return nodes.concat(edges);
+    }
+    """,
+    Output("network-graph", "elements"),
+    [Input("graph-elements-store", "data"),
+     Input("supplier-filter", "value")]
+)
+
+# 全部关系表格分页回调：每次只查询并发送一页
+@app.callback(
+    [Output("relationships-table", "data"),
+     Output("relationships-table", "page_count"),
+     Output("relationships-page-store", "data")],
+    [Input("relationships-table", "page_current"),
+     Input("relationships-table", "page_size"),
+     Input("relationships-table", "sort_by"),
+     Input("relationships-table", "filter_query"),
+     Input("all-relationships-filter-store", "data")],
+    [State("relationships-page-store", "data")]
+)
+@instrumentation.instrument
+def update_relationships_page(page_current, page_size, sort_by, filter_query, supplier_filter, page_state):
+    page_current = page_current or 0
+    page_size = page_size or RELATIONSHIP_PAGE_SIZE
+    base_sql = QUERY_SQL["all_relationships"]
+    base_params = {"supplier_filter": supplier_filter or "all"}
+    
+    # 筛选、排序或数据库变化后，页数和各页末行的排序键失效
+    signature = json.dumps([db_pool.generation, supplier_filter, sort_by, filter_query, page_size])
+    if not page_state or page_state.get("signature") != signature:
+        page_state = {"signature": signature, "total": None, "page_keys": {}}
+    
     try:
         with get_conn() as conn:
-            conn.execute("SELECT 1")
-        return True
+            if page_state["total"] is None:
+                sql, params = build_count_query(base_sql, filter_query)
+                page_state["total"] = int(
+                    run_sql(conn, sql, {**base_params, **params}, name="relationships_count")["total"].iloc[0]
+                )
+            # 上一页已加载过时按键集分页，否则（跳页）按偏移量分页
+            sql, params = build_page_query(
+                base_sql, filter_query, sort_by, page_size,
+                after=page_state["page_keys"].get(str(page_current - 1)),
+                offset=page_current * page_size
+            )
+            df = run_sql(conn, sql, {**base_params, **params}, name="relationships_page")
     except Exception as e:
-        print(f"数据库连接检查失败: {e}")
-        return False
+        logger.error(f"表格分页查询错误: {e}")
+        return [], 1, None
+    
+    key_columns = [col for col in df.columns if col.startswith("_key_")]
+    if not df.empty:
+        page_state["page_keys"][str(page_current)] = df[key_columns].iloc[-1].tolist()
+    df = df.drop(columns=key_columns)
+    
+    # 格式化数值
+    for col in ['procurement_amount', 'revenue']:
+        if col in df.columns:
+            df[col] = format_amounts(df[col])
+    
+    page_count = max(-(-page_state["total"] // page_size), 1)
+    return df.to_dict("records"), page_count, page_state
+
+# 数据库连接检查：读取后台健康检查的结果，不在请求中执行查询
+def check_db_connection():
+    if not db_pool.healthy:
+        logger.warning(f"数据库连接检查失败: {db_pool.last_error}")
+    return db_pool.healthy
 
 # 公司详情回调
 @app.callback(
     Output("company-details", "children"),
     Input("selected-node-store", "data")
 )
+@instrumentation.instrument
 def update_company_details(selected_node):
     if not selected_node:
         return "请选择一个公司查看详情"
     if not check_db_connection():
         return "数据库连接异常，请刷新页面重试"
-    print(f"查询公司详情，node_id: {selected_node}")
+    logger.debug(f"查询公司详情，node_id: {selected_node}")
     try:
-        with get_conn() as conn:
-            # 查询 nodes 表
-            query = f"""
-            SELECT 
-                unique_node_id,
-                canonical_name,
-                company_id,
-                company_class,
-                is_listed,
-                stock_code,
-                industry,
-                area,
-                registered_capital,
-                is_shared_supplier,
-                shared_degree
-            FROM nodes
-            WHERE unique_node_id = '{selected_node}'
-            """
-            df = conn.execute(query).df()
-            print("公司详情查询结果：", df)
-            column_names = {
-                'canonical_name': '公司名称',
-                'company_id': '公司编号',
-                'company_class': '公司分类',
-                'is_listed': '是否上市',
-                'stock_code': '股票代码',
-                'industry': '所属行业',
-                'area': '所属地区',
-                'registered_capital': '注册资本',
-                'is_shared_supplier': '是否共享供应商',
-                'shared_degree': '共享度'
-            }
-            details = []
-            if df.empty:
-                print(f"nodes表未找到该公司({selected_node})，尝试从edges表查找...")
-                name_query = f"""
-                SELECT DISTINCT 
-                    CASE 
-                        WHEN source_node_id = '{selected_node}' THEN source_name
-                        WHEN target_node_id = '{selected_node}' THEN target_name
-                    END as company_name
-                FROM (
-                    SELECT 
-                        s.canonical_name as source_name,
-                        t.canonical_name as target_name,
-                        e.source_node_id,
-                        e.target_node_id
-                    FROM edges e
-                    JOIN nodes s ON e.source_node_id = s.unique_node_id
-                    JOIN nodes t ON e.target_node_id = t.unique_node_id
-                    WHERE e.source_node_id = '{selected_node}' OR e.target_node_id = '{selected_node}'
-                )
-                WHERE company_name IS NOT NULL
-                LIMIT 1
-                """
-                name_df = conn.execute(name_query).df()
-                company_name = name_df.iloc[0]['company_name'] if not name_df.empty else "未知公司"
-                print(f"edges表查到公司名称: {company_name if company_name else '无'}")
-                details.append({"属性": "公司名称", "值": company_name})
-                for col, display_name in column_names.items():
-                    if col != 'canonical_name':
-                        details.append({"属性": display_name, "值": "无"})
-            else:
-                node_name = df.iloc[0]['canonical_name']
-                name_query = f"""
-                SELECT DISTINCT 
-                    CASE 
-                        WHEN source_node_id = '{selected_node}' THEN source_name
-                        WHEN target_node_id = '{selected_node}' THEN target_name
-                    END as company_name
-                FROM (
-                    SELECT 
-                        s.canonical_name as source_name,
-                        t.canonical_name as target_name,
-                        e.source_node_id,
-                        e.target_node_id
-                    FROM edges e
-                    JOIN nodes s ON e.source_node_id = s.unique_node_id
-                    JOIN nodes t ON e.target_node_id = t.unique_node_id
-                    WHERE e.source_node_id = '{selected_node}' OR e.target_node_id = '{selected_node}'
-                )
-                WHERE company_name IS NOT NULL
-                LIMIT 1
-                """
-                name_df = conn.execute(name_query).df()
-                edge_name = name_df.iloc[0]['company_name'] if not name_df.empty else None
-                if edge_name and edge_name != node_name:
-                    print(f"警告：nodes表与edges表公司名称不一致！nodes: {node_name}, edges: {edge_name}")
-                for col in df.columns:
-                    if col != "unique_node_id":
-                        value = df.iloc[0][col]
-                        if pd.isna(value):
-                            value = "无"
-                        elif isinstance(value, bool):
-                            value = "是" if value else "否"
-                        elif isinstance(value, (int, float)):
-                            value = f"{value:,.2f}" if value != 0 else "0"
-                        details.append({
-                            "属性": column_names.get(col, col),
-                            "值": str(value)
-                        })
-            return dash_table.DataTable(
-                columns=[{"name": "属性", "id": "属性"}, {"name": "值", "id": "值"}],
-                data=details,
-                style_table={"overflowX": "auto"},
-                style_cell={"textAlign": "left", "padding": "10px", "whiteSpace": "normal", "height": "auto"}
-            )
+        # 预先计算的自我网络记录，与公司关系回调共用同一条缓存
+        df = cached_query("ego_network", node_id=selected_node)
+        column_names = {
+            'canonical_name': '公司名称',
+            'former_names': '曾用名',
+            'company_id': '公司编号',
+            'company_class': '公司分类',
+            'is_listed': '是否上市',
+            'stock_code': '股票代码',
+            'industry': '所属行业',
+            'area': '所属地区',
+            'registered_capital': '注册资本',
+            'is_shared_supplier': '是否共享供应商',
+            'shared_degree': '共享度',
+            'supplier_count': '供应商数量',
+            'supplier_hhi': '供应商集中度(HHI)',
+            'supplier_top5_share': '前五大供应商占比',
+            'supplier_max_share': '单一供应商最大占比',
+            'customer_count': '客户数量',
+            'customer_hhi': '客户集中度(HHI)',
+            'customer_top5_share': '前五大客户占比',
+            'customer_max_share': '单一客户最大占比'
+        }
+        details = []
+        if df.empty:
+            logger.info(f"未找到该公司({selected_node})的记录")
+            details.append({"属性": "公司名称", "值": "未知公司"})
+            for col, display_name in column_names.items():
+                if col != 'canonical_name':
+                    details.append({"属性": display_name, "值": "无"})
+        else:
+            record = df.iloc[0]
+            for col, display_name in column_names.items():
+                value = record[col]
+                if pd.isna(value):
+                    value = "无"
+                elif isinstance(value, bool):
+                    value = "是" if value else "否"
+                elif isinstance(value, (int, float)):
+                    value = f"{value:,.2f}" if value != 0 else "0"
+                details.append({
+                    "属性": display_name,
+                    "值": str(value)
+                })
+        return dash_table.DataTable(
+            columns=[{"name": "属性", "id": "属性"}, {"name": "值", "id": "值"}],
+            data=details,
+            style_table={"overflowX": "auto"},
+            style_cell={"textAlign": "left", "padding": "10px", "whiteSpace": "normal", "height": "auto"}
+        )
     except Exception as e:
-        print(f"查询公司详情时发生错误: {e}")
+        logger.error(f"查询公司详情时发生错误: {e}")
         return f"查询出错: {str(e)}"
 
 # 添加回退按钮回调
@@ -660,6 +857,7 @@ def update_company_details(selected_node):
     Output("back-button", "style"),
     Input("selected-node-store", "data")
 )
+@instrumentation.instrument
 def toggle_back_button(selected_node):
     if selected_node:
         return {"display": "block"}
@@ -671,163 +869,133 @@ def toggle_back_button(selected_node):
     Input("back-button", "n_clicks"),
     prevent_initial_call=True
 )
+@instrumentation.instrument
 def clear_selected_node(n_clicks):
     if n_clicks:
         return None
     return None
 
-# 修改公司关系回调，添加入向/出向筛选
+# 公司关系回调：选中公司变化时查询一次该公司各方向的全部关系，
+# 入向/出向和共享供应商筛选由下面的客户端回调完成
 @app.callback(
     [Output("company-relationships-table", "children"),
-     Output("company-relationships-graph", "elements")],
-    [Input("selected-node-store", "data"),
-     Input("relation-direction-store", "data")]
+     Output("company-relationships-store", "data"),
+     Output("node-relationships-store", "data")],
+    Input("selected-node-store", "data")
 )
-def update_company_relationships(selected_node, relation_direction):
+@instrumentation.instrument
+def update_company_relationships(selected_node):
     if not selected_node:
-        return "请选择一个公司查看关系", []
+        return "请选择一个公司查看关系", None, None
     if not check_db_connection():
-        return "数据库连接异常，请刷新页面重试", []
-    print(f"查询公司关系，node_id: {selected_node}, direction: {relation_direction}")
+        return "数据库连接异常，请刷新页面重试", None, None
+    logger.debug(f"查询公司关系，node_id: {selected_node}")
     try:
-        with get_conn() as conn:
-            # 构建方向筛选条件
-            direction_condition = ""
-            if relation_direction == "incoming":
-                direction_condition = "AND direction = '入向'"
-            elif relation_direction == "outgoing":
-                direction_condition = "AND direction = '出向'"
-            
-            query = f"""
-            WITH company_relationships AS (
-                -- 出向关系
-                SELECT 
-                    '出向' AS direction,
-                    t.canonical_name AS connected_company,
-                    e.relationship_type,
-                    e.procurement_amount,
-                    e.revenue,
-                    t.unique_node_id as connected_node_id
-                FROM edges e
-                JOIN nodes t ON e.target_node_id = t.unique_node_id
-                WHERE e.source_node_id = '{selected_node}'
-                UNION ALL
-                -- 入向关系
-                SELECT 
-                    '入向' AS direction,
-                    s.canonical_name AS connected_company,
-                    e.relationship_type,
-                    e.procurement_amount,
-                    e.revenue,
-                    s.unique_node_id as connected_node_id
-                FROM edges e
-                JOIN nodes s ON e.source_node_id = s.unique_node_id
-                WHERE e.target_node_id = '{selected_node}'
-            )
-            SELECT *
-            FROM company_relationships
-            WHERE 1=1 {direction_condition}
-            ORDER BY direction, connected_company
-            """
-            df = conn.execute(query).df()
-            print("公司关系查询结果：", df)
-            
-            if df.empty:
-                print(f"未找到公司关系，direction: {relation_direction}")
-                return "未找到公司关系", []
-            
-            # 构建关系图元素
-            elements = []
-            nodes = set()
-            
-            # 计算节点大小范围
-            max_amount = max(
-                df['procurement_amount'].max() if 'procurement_amount' in df.columns else 0,
-                df['revenue'].max() if 'revenue' in df.columns else 0
-            )
-            min_size = 20
-            max_size = 100
-            
-            # 添加中心节点
-            center_node_query = f"SELECT canonical_name FROM nodes WHERE unique_node_id = '{selected_node}'"
-            center_name = conn.execute(center_node_query).fetchone()
-            center_name = center_name[0] if center_name else selected_node
-            elements.append({
-                "data": {
-                    "id": selected_node,
-                    "label": center_name,
-                    "size": max_size  # 中心节点使用最大尺寸
-                }
-            })
-            nodes.add(selected_node)
-            
-            # 添加关联节点和边
-            for _, row in df.iterrows():
-                if row['connected_node_id'] not in nodes:
-                    # 计算节点大小
-                    amount = max(
-                        row['procurement_amount'] if pd.notna(row['procurement_amount']) else 0,
-                        row['revenue'] if pd.notna(row['revenue']) else 0
-                    )
-                    size = min_size + (max_size - min_size) * (amount / max_amount) if max_amount > 0 else min_size
-                    
-                    elements.append({
-                        "data": {
-                            "id": row['connected_node_id'],
-                            "label": row['connected_company'],
-                            "size": size
-                        }
-                    })
-                    nodes.add(row['connected_node_id'])
-                
-                # 添加边
-                elements.append({
-                    "data": {
-                        "source": selected_node if row['direction'] == '出向' else row['connected_node_id'],
-                        "target": row['connected_node_id'] if row['direction'] == '出向' else selected_node,
-                        "label": row['relationship_type']
-                    }
-                })
-            
-            # 格式化数值
-            for col in ['procurement_amount', 'revenue']:
-                if col in df.columns:
-                    df[col] = df[col].apply(lambda x: f"{x:,.2f}" if pd.notna(x) and x != 0 else "0")
-            
-            # 创建关系数据表
-            table = dash_table.DataTable(
-                columns=[
-                    {"name": "方向", "id": "direction"},
-                    {"name": "关联公司", "id": "connected_company"},
-                    {"name": "关系类型", "id": "relationship_type"},
-                    {"name": "采购金额", "id": "procurement_amount"},
-                    {"name": "收入", "id": "revenue"}
-                ],
-                data=df.to_dict("records"),
-                page_size=10,
-                style_table={"overflowX": "auto"},
-                style_cell={
-                    "textAlign": "left",
-                    "padding": "10px",
-                    "whiteSpace": "normal",
-                    "height": "auto"
-                }
-            )
-            
-            return table, elements
+        # 一次查找取出预先计算的自我网络记录，关系已按 方向、关联公司 排好序
+        df = cached_query("ego_network", node_id=selected_node)
+        node_name = df.iloc[0]["canonical_name"] if not df.empty else None
+        relationships = relationship_frame(df.iloc[0]["relationships"] if not df.empty else None)
+        
+        # 选中公司的关系表格：金额保留数值，是否共享供应商与全部关系表格的口径一致
+        node_df = node_relationship_frame(relationships, selected_node, node_name)
+        shared = (
+            node_df["source_is_shared"].fillna(False).astype(bool)
+            | node_df["target_is_shared"].fillna(False).astype(bool)
+        )
+        node_df["is_shared"] = shared.map({True: "是", False: "否"})
+        for col in ['procurement_amount', 'revenue']:
+            node_df[col] = pd.to_numeric(node_df[col], errors="coerce").fillna(0)
+        node_store = {"rows": node_df.drop(columns=["source_is_shared", "target_is_shared"]).to_dict("records")}
+        
+        if relationships.empty:
+            logger.debug(f"未找到公司关系，node_id: {selected_node}")
+            return "未找到公司关系", None, node_store
+        
+        # 构建关系图元素，中心节点使用最大尺寸，边带有方向供客户端筛选
+        center_name = node_name if pd.notna(node_name) else selected_node
+        elements = relationship_elements(relationships, selected_node, center_name)
+        
+        # 格式化数值
+        df = relationships.drop(columns=["source_is_shared", "target_is_shared"])
+        for col in ['procurement_amount', 'revenue']:
+            df[col] = format_amounts(df[col])
+        
+        company_store = {"center": selected_node, "rows": df.to_dict("records"), "elements": elements}
+        return "", company_store, node_store
     except Exception as e:
-        print(f"查询公司关系时发生错误: {e}")
-        return f"查询出错: {str(e)}", []
+        logger.error(f"查询公司关系时发生错误: {e}")
+        return f"查询出错: {str(e)}", None, None
 
-# 表格点击回调
+# 公司关系的入向/出向筛选（客户端）：筛选已加载的关系行和关系图元素，
+# 关系图只保留中心公司和剩余关系两端的公司
+app.clientside_callback(
+    """
+    function(store, direction) {
+        if (!store) {
+            return [[], [], {"display": "none"}];
+        }
+        var label = {"incoming": "入向", "outgoing": "出向"}[direction];
+        var keep = function(value) { return !label || value === label; };
+        var rows = store.rows.filter(function(row) { return keep(row.direction); });
+        var edges = store.elements.filter(function(element) {
+            return element.data.source !== undefined && keep(element.data.direction);
+        });
+        var connected = {};
+        connected[store.center] = true;
+        edges.forEach(function(element) {
+            connected[element.data.source] = true;
+            connected[element.data.target] = true;
+        });
+        var nodes = store.elements.filter(function(element) {
+            return element.data.source === undefined && connected[element.data.id];
+        });
+        return [rows, nodes.concat(edges), {"display": "block"}];
+    }
+    """,
+    [Output("company-relationships-datatable", "data"),
+     Output("company-relationships-graph", "elements"),
+     Output("company-relationships-table-container", "style")],
+    [Input("company-relationships-store", "data"),
+     Input("relation-direction-store", "data")]
+)
+
+# 选中公司关系表格的共享供应商筛选（客户端）
+app.clientside_callback(
+    """
+    function(store, supplierFilter) {
+        if (!store) {
+            return [];
+        }
+        if (supplierFilter === "shared") {
+            return store.rows.filter(function(row) { return row.is_shared === "是"; });
+        }
+        if (supplierFilter === "non-shared") {
+            return store.rows.filter(function(row) { return row.is_shared === "否"; });
+        }
+        return store.rows;
+    }
+    """,
+    Output("node-relationships-table", "data"),
+    [Input("node-relationships-store", "data"),
+     Input("supplier-filter", "value")]
+)
+
+# 表格点击回调：全部关系表格按当前页数据，选中公司的关系表格按排序、筛选后当前页显示的数据
 @app.callback(
     Output("selected-node-store", "data"),
-    Input("relationships-table", "active_cell"),
-    Input("relationships-table", "data")
+    [Input("relationships-table", "active_cell"),
+     Input("node-relationships-table", "active_cell")],
+    [State("relationships-table", "data"),
+     State("node-relationships-table", "derived_viewport_data")]
 )
-def update_selected_node_from_table(active_cell, data):
-    if not active_cell:
-        return None
+@instrumentation.instrument
+def update_selected_node_from_table(active_cell, node_active_cell, data, node_data):
+    ctx = dash.callback_context
+    if ctx.triggered and ctx.triggered[0]["prop_id"].startswith("node-relationships-table."):
+        active_cell, data = node_active_cell, node_data
+    # 翻页只替换当前页数据，不应改变选中公司
+    if not active_cell or not data or active_cell["row"] >= len(data):
+        return dash.no_update
     
     row = data[active_cell["row"]]
     if active_cell["column_id"] == "source_name":
@@ -836,16 +1004,40 @@ def update_selected_node_from_table(active_cell, data):
         return row["target_node_id"]
     return None
 
+# 公司检索回调
+@app.callback(
+    Output("company-search", "options"),
+    Input("company-search", "search_value"),
+    prevent_initial_call=True
+)
+@instrumentation.instrument
+def update_company_search_options(search_value):
+    if not search_value:
+        return dash.no_update
+    return get_name_index().dropdown_options(search_value, k=10)
+
+@app.callback(
+    Output("selected-node-store", "data", allow_duplicate=True),
+    Input("company-search", "value"),
+    prevent_initial_call=True
+)
+@instrumentation.instrument
+def update_selected_node_from_search(node_id):
+    if not node_id:
+        return dash.no_update
+    return node_id
+
 # 图形点击回调
 @app.callback(
     Output("selected-node-store", "data", allow_duplicate=True),
     Input("network-graph", "tapNodeData"),
     prevent_initial_call=True
 )
+@instrumentation.instrument
 def update_selected_node_from_graph(node_data):
     if not node_data:
         return None
-    print(f"节点点击事件触发，节点数据: {node_data}")
+    logger.debug(f"节点点击事件触发，节点数据: {node_data}")
     return node_data["id"]
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 节点大小范围（像素），按关联金额线性缩放
+MIN_NODE_SIZE = 20
+MAX_NODE_SIZE = 100
+
+
+def scale_node_sizes(df: pd.DataFrame) -> np.ndarray:
+    """按每行的关联金额计算节点大小
+
+    关联金额取采购金额和收入中较大者（缺失按 0 计），按两列的最大值线性
+    缩放到 [MIN_NODE_SIZE, MAX_NODE_SIZE]；最大值不为正时都取最小尺寸。
+    """
+    columns = [col for col in ('procurement_amount', 'revenue') if col in df.columns]
+    if not columns or df.empty:
+        return np.full(len(df), float(MIN_NODE_SIZE))
+    values = np.column_stack([
+        pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan) for col in columns
+    ])
+    max_amount = np.nanmax(values) if not np.isnan(values).all() else 0.0
+    if not max_amount > 0:
+        return np.full(len(df), float(MIN_NODE_SIZE))
+    amounts = np.nan_to_num(values, nan=0.0).max(axis=1)
+    return MIN_NODE_SIZE + (MAX_NODE_SIZE - MIN_NODE_SIZE) * (amounts / max_amount)
+
+
+def format_amounts(values: pd.Series) -> pd.Series:
+    """金额格式化为带千分位的两位小数，缺失和 0 显示为 "0" """
+    numbers = pd.to_numeric(values, errors='coerce')
+    formatted = numbers.map('{:,.2f}'.format, na_action='ignore')
+    return formatted.where(numbers.notna() & (numbers != 0), '0').astype(object)
+
+
+def column_values(df: pd.DataFrame, column: str) -> np.ndarray:
+    """取出一列为 object 数组，缺失值统一为 None，避免逐元素访问 Arrow 字符串列"""
+    return df[column].to_numpy(dtype=object, na_value=None)
+
+
+def shared_flags(df: pd.DataFrame, column: str) -> np.ndarray:
+    """取出共享供应商标记列为布尔数组，缺失（或没有该列）按否处理"""
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    return df[column].to_numpy(dtype=object, na_value=False).astype(bool)
+
+
+def to_elements(**columns: np.ndarray) -> List[Dict]:
+    """按列批量生成 Cytoscape 元素 [{"data": {列名: 值, ...}}, ...]"""
+    names = list(columns)
+    return [{'data': dict(zip(names, row))} for row in zip(*(values.tolist() for values in columns.values()))]
+
+
+def subgraph_elements(edges_df: pd.DataFrame, nodes_df: Optional[pd.DataFrame] = None) -> List[Dict]:
+    """由渐进式图形的关系查询结果（每行一条关系）构建 Cytoscape 元素
+
+    节点和边都带有稳定的 id（边为 "源->目标"），多次加载的结果可以按 id 合并。
+    节点带有 is_shared，边带有 source_is_shared、target_is_shared，供客户端
+    按共享供应商筛选。
+
+    Args:
+        edges_df (pd.DataFrame): 含 source_node_id、source_name、source_is_shared、
+            target_node_id、target_name、target_is_shared、procurement_amount、revenue
+        nodes_df (pd.DataFrame, optional): 额外的公司（unique_node_id、canonical_name、
+            is_shared），如初始图形中没有关系的公司
+
+    Returns:
+        List[Dict]: 先节点后边的元素列表
+    """
+    frames = []
+    if not edges_df.empty:
+        sizes = scale_node_sizes(edges_df)
+        frames.append(pd.DataFrame({
+            'id': np.column_stack([
+                column_values(edges_df, 'source_node_id'), column_values(edges_df, 'target_node_id')
+            ]).ravel(),
+            'label': np.column_stack([
+                column_values(edges_df, 'source_name'), column_values(edges_df, 'target_name')
+            ]).ravel(),
+            'size': np.repeat(sizes, 2),
+            'is_shared': np.column_stack([
+                shared_flags(edges_df, 'source_is_shared'), shared_flags(edges_df, 'target_is_shared')
+            ]).ravel()
+        }))
+    if nodes_df is not None and not nodes_df.empty:
+        frames.append(pd.DataFrame({
+            'id': column_values(nodes_df, 'unique_node_id'),
+            'label': column_values(nodes_df, 'canonical_name'),
+            'size': np.full(len(nodes_df), float(MIN_NODE_SIZE)),
+            'is_shared': shared_flags(nodes_df, 'is_shared')
+        }))
+    if not frames:
+        return []
+    nodes = pd.concat(frames, ignore_index=True).dropna(subset=['id']).drop_duplicates('id')
+    elements = to_elements(
+        id=nodes['id'].to_numpy(),
+        label=nodes['label'].to_numpy(),
+        size=nodes['size'].to_numpy(),
+        is_shared=nodes['is_shared'].to_numpy()
+    )
+    if edges_df.empty:
+        return elements
+
+    edges = pd.DataFrame({
+        'source': column_values(edges_df, 'source_node_id'),
+        'target': column_values(edges_df, 'target_node_id'),
+        'source_is_shared': shared_flags(edges_df, 'source_is_shared'),
+        'target_is_shared': shared_flags(edges_df, 'target_is_shared')
+    }).dropna().drop_duplicates(['source', 'target'])
+    source, target = edges['source'].to_numpy(), edges['target'].to_numpy()
+    return elements + to_elements(
+        id=source + '->' + target,
+        source=source,
+        target=target,
+        source_is_shared=edges['source_is_shared'].to_numpy(),
+        target_is_shared=edges['target_is_shared'].to_numpy()
+    )
+
+
+def merge_elements(current: List[Dict], new: List[Dict]) -> Tuple[List[Dict], int]:
+    """把新加载的元素按 id 合并到已有元素之后，已有元素（含位置）保持不变
+
+    Returns:
+        Tuple[List[Dict], int]: 合并后的元素和实际新增的元素数
+    """
+    seen = {element['data'].get('id') for element in current}
+    added = [element for element in new if element['data'].get('id') not in seen]
+    return current + added, len(added)
+
+
+def count_elements(elements: List[Dict]) -> Tuple[int, int]:
+    """元素中的节点数和边数"""
+    edges = sum(1 for element in elements if 'source' in element['data'])
+    return len(elements) - edges, edges
+
+
+def relationship_elements(df: pd.DataFrame, center_id: str, center_name: str) -> List[Dict]:
+    """由公司的关系（ego_network.relationship_frame 的结果）构建以选中公司为中心的元素
+
+    Args:
+        df (pd.DataFrame): 含 direction、connected_company、connected_node_id、
+            relationship_type、procurement_amount、revenue
+        center_id (str): 选中公司的节点ID
+        center_name (str): 选中公司名称
+
+    Returns:
+        List[Dict]: 中心节点、关联节点和边，边带有 direction（出向/入向）供客户端按方向筛选
+    """
+    center = [{'data': {'id': center_id, 'label': center_name, 'size': MAX_NODE_SIZE}}]
+    if df.empty:
+        return center
+    sizes = scale_node_sizes(df)
+    connected = column_values(df, 'connected_node_id')
+
+    # 关联公司按首次出现去重，排除中心公司自身（自环）
+    keep = ~pd.Index(connected).duplicated() & (connected != center_id)
+
+    directions = column_values(df, 'direction')
+    outgoing = directions == '出向'
+    center_ids = np.full(len(df), center_id, dtype=object)
+    return (
+        center
+        + to_elements(id=connected[keep], label=column_values(df, 'connected_company')[keep], size=sizes[keep])
+        + to_elements(
+            source=np.where(outgoing, center_ids, connected),
+            target=np.where(outgoing, connected, center_ids),
+            label=column_values(df, 'relationship_type'),
+            direction=directions
+        )
+    )
@@ -0,0 +1,219 @@
+import logging
+from contextlib import ExitStack
+from datetime import date
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from queries import record_batches
+
+logger = logging.getLogger(__name__)
+
+# 输出格式：MIME 类型和下载文件扩展名
+FORMATS = {
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+DIRECTIONS = ('all', 'incoming', 'outgoing')
+SUPPLIER_FILTERS = ('all', 'shared', 'non-shared')
+
+# k 跳子图的最大跳数
+MAX_HOPS = 4
+
+# DuckDB 每次取出、写入响应的行数
+BATCH_ROWS = 65536
+
+
+class _ChunkSink:
+    """供 Arrow/Parquet 写入器写入的内存文件，每写完一批取出已编码的字节发送"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self.chunks.append(chunk)
+        self.position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def encode_batches(schema: pa.Schema, batches: Iterator[pa.RecordBatch], output_format: str) -> Iterator[bytes]:
+    """把 Arrow 批次逐批编码为 Arrow IPC 流或 Parquet（每批一个行组）
+
+    Args:
+        schema (pa.Schema): 结果的列结构
+        batches (Iterator[pa.RecordBatch]): queries.record_batches 返回的批次
+        output_format (str): 'arrow' 或 'parquet'
+
+    Returns:
+        Iterator[bytes]: 响应内容的各段
+    """
+    sink = _ChunkSink()
+    if output_format == 'parquet':
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+        writer.close()
+        yield sink.drain()
+    finally:
+        batches.close()
+
+
+def _node_ids(request) -> List[str]:
+    """节点ID：查询参数 id 可重复，POST 时也可在 JSON 请求体的 id 中给出列表"""
+    node_ids = request.args.getlist('id')
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        ids = body.get('id', [])
+        node_ids += [ids] if isinstance(ids, str) else list(ids)
+    return [str(node_id) for node_id in node_ids]
+
+
+def _choice(request, name: str, choices, default: str) -> str:
+    value = request.args.get(name, default)
+    if value not in choices:
+        raise ValueError(f"{name} 应为 {', '.join(choices)} 之一")
+    return value
+
+
+def _number(request, name: str, convert: Callable, minimum=None):
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        number = convert(value)
+    except ValueError:
+        raise ValueError(f"{name} 不是有效的数值: {value}")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{name} 不能小于 {minimum}")
+    return number
+
+
+def _date(request, name: str) -> Optional[date]:
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} 应为 YYYY-MM-DD 格式的日期: {value}")
+
+
+def register_data_endpoints(
+    server,
+    get_conn: Callable,
+    route_prefix: str = '/api/data',
+    batch_rows: int = BATCH_ROWS
+):
+    """在 Flask 服务上注册批量数据接口，结果直接由 DuckDB 的 Arrow 输出流式编码
+
+    GET {route_prefix}/nodes?id=...          公司详情及集中度指标，不给 id 时返回全部公司
+    GET {route_prefix}/neighbours?id=...     直接相连的关系，direction=all|incoming|outgoing
+    GET {route_prefix}/subgraph?id=...       hops 步（1 至 MAX_HOPS，默认 2）内经过的关系
+    GET {route_prefix}/edges                 按 relationship_type、min_flow（采购金额和收入中
+                                             较大者）、since、until（公告日期）扫描关系
+
+    id 可重复给出多个，也可 POST JSON {"id": [...]}。关系接口都支持
+    supplier_filter=all|shared|non-shared；全部接口支持 format=arrow（Arrow IPC 流，
+    默认）或 parquet，以及 limit（最多返回的行数）。参数错误返回 400 和 JSON 错误信息。
+
+    Args:
+        server (flask.Flask): Dash 应用的 Flask 服务 (app.server)
+        get_conn (Callable): 借出数据库游标的上下文管理器工厂，如 DuckDBPool.cursor
+        route_prefix (str): 接口路径前缀
+        batch_rows (int): 每批行数
+    """
+    from flask import Response, jsonify, request
+
+    def stream(name: str, params: Dict):
+        try:
+            output_format = _choice(request, 'format', tuple(FORMATS), 'arrow')
+            limit = _number(request, 'limit', int, minimum=0)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # 先执行查询，出错时还能返回错误状态码；游标在响应发送完（或客户端断开）后归还
+        resources = ExitStack()
+        try:
+            conn = resources.enter_context(get_conn())
+            schema, batches = record_batches(conn, name, params, batch_rows, limit)
+        except Exception as e:
+            resources.close()
+            logger.error(f"数据接口查询 {name} 失败: {e}")
+            return jsonify({'error': str(e)}), 503
+        mimetype, extension = FORMATS[output_format]
+        response = Response(encode_batches(schema, batches, output_format), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename={name}.{extension}'
+        response.call_on_close(resources.close)
+        return response
+
+    def endpoint(build_params: Callable[[], Dict], name: str):
+        def view():
+            try:
+                params = build_params()
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return stream(name, params)
+        return view
+
+    def required_ids() -> List[str]:
+        node_ids = _node_ids(request)
+        if not node_ids:
+            raise ValueError("缺少参数 id")
+        return node_ids
+
+    def node_params() -> Dict:
+        return {'node_ids': _node_ids(request)}
+
+    def neighbour_params() -> Dict:
+        return {
+            'node_ids': required_ids(),
+            'direction': _choice(request, 'direction', DIRECTIONS, 'all'),
+            'supplier_filter': _choice(request, 'supplier_filter', SUPPLIER_FILTERS, 'all'),
+        }
+
+    def subgraph_params() -> Dict:
+        hops = _number(request, 'hops', int, minimum=1)
+        return dict(neighbour_params(), hops=min(hops or 2, MAX_HOPS))
+
+    def edge_params() -> Dict:
+        return {
+            'supplier_filter': _choice(request, 'supplier_filter', SUPPLIER_FILTERS, 'all'),
+            'relationship_type': request.args.get('relationship_type') or None,
+            'min_flow': _number(request, 'min_flow', float),
+            'since': _date(request, 'since'),
+            'until': _date(request, 'until'),
+        }
+
+    for route, build_params, name in [
+        ('nodes', node_params, 'data_nodes'),
+        ('neighbours', neighbour_params, 'data_neighbours'),
+        ('subgraph', subgraph_params, 'data_subgraph'),
+        ('edges', edge_params, 'data_edges'),
+    ]:
+        server.add_url_rule(
+            f'{route_prefix}/{route}', name, endpoint(build_params, name), methods=['GET', 'POST']
+        )
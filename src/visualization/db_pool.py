@@ -0,0 +1,201 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Tuple
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+# 数据库文件挂载到内存实例上的名称
+CATALOG_ALIAS = 'supply_chain'
+
+
+class _Generation:
+    """一次打开的数据库连接，数据库文件被替换后旧连接退役"""
+
+    def __init__(self, number: int, conn: duckdb.DuckDBPyConnection, file_id: Optional[Tuple], version: str):
+        self.number = number
+        self.conn = conn
+        self.file_id = file_id
+        self.version = version
+        self.active = 0
+        self.retired = False
+
+
+class DuckDBPool:
+    """进程内共享的只读 DuckDB 连接
+
+    整个进程只打开一个只读连接（目录元数据只读取一次），每个线程复用自己
+    的游标 (conn.cursor())，请求中不再新建连接。后台线程定期检查数据库
+    文件是否被替换（inode/修改时间/大小变化）并执行 SELECT 1 健康检查；
+    文件被替换时打开新连接，旧连接等所有借出的游标归还后再关闭，正在
+    执行的查询不受影响。
+
+    同一进程内 duckdb.connect 同一路径会复用已打开的数据库实例，即使文件
+    已被替换也仍然读取旧文件，因此每一代连接都是新的内存实例，再以只读
+    方式 ATTACH 数据库文件。
+
+    后台回调在 fork 出的子进程中执行，子进程不能使用父进程的连接和锁，
+    fork 后在子进程中丢弃继承的状态并重新连接。
+    """
+
+    def __init__(self, db_path, check_interval: float = 5.0):
+        """
+        Args:
+            db_path (str | Path): DuckDB 数据库文件路径
+            check_interval (float): 后台检查间隔（秒）
+        """
+        self.db_path = Path(db_path)
+        self.check_interval = check_interval
+        self.healthy = False
+        self.last_error: Optional[str] = None
+        self._current: Optional[_Generation] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inherited: Optional[_Generation] = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        self.check_health()
+
+    @property
+    def generation(self) -> int:
+        """当前连接的代数，每次数据库文件被替换后加一；未连接时为 0"""
+        current = self._current
+        return current.number if current is not None else 0
+
+    @property
+    def version(self) -> str:
+        """当前数据库的网络版本（build_meta.graph_version），未连接时为空字符串"""
+        current = self._current
+        return current.version if current is not None else ''
+
+    def _file_id(self) -> Tuple:
+        stat = os.stat(self.db_path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> bool:
+        """检查数据库文件是否被替换，必要时切换到新连接
+
+        Returns:
+            bool: 是否打开了新连接
+        """
+        file_id = self._file_id()
+        current = self._current
+        if current is not None and current.file_id == file_id:
+            return False
+        conn = duckdb.connect(':memory:')
+        try:
+            conn.execute(f"ATTACH '{self.db_path.resolve()}' AS {CATALOG_ALIAS} (READ_ONLY)")
+            conn.execute(f"USE {CATALOG_ALIAS}")
+            # 旧版本导出的数据库没有 build_meta，以文件标识作为版本
+            tables = {row[0] for row in conn.execute("SHOW TABLES").fetchall()}
+            if 'build_meta' in tables:
+                version = conn.execute("SELECT graph_version FROM build_meta").fetchone()[0]
+            else:
+                version = '-'.join(str(part) for part in file_id)
+        except Exception:
+            conn.close()
+            raise
+        with self._lock:
+            old = self._current
+            self._current = _Generation(old.number + 1 if old else 1, conn, file_id, version)
+            if old is not None:
+                old.retired = True
+                self._close_if_idle(old)
+        logger.info(f"已连接数据库 {self.db_path} (第 {self._current.number} 代)")
+        return True
+
+    def check_health(self):
+        """检查文件替换并执行 SELECT 1，失败时下次检查强制重连"""
+        try:
+            self.refresh()
+            with self.cursor() as cursor:
+                cursor.execute("SELECT 1").fetchone()
+            if not self.healthy:
+                logger.info("数据库连接正常")
+            self.healthy = True
+            self.last_error = None
+        except Exception as e:
+            if self.healthy or self.last_error != str(e):
+                logger.warning(f"数据库健康检查失败: {e}")
+            self.healthy = False
+            self.last_error = str(e)
+            current = self._current
+            if current is not None:
+                current.file_id = None
+
+    def start(self):
+        """启动后台检查线程"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.check_interval):
+                self.check_health()
+
+        self._thread = threading.Thread(target=run, name='duckdb-health-check', daemon=True)
+        self._thread.start()
+
+    def _after_fork(self):
+        """fork 出的子进程中重置状态并重新连接
+
+        继承的连接只保留引用而不关闭：关闭时 DuckDB 会等待只存在于父进程中的线程。
+        后台检查线程也不会被继承，子进程只在创建时检查一次。
+        """
+        self._inherited = self._current
+        self._current = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._thread = None
+        self.check_health()
+
+    def _close_if_idle(self, generation: _Generation):
+        """关闭没有借出游标的退役连接（调用方持有锁）"""
+        if generation.retired and generation.active == 0:
+            try:
+                generation.conn.close()
+            except Exception as e:
+                logger.warning(f"关闭旧数据库连接失败: {e}")
+
+    @contextmanager
+    def cursor(self):
+        """借出当前线程的游标
+
+        用法与原来的 duckdb.connect 相同: with pool.cursor() as conn: conn.execute(...)
+        退出 with 时游标归还给线程缓存，不关闭。
+        """
+        with self._lock:
+            generation = self._current
+            if generation is None:
+                raise duckdb.ConnectionException(f"数据库未连接: {self.last_error or self.db_path}")
+            generation.active += 1
+        try:
+            cached = getattr(self._local, 'cursor', None)
+            if cached is None or cached[0] is not generation:
+                if cached is not None:
+                    try:
+                        cached[1].close()
+                    except Exception:
+                        pass
+                cursor = generation.conn.cursor()
+                cursor.execute(f"USE {CATALOG_ALIAS}")
+                self._local.cursor = (generation, cursor)
+            yield self._local.cursor[1]
+        finally:
+            with self._lock:
+                generation.active -= 1
+                self._close_if_idle(generation)
+
+    def close(self):
+        """停止后台线程并关闭连接"""
+        self._stop.set()
+        with self._lock:
+            if self._current is not None:
+                self._current.retired = True
+                self._close_if_idle(self._current)
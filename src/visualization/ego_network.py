@@ -0,0 +1,67 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from cytoscape_elements import column_values
+
+# 自我网络记录中每条关系的字段（ego_networks.relationships 的结构体字段），
+# 见 network/supply_chain_network.py 的 export_to_duckdb
+RELATIONSHIP_FIELDS = [
+    'direction',
+    'connected_company',
+    'relationship_type',
+    'procurement_amount',
+    'revenue',
+    'connected_node_id',
+    'source_is_shared',
+    'target_is_shared'
+]
+
+
+def relationship_frame(relationships) -> pd.DataFrame:
+    """把记录中的关系列表转换为每条关系一行的 DataFrame
+
+    Args:
+        relationships: 查询结果中 relationships 列的值（字典数组），没有关系的公司为缺失值
+
+    Returns:
+        pd.DataFrame: 列为 RELATIONSHIP_FIELDS，保持记录中 方向、关联公司 的顺序
+    """
+    if relationships is None or (np.ndim(relationships) == 0 and pd.isna(relationships)):
+        relationships = []
+    df = pd.DataFrame.from_records(list(relationships), columns=RELATIONSHIP_FIELDS)
+    # 整列缺失时 from_records 得到 object 列，统一为浮点数
+    for col in ['procurement_amount', 'revenue']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    return df
+
+
+def node_relationship_frame(df: pd.DataFrame, center_id: str, center_name: Optional[str]) -> pd.DataFrame:
+    """把以选中公司为中心的关系换算为 源公司-目标公司 的形式，供选中公司的关系表格使用
+
+    Args:
+        df (pd.DataFrame): relationship_frame 的结果
+        center_id (str): 选中公司的节点ID
+        center_name (str): 选中公司名称
+
+    Returns:
+        pd.DataFrame: 含 source_name、target_name、source_node_id、target_node_id、
+            relationship_type、procurement_amount、revenue、source_is_shared、target_is_shared
+    """
+    outgoing = column_values(df, 'direction') == '出向'
+    connected_ids = column_values(df, 'connected_node_id')
+    connected_names = column_values(df, 'connected_company')
+    center_ids = np.full(len(df), center_id, dtype=object)
+    center_names = np.full(len(df), center_name, dtype=object)
+    return pd.DataFrame({
+        'source_name': np.where(outgoing, center_names, connected_names),
+        'target_name': np.where(outgoing, connected_names, center_names),
+        'source_node_id': np.where(outgoing, center_ids, connected_ids),
+        'target_node_id': np.where(outgoing, connected_ids, center_ids),
+        'relationship_type': column_values(df, 'relationship_type'),
+        'procurement_amount': df['procurement_amount'].to_numpy(),
+        'revenue': df['revenue'].to_numpy(),
+        'source_is_shared': column_values(df, 'source_is_shared'),
+        'target_is_shared': column_values(df, 'target_is_shared')
+    })
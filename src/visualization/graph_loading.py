@@ -0,0 +1,133 @@
+import logging
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 执行命名查询的函数，签名同 query(name, **params) -> pd.DataFrame，
+# 看板中传入带缓存的 cached_query
+QueryRunner = Callable[..., pd.DataFrame]
+
+# 每条新关系最多带来的元素数：加载更多时两端可能都是新节点；
+# 展开时一端已在图中
+ELEMENTS_PER_PAGE_EDGE = 3
+ELEMENTS_PER_EXPANDED_EDGE = 2
+
+
+def edge_budget(element_count: int, max_elements: int, page_edges: int, elements_per_edge: int) -> int:
+    """本次最多加载的关系数，保证合并后的元素总数不超过 max_elements
+
+    Args:
+        element_count (int): 图中已有的元素数
+        max_elements (int): 元素总数上限
+        page_edges (int): 每次加载的关系数
+        elements_per_edge (int): 每条关系最多带来的元素数
+
+    Returns:
+        int: 关系数，为 0 时表示已达上限
+    """
+    return max(min(page_edges, (max_elements - element_count) // elements_per_edge), 0)
+
+
+def initial_subgraph(
+    query: QueryRunner,
+    node_limit: int,
+    edge_limit: int
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """初始图形：流量最大的 node_limit 家公司及其之间流量最大的 edge_limit 条关系
+
+    加载的元素不按共享供应商筛选，筛选在浏览器中完成。
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: (关系, 公司)，公司中也包含子图内没有关系的孤立公司
+    """
+    nodes = query('graph_top_nodes', node_limit=node_limit)
+    if nodes.empty:
+        return nodes.iloc[0:0], nodes
+    edges = query(
+        'graph_induced_edges',
+        node_ids=nodes['unique_node_id'].tolist(),
+        edge_limit=edge_limit
+    )
+    return edges, nodes
+
+
+def expand_neighbourhood(
+    query: QueryRunner,
+    node_id: str,
+    hops: int,
+    edge_limit: int,
+    on_hop: Optional[Callable[[int], None]] = None
+) -> pd.DataFrame:
+    """逐跳展开公司的 k 跳邻域，共取不超过 edge_limit 条关系
+
+    每一跳只查询与上一跳新发现的公司相连、且另一端不在更早各跳中的关系，
+    同一跳内流量大的关系优先；额度用完时提前结束。
+
+    Args:
+        query (QueryRunner): 执行命名查询的函数
+        node_id (str): 被点击的公司节点ID
+        hops (int): 展开的跳数
+        edge_limit (int): 关系数上限
+        on_hop (Callable[[int], None], optional): 开始查询每一跳前调用，参数为跳数
+            （从 1 开始），用于报告进度
+
+    Returns:
+        pd.DataFrame: 邻域内的关系，列同 queries.GRAPH_EDGE_COLUMNS
+    """
+    frontier, visited = [node_id], []
+    frames = []
+    remaining = edge_limit
+    for hop in range(1, max(int(hops), 1) + 1):
+        if remaining <= 0 or not frontier:
+            break
+        if on_hop is not None:
+            on_hop(hop)
+        edges = query(
+            'graph_neighbour_edges',
+            node_ids=frontier,
+            visited_ids=visited,
+            edge_limit=remaining
+        )
+        if edges.empty:
+            break
+        frames.append(edges)
+        remaining -= len(edges)
+        visited = visited + frontier
+        reached = pd.unique(pd.concat([edges['source_node_id'], edges['target_node_id']]).dropna())
+        known = set(visited)
+        frontier = sorted(node for node in reached if node not in known)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def next_edge_page(
+    query: QueryRunner,
+    after: Optional[List],
+    edge_limit: int
+) -> Tuple[pd.DataFrame, Optional[List]]:
+    """按流量降序取下一页关系
+
+    Args:
+        query (QueryRunner): 执行命名查询的函数
+        after (List): 上一页最后一条关系的 [流量, 源节点ID, 目标节点ID]，第一页为 None
+        edge_limit (int): 关系数
+
+    Returns:
+        Tuple[pd.DataFrame, Optional[List]]: 这一页的关系和下一页的 after；
+            after 为 None 表示已没有更多关系
+    """
+    after_flow, after_source, after_target = after if after else (float('inf'), '', '')
+    edges = query(
+        'graph_edge_page',
+        after_flow=float(after_flow),
+        after_source=after_source,
+        after_target=after_target,
+        edge_limit=edge_limit
+    )
+    if len(edges) < edge_limit:
+        return edges, None
+    last = edges.iloc[-1]
+    return edges, [float(last['flow']), last['source_node_id'], last['target_node_id']]
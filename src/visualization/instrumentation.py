@@ -0,0 +1,284 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import diskcache
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 汇总的分位数
+QUANTILES = (0.5, 0.9, 0.99)
+
+# 各类指标的字段及单位，用于 /metrics 的指标名
+FIELDS = {
+    'callback': ('wall_ms', 'request_ms', 'payload_bytes'),
+    'query': ('wall_ms', 'db_ms', 'rows'),
+}
+
+
+class RollingHistogram:
+    """最近 window 个样本的滚动分位数，以及进程启动以来的累计次数和总和"""
+
+    def __init__(self, window: int = 2048):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def summary(self) -> Dict:
+        """count、sum、max 为累计值，mean 和各分位数只统计滚动窗口内的样本"""
+        window = np.fromiter(self.samples, dtype=float, count=len(self.samples))
+        summary = {'count': self.count, 'sum': round(self.total, 3), 'max': round(self.max, 3)}
+        if len(window):
+            summary['mean'] = round(float(window.mean()), 3)
+            for q, value in zip(QUANTILES, np.quantile(window, QUANTILES)):
+                summary[f'p{int(q * 100)}'] = round(float(value), 3)
+        return summary
+
+
+class Instrumentation:
+    """看板回调和查询的耗时统计
+
+    每个回调记录函数耗时 (wall_ms)、HTTP 请求耗时 (request_ms) 和响应字节数
+    (payload_bytes)；每个查询记录总耗时 (wall_ms)、DuckDB 执行耗时 (db_ms，
+    不含转换为 DataFrame) 和行数 (rows)。每项指标保留滚动窗口内的分位数。
+
+    超过 slow_query_ms 的查询放入慢查询列表，并在后台线程中用 EXPLAIN ANALYZE
+    重新执行一次，记录各算子的实际耗时；同一查询和参数在 profile_interval
+    秒内只分析一次。
+
+    后台回调在 fork 出的子进程中执行，子进程的样本和查询写入磁盘队列
+    (diskcache)，由主进程在读取统计时合并，慢查询也由主进程分析。
+    """
+
+    def __init__(
+        self,
+        slow_query_ms: float = 200.0,
+        window: int = 2048,
+        max_slow_queries: int = 50,
+        profile: Optional[Callable[[str, Dict], str]] = None,
+        profile_interval: float = 60.0,
+        inbox_directory: Optional[str] = None
+    ):
+        """
+        Args:
+            slow_query_ms (float): 慢查询阈值（毫秒）
+            window (int): 每项指标的滚动窗口样本数
+            max_slow_queries (int): 保留的慢查询条数
+            profile (Callable[[str, Dict], str], optional): 对 SQL 和参数执行
+                EXPLAIN ANALYZE 并返回计划文本的函数，为 None 时不分析
+            profile_interval (float): 同一慢查询两次分析的最短间隔（秒）
+            inbox_directory (str, optional): 子进程样本的磁盘队列目录，为 None 时
+                子进程的样本丢弃
+        """
+        self.slow_query_ms = slow_query_ms
+        self.window = window
+        self.profile = profile
+        self.profile_interval = profile_interval
+        self.slow_queries = deque(maxlen=max_slow_queries)
+        self._series: Dict[Tuple[str, str, str], RollingHistogram] = {}
+        self._profiled: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._profiler = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-profile')
+        self._pid = os.getpid()
+        self._inbox = None
+        if inbox_directory is not None:
+            self._inbox = diskcache.Deque(directory=str(inbox_directory), maxlen=100000)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        """子进程不能使用继承的锁，重新创建；子进程只写磁盘队列，不分析慢查询"""
+        self._lock = threading.Lock()
+
+    @property
+    def in_child(self) -> bool:
+        """是否在 fork 出的子进程（后台回调）中"""
+        return os.getpid() != self._pid
+
+    def record(self, kind: str, name: str, **values: float):
+        """记录一个样本，如 record('query', 'company_details', wall_ms=3.2, db_ms=2.9, rows=1)"""
+        if self.in_child:
+            if self._inbox is not None:
+                self._inbox.append(('record', kind, name, values))
+            return
+        with self._lock:
+            for field, value in values.items():
+                key = (kind, name, field)
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = RollingHistogram(self.window)
+                series.add(float(value))
+
+    def _add_slow_query(self, entry: Dict):
+        with self._lock:
+            self.slow_queries.append(entry)
+
+    def _drain_inbox(self):
+        """合并子进程写入磁盘队列的样本和查询"""
+        if self._inbox is None or self.in_child:
+            return
+        while True:
+            try:
+                item = self._inbox.popleft()
+            except IndexError:
+                break
+            if item[0] == 'record':
+                self.record(item[1], item[2], **item[3])
+            else:
+                self.observe_query(*item[1:])
+
+    def observe_query(self, name: str, sql: str, params: Dict, db_ms: float, wall_ms: float, rows: int):
+        """queries 模块的查询观察者，见 queries.add_query_observer"""
+        if self.in_child:
+            if self._inbox is not None:
+                self._inbox.append(('query', name, sql, params, db_ms, wall_ms, rows))
+            return
+        self.record('query', name, wall_ms=wall_ms, db_ms=db_ms, rows=rows)
+        if wall_ms < self.slow_query_ms:
+            return
+        entry = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'query': name,
+            'params': json.loads(json.dumps(params, default=str)),
+            'wall_ms': round(wall_ms, 3),
+            'db_ms': round(db_ms, 3),
+            'rows': rows,
+            'profile': None,
+        }
+        signature = json.dumps([name, entry['params']], sort_keys=True)
+        now = time.monotonic()
+        with self._lock:
+            last = self._profiled.get(signature)
+            should_profile = self.profile is not None and (last is None or now - last >= self.profile_interval)
+            if should_profile:
+                self._profiled[signature] = now
+        logger.warning(f"慢查询 {name} {wall_ms:.1f} ms（DuckDB {db_ms:.1f} ms，{rows} 行）")
+        if not should_profile:
+            self._add_slow_query(entry)
+            return
+
+        def run_profile():
+            try:
+                entry['profile'] = self.profile(sql, params)
+            except Exception as e:
+                entry['profile'] = f"分析失败: {e}"
+            self._add_slow_query(entry)
+
+        self._profiler.submit(run_profile)
+
+    def instrument(self, func: Callable) -> Callable:
+        """回调耗时装饰器，放在 @app.callback 之下"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record('callback', func.__name__, wall_ms=(time.perf_counter() - start_time) * 1000)
+        return wrapper
+
+    def snapshot(self) -> Dict:
+        """全部指标的汇总和慢查询列表（新的在前）"""
+        self._drain_inbox()
+        with self._lock:
+            series = {key: histogram.summary() for key, histogram in self._series.items()}
+            slow_queries = list(reversed(self.slow_queries))
+        metrics: Dict[str, Dict] = {}
+        for (kind, name, field), summary in sorted(series.items()):
+            metrics.setdefault(kind, {}).setdefault(name, {})[field] = summary
+        return {'metrics': metrics, 'slow_queries': slow_queries}
+
+
+def prometheus_text(metrics: Dict, prefix: str = 'dashboard') -> str:
+    """把 Instrumentation.snapshot()['metrics'] 转换为 Prometheus 文本格式（summary）"""
+    lines: List[str] = []
+    for kind, fields in FIELDS.items():
+        for field in fields:
+            metric = f'{prefix}_{kind}_{field}'
+            rows = [(name, values[field]) for name, values in metrics.get(kind, {}).items() if field in values]
+            if not rows:
+                continue
+            lines.append(f'# TYPE {metric} summary')
+            for name, summary in rows:
+                label = f'{kind}="{name}"'
+                for q in QUANTILES:
+                    key = f'p{int(q * 100)}'
+                    if key in summary:
+                        lines.append(f'{metric}{{{label},quantile="{q}"}} {summary[key]}')
+                lines.append(f'{metric}_sum{{{label}}} {summary["sum"]}')
+                lines.append(f'{metric}_count{{{label}}} {summary["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def register_metrics_endpoints(
+    server,
+    instrumentation: Instrumentation,
+    callback_names: Optional[Callable[[], Dict[str, str]]] = None,
+    allow_remote: bool = False
+):
+    """在 Flask 服务上注册统计接口，并记录每个回调请求的耗时和响应大小
+
+    GET /metrics                Prometheus 文本格式；?format=json 返回 JSON
+    GET /debug/slow-queries     慢查询及其 EXPLAIN ANALYZE 计划
+
+    Args:
+        server: Flask 服务
+        instrumentation (Instrumentation): 统计对象
+        callback_names (Callable[[], Dict[str, str]], optional): 返回 Dash 回调输出ID
+            到回调函数名映射的函数，为 None 时以输出ID作为回调名
+        allow_remote (bool): 是否允许非本机访问，默认只允许本机
+    """
+    from flask import Response, abort, g, jsonify, request
+
+    def local_only():
+        if not allow_remote and request.remote_addr not in ('127.0.0.1', '::1', 'localhost'):
+            abort(403)
+
+    def metrics():
+        local_only()
+        snapshot = instrumentation.snapshot()
+        if request.args.get('format') == 'json':
+            return jsonify(snapshot['metrics'])
+        return Response(prometheus_text(snapshot['metrics']), mimetype='text/plain; version=0.0.4')
+
+    def slow_queries():
+        local_only()
+        return jsonify(instrumentation.snapshot()['slow_queries'])
+
+    def start_timer():
+        if request.path.endswith('/_dash-update-component'):
+            g.callback_started = time.perf_counter()
+
+    def record_callback(response):
+        started = g.pop('callback_started', None)
+        # 后台回调的轮询在任务完成前返回 204，不计入
+        if started is None or response.status_code == 204:
+            return response
+        body = request.get_json(silent=True) or {}
+        output = body.get('output', '')
+        name = (callback_names() if callback_names else {}).get(output, output)
+        instrumentation.record(
+            'callback', name,
+            request_ms=(time.perf_counter() - started) * 1000,
+            payload_bytes=response.calculate_content_length() or 0
+        )
+        return response
+
+    server.add_url_rule('/metrics', 'dashboard_metrics', metrics, methods=['GET'])
+    server.add_url_rule('/debug/slow-queries', 'dashboard_slow_queries', slow_queries, methods=['GET'])
+    server.before_request(start_timer)
+    server.after_request(record_callback)
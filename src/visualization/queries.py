@@ -0,0 +1,451 @@
+import logging
+import re
+import sys
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+
+def supplier_filter_condition(source_shared: str, target_shared: str) -> str:
+    """共享供应商筛选条件，筛选方式由参数 $supplier_filter 传入
+
+    Args:
+        source_shared (str): 源公司是否共享供应商的列名
+        target_shared (str): 目标公司是否共享供应商的列名
+
+    Returns:
+        str: 固定的 SQL 条件，$supplier_filter 取 'all'、'shared' 或 'non-shared'
+    """
+    return f"""(
+        $supplier_filter = 'all'
+        OR ($supplier_filter = 'shared' AND (
+            coalesce({source_shared}, false) OR coalesce({target_shared}, false)
+        ))
+        OR ($supplier_filter = 'non-shared' AND (
+            NOT coalesce({source_shared}, false) AND NOT coalesce({target_shared}, false)
+        ))
+    )"""
+
+
+# 关系的流量：采购金额和收入中较大者，与节点大小的计算口径一致
+EDGE_FLOW = 'greatest(coalesce(procurement_amount, 0), coalesce(revenue, 0))'
+
+# 渐进式图形中每条关系返回的列；共享供应商标记随元素发送，由客户端筛选
+GRAPH_EDGE_COLUMNS = f"""
+            source_node_id,
+            source_name,
+            target_node_id,
+            target_name,
+            relationship_type,
+            procurement_amount,
+            revenue,
+            source_is_shared,
+            target_is_shared,
+            {EDGE_FLOW} AS flow"""
+
+# 看板使用的全部查询，参数一律用 $name 绑定，SQL 文本不随点击变化
+QUERY_SQL: Dict[str, str] = {
+    # 全部关系表格，排序和分页由 table_paging 在外层追加
+    'all_relationships': f"""
+        SELECT
+            source_name,
+            target_name,
+            source_node_id,
+            target_node_id,
+            relationship_type,
+            procurement_amount,
+            revenue,
+            source_is_shared,
+            target_is_shared
+        FROM edges_enriched
+        WHERE {supplier_filter_condition('source_is_shared', 'target_is_shared')}
+    """,
+    # 公司的自我网络记录（导出时预先计算）：详情、集中度和全部关系，
+    # relationships 为按 方向、关联公司 排序的结构体列表
+    'ego_network': """
+        SELECT *
+        FROM ego_networks
+        WHERE unique_node_id = $node_id
+    """,
+    # 按披露期的网络指标时间序列（导出时预先计算），趋势视图使用
+    'temporal_metrics': """
+        SELECT * FROM temporal_metrics ORDER BY period_end
+    """,
+    # 渐进式图形：按关联金额合计（流量）排名前 $node_limit 的公司
+    'graph_top_nodes': f"""
+        WITH graph_edges AS (
+            SELECT
+                source_node_id,
+                source_name,
+                source_is_shared,
+                target_node_id,
+                target_name,
+                target_is_shared,
+                {EDGE_FLOW} AS flow
+            FROM edges_enriched
+        ),
+        endpoints AS (
+            SELECT source_node_id AS node_id, source_name AS node_name, source_is_shared AS is_shared, flow
+            FROM graph_edges
+            UNION ALL
+            SELECT target_node_id, target_name, target_is_shared, flow FROM graph_edges
+            WHERE target_node_id <> source_node_id
+        )
+        SELECT
+            node_id AS unique_node_id,
+            any_value(node_name) AS canonical_name,
+            coalesce(bool_or(is_shared), false) AS is_shared,
+            sum(flow) AS flow,
+            count(*) AS degree
+        FROM endpoints
+        WHERE node_id IS NOT NULL
+        GROUP BY node_id
+        ORDER BY flow DESC, degree DESC, unique_node_id
+        LIMIT $node_limit
+    """,
+    # 渐进式图形：给定公司之间的关系（导出子图），按流量取前 $edge_limit 条
+    'graph_induced_edges': f"""
+        SELECT {GRAPH_EDGE_COLUMNS}
+        FROM edges_enriched
+        WHERE source_node_id IN (SELECT unnest($node_ids))
+            AND target_node_id IN (SELECT unnest($node_ids))
+        ORDER BY flow DESC, source_node_id, target_node_id
+        LIMIT $edge_limit
+    """,
+    # 渐进式图形：k 跳展开的一跳，与 $node_ids 相连、另一端不在 $visited_ids 中的关系
+    'graph_neighbour_edges': f"""
+        WITH frontier_edges AS (
+            SELECT {GRAPH_EDGE_COLUMNS}
+            FROM edges_enriched
+            WHERE source_node_id IN (SELECT unnest($node_ids))
+                AND NOT list_contains($visited_ids::VARCHAR[], target_node_id)
+            UNION ALL
+            -- 两端都在 $node_ids 中的关系已在上面取到
+            SELECT {GRAPH_EDGE_COLUMNS}
+            FROM edges_enriched
+            WHERE target_node_id IN (SELECT unnest($node_ids))
+                AND NOT list_contains($node_ids::VARCHAR[], source_node_id)
+                AND NOT list_contains($visited_ids::VARCHAR[], source_node_id)
+        )
+        SELECT *
+        FROM frontier_edges
+        ORDER BY flow DESC, source_node_id, target_node_id
+        LIMIT $edge_limit
+    """,
+    # 渐进式图形："加载更多"的一页关系，按 (流量降序, 源, 目标) 键集分页
+    'graph_edge_page': f"""
+        WITH ranked_edges AS (
+            SELECT {GRAPH_EDGE_COLUMNS}
+            FROM edges_enriched
+        )
+        SELECT *
+        FROM ranked_edges
+        WHERE flow < $after_flow
+            OR (flow = $after_flow AND (source_node_id, target_node_id) > ($after_source, $after_target))
+        ORDER BY flow DESC, source_node_id, target_node_id
+        LIMIT $edge_limit
+    """,
+    # 数据接口：公司详情及集中度指标，$node_ids 为空时返回全部公司
+    'data_nodes': """
+        SELECT * EXCLUDE (relationships)
+        FROM ego_networks
+        WHERE len($node_ids::VARCHAR[]) = 0
+            OR unique_node_id IN (SELECT unnest($node_ids::VARCHAR[]))
+    """,
+    # 数据接口：与 $node_ids 中公司直接相连的关系，$direction 取 'all'、'incoming' 或 'outgoing'；
+    # 两端都在 $node_ids 中的关系只返回一次
+    'data_neighbours': f"""
+        WITH filtered_edges AS (
+            SELECT *
+            FROM edges_enriched
+            WHERE {supplier_filter_condition('source_is_shared', 'target_is_shared')}
+        )
+        SELECT *
+        FROM filtered_edges
+        WHERE $direction IN ('all', 'outgoing')
+            AND source_node_id IN (SELECT unnest($node_ids::VARCHAR[]))
+        UNION ALL
+        SELECT *
+        FROM filtered_edges
+        WHERE $direction IN ('all', 'incoming')
+            AND target_node_id IN (SELECT unnest($node_ids::VARCHAR[]))
+            AND NOT ($direction = 'all' AND source_node_id IN (SELECT unnest($node_ids::VARCHAR[])))
+    """,
+    # 数据接口：从 $node_ids 出发沿 $direction 走不超过 $hops 步经过的全部关系，
+    # 即与 $hops - 1 步内可达的公司相连的关系
+    'data_subgraph': f"""
+        WITH RECURSIVE filtered_edges AS (
+            SELECT *
+            FROM edges_enriched
+            WHERE {supplier_filter_condition('source_is_shared', 'target_is_shared')}
+        ),
+        steps AS (
+            SELECT source_node_id AS from_id, target_node_id AS to_id
+            FROM filtered_edges
+            WHERE $direction IN ('all', 'outgoing')
+            UNION ALL
+            SELECT target_node_id AS from_id, source_node_id AS to_id
+            FROM filtered_edges
+            WHERE $direction IN ('all', 'incoming')
+        ),
+        reached(node_id, hop) AS (
+            SELECT unnest($node_ids::VARCHAR[]), 0
+            UNION
+            SELECT steps.to_id, reached.hop + 1
+            FROM reached
+            JOIN steps ON steps.from_id = reached.node_id
+            WHERE reached.hop + 1 < $hops
+        ),
+        expanded AS (
+            SELECT DISTINCT node_id FROM reached
+        )
+        SELECT *
+        FROM filtered_edges
+        WHERE ($direction IN ('all', 'outgoing') AND source_node_id IN (SELECT node_id FROM expanded))
+            OR ($direction IN ('all', 'incoming') AND target_node_id IN (SELECT node_id FROM expanded))
+    """,
+    # 数据接口：按条件扫描关系，条件参数为 NULL 时不筛选
+    'data_edges': f"""
+        SELECT *
+        FROM edges_enriched
+        WHERE {supplier_filter_condition('source_is_shared', 'target_is_shared')}
+            AND ($relationship_type IS NULL OR relationship_type = $relationship_type)
+            AND ($min_flow IS NULL OR {EDGE_FLOW} >= $min_flow)
+            AND ($since IS NULL OR announcement_date >= $since)
+            AND ($until IS NULL OR announcement_date < $until)
+    """,
+}
+
+
+@lru_cache(maxsize=256)
+def parse_statement(sql: str) -> duckdb.Statement:
+    """解析 SQL 文本，相同文本只解析一次"""
+    return duckdb.extract_statements(sql)[0]
+
+
+class NamedQuery:
+    """命名的参数化查询
+
+    SQL 文本在导入时只解析一次，得到的语句对象与连接无关，所有线程和
+    游标共用；执行时只绑定参数，参数名由 DuckDB 校验。
+
+    DuckDB 的预编译语句（PREPARE/EXECUTE）每次执行仍会按参数值重新绑定
+    和优化，因此这里复用的是解析结果，而不是执行计划。
+    """
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.statement = parse_statement(sql)
+        self.params = frozenset(self.statement.named_parameters)
+
+    def execute(self, conn: duckdb.DuckDBPyConnection, params: Dict) -> duckdb.DuckDBPyConnection:
+        """绑定参数并执行"""
+        return conn.execute(self.statement, params)
+
+
+QUERIES: Dict[str, NamedQuery] = {name: NamedQuery(name, sql) for name, sql in QUERY_SQL.items()}
+
+# 查询观察者，每次查询后调用 observer(名称, SQL, 参数, DuckDB 执行毫秒数, 总毫秒数, 行数)
+QueryObserver = Callable[[str, str, Dict, float, float, int], None]
+_query_observers: List[QueryObserver] = []
+
+
+def add_query_observer(observer: QueryObserver):
+    """注册查询观察者，例如 instrumentation.Instrumentation.observe_query"""
+    _query_observers.append(observer)
+
+
+def _observed_df(conn: duckdb.DuckDBPyConnection, name: str, statement, sql: str, params: Dict) -> pd.DataFrame:
+    """执行查询并转换为 DataFrame，分别计时 DuckDB 执行和结果转换"""
+    start_time = time.perf_counter()
+    result = conn.execute(statement, params)
+    executed = time.perf_counter()
+    df = result.df()
+    if _query_observers:
+        _notify_observers(
+            name, sql, params, (executed - start_time) * 1000, (time.perf_counter() - start_time) * 1000, len(df)
+        )
+    return df
+
+
+def _notify_observers(name: str, sql: str, params: Dict, db_ms: float, wall_ms: float, rows: int):
+    for observer in _query_observers:
+        try:
+            observer(name, sql, params, db_ms, wall_ms, rows)
+        except Exception as e:
+            logger.warning(f"查询观察者出错: {e}")
+
+
+def run_query(conn: duckdb.DuckDBPyConnection, name: str, **params) -> pd.DataFrame:
+    """执行命名查询
+
+    Args:
+        conn (duckdb.DuckDBPyConnection): 数据库连接或游标
+        name (str): 查询名称，见 QUERY_SQL
+        **params: 查询参数
+
+    Returns:
+        pd.DataFrame: 查询结果
+    """
+    query = QUERIES[name]
+    return _observed_df(conn, name, query.statement, query.sql, params)
+
+
+def record_batches(
+    conn: duckdb.DuckDBPyConnection,
+    name: str,
+    params: Dict,
+    batch_rows: int = 65536,
+    limit: Optional[int] = None
+) -> Tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    """执行命名查询，逐批读取 DuckDB 输出的 Arrow 结果，不经过 pandas
+
+    结果按批从 DuckDB 流式取出，迭代到哪里查询就执行到哪里；迭代结束或
+    中途关闭时通知查询观察者，耗时只计 DuckDB 执行和取批次的时间。
+
+    Args:
+        conn (duckdb.DuckDBPyConnection): 数据库连接或游标，迭代结束前不能执行其他查询
+        name (str): 查询名称，见 QUERY_SQL
+        params (Dict): 查询参数
+        batch_rows (int): 每批最多行数
+        limit (int, optional): 最多返回的行数，None 表示不限
+
+    Returns:
+        Tuple[pa.Schema, Iterator[pa.RecordBatch]]: 结果的列结构和逐批结果
+    """
+    query = QUERIES[name]
+    start_time = time.perf_counter()
+    reader = query.execute(conn, params).fetch_record_batch(batch_rows)
+    db_ms = (time.perf_counter() - start_time) * 1000
+
+    def batches():
+        fetch_ms, rows = db_ms, 0
+        try:
+            while limit is None or rows < limit:
+                fetch_start = time.perf_counter()
+                try:
+                    batch = reader.read_next_batch()
+                except StopIteration:
+                    break
+                finally:
+                    fetch_ms += (time.perf_counter() - fetch_start) * 1000
+                if limit is not None and rows + batch.num_rows > limit:
+                    batch = batch.slice(0, limit - rows)
+                rows += batch.num_rows
+                yield batch
+        finally:
+            reader.close()
+            if _query_observers:
+                _notify_observers(name, query.sql, params, db_ms, fetch_ms, rows)
+
+    return reader.schema, batches()
+
+
+def fetch_one(conn: duckdb.DuckDBPyConnection, name: str, **params) -> Optional[tuple]:
+    """执行命名查询并返回第一行"""
+    return QUERIES[name].execute(conn, params).fetchone()
+
+
+def run_sql(conn: duckdb.DuckDBPyConnection, sql: str, params: Dict, name: str = 'sql') -> pd.DataFrame:
+    """执行拼装出的参数化 SQL，例如表格分页查询，解析结果按文本缓存
+
+    Args:
+        name (str): 统计耗时时使用的名称
+    """
+    return _observed_df(conn, name, parse_statement(sql), sql, params)
+
+
+def inline_params(sql: str, params: Dict) -> str:
+    """把参数拼接进 SQL 文本，仅用于基准测试中模拟原来的 f-string 查询"""
+    def literal(match):
+        value = params[match.group(1)]
+        return "'" + str(value).replace("'", "''") + "'"
+    return re.sub(r'\$(\w+)', literal, sql)
+
+
+def benchmark_queries(conn: duckdb.DuckDBPyConnection, cases: Dict[str, Dict], repeat: int = 200) -> pd.DataFrame:
+    """比较拼接 SQL、参数化 SQL 文本和预解析语句的单次耗时
+
+    Args:
+        conn (duckdb.DuckDBPyConnection): 数据库连接
+        cases (Dict[str, Dict]): 查询名称到参数的映射
+        repeat (int): 每种方式的执行次数
+
+    Returns:
+        pd.DataFrame: 每个查询各方式的平均耗时（毫秒），planning_ms 为 EXPLAIN
+            （解析、绑定、优化并输出计划，不执行）的耗时
+    """
+    def timed(run) -> float:
+        run()
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        return (time.perf_counter() - start_time) / repeat * 1000
+
+    rows = []
+    for name, params in cases.items():
+        query = QUERIES[name]
+        literal_sql = inline_params(query.sql, params)
+        rows.append({
+            'query': name,
+            'fstring_ms': timed(lambda: conn.execute(literal_sql).fetchall()),
+            'parameterized_ms': timed(lambda: conn.execute(query.sql, params).fetchall()),
+            'parsed_ms': timed(lambda: query.execute(conn, params).fetchall()),
+            'planning_ms': timed(lambda: conn.execute('EXPLAIN ' + query.sql, params).fetchall()),
+        })
+    return pd.DataFrame(rows)
+
+
+def explain_analyze_sql(conn: duckdb.DuckDBPyConnection, sql: str, params: Dict) -> str:
+    """执行 SQL 并返回 EXPLAIN ANALYZE 的计划，包含各算子的实际行数和耗时"""
+    return conn.execute('EXPLAIN ANALYZE ' + sql, params).fetchall()[0][1]
+
+
+def explain_analyze(conn: duckdb.DuckDBPyConnection, name: str, params: Dict) -> str:
+    """执行命名查询并返回 EXPLAIN ANALYZE 的计划"""
+    return explain_analyze_sql(conn, QUERIES[name].sql, params)
+
+
+def benchmark_cases(conn: duckdb.DuckDBPyConnection) -> Dict[str, Dict]:
+    """基准测试用的查询参数，选取关系最多的公司"""
+    node_id = conn.execute("""
+        SELECT source_node_id FROM edges GROUP BY 1 ORDER BY count(*) DESC LIMIT 1
+    """).fetchone()[0]
+    return {
+        'all_relationships': {'supplier_filter': 'shared'},
+        'graph_top_nodes': {'node_limit': 150},
+        'graph_edge_page': {
+            'after_flow': float('inf'), 'after_source': '', 'after_target': '', 'edge_limit': 200
+        },
+        'ego_network': {'node_id': node_id},
+    }
+
+
+def main(db_path: str = 'data/processed/supply_chain_network.duckdb', mode: str = '200'):
+    """对看板查询做基准测试
+
+    python queries.py [数据库路径] [重复次数]：各执行方式的平均耗时
+    python queries.py [数据库路径] explain：各查询的 EXPLAIN ANALYZE
+    """
+    with duckdb.connect(db_path, read_only=True) as conn:
+        cases = benchmark_cases(conn)
+        if mode == 'explain':
+            for name, params in cases.items():
+                print(f"===== {name} {params}")
+                print(explain_analyze(conn, name, params))
+            return None
+        results = benchmark_queries(conn, cases, int(mode))
+    print(results.round(3).to_string(index=False))
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(*sys.argv[1:3])
@@ -0,0 +1,253 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import diskcache
+import pandas as pd
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# 磁盘缓存中记录当前数据库版本的键
+VERSION_KEY = '__version__'
+
+# 正在执行的查询在磁盘缓存中的占位键前缀，值为执行者的进程号
+IN_FLIGHT_PREFIX = '__in_flight__'
+
+
+def result_size(df: pd.DataFrame) -> int:
+    """查询结果占用的内存字节数"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def process_alive(pid: int) -> bool:
+    """进程是否仍在运行（已退出未回收的僵尸进程视为已结束）"""
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return False
+
+
+class QueryResultCache:
+    """按网络版本区分的查询结果缓存
+
+    键为 (查询名称, 参数, 数据库版本)。两级存储：
+
+    - 进程内 LRU，按结果占用的内存字节数限制总大小；
+    - 本地磁盘 (diskcache)，同一台机器上的多个 worker 进程共享，
+      同样按 LRU 淘汰并限制总大小。
+
+    键中包含 build_meta.graph_version，部署新的数据库后自动使用新键；
+    发现版本变化时顺带清除旧版本的条目。返回的 DataFrame 都是副本，
+    调用方可以直接修改。
+
+    相同的查询同时只执行一次：未命中时先在磁盘缓存中原子地写入占位键
+    (diskcache.add)，其他线程和进程（包括后台回调的子进程）发现占位后
+    等待结果写入磁盘，而不是重复查询。执行者被终止时占位随之失效。
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = 64 * 1024 ** 2,
+        disk_size_limit: int = 512 * 1024 ** 2,
+        wait_timeout: float = 120.0,
+        poll_interval: float = 0.05
+    ):
+        """
+        Args:
+            directory (str, optional): 磁盘缓存目录，为 None 时只使用进程内缓存
+            max_bytes (int): 进程内缓存的最大字节数
+            disk_size_limit (int): 磁盘缓存的最大字节数
+            wait_timeout (float): 等待其他执行者的最长时间（秒），超时后自行查询
+            poll_interval (float): 等待时检查结果的间隔（秒）
+        """
+        self.max_bytes = max_bytes
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._memory: 'OrderedDict[Tuple, Tuple[pd.DataFrame, int]]' = OrderedDict()
+        self._memory_bytes = 0
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.disk = None
+        if directory is not None:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            self.disk = diskcache.Cache(
+                str(directory),
+                size_limit=disk_size_limit,
+                eviction_policy='least-recently-used'
+            )
+
+    @staticmethod
+    def make_key(name: str, params: Dict, version: str) -> Tuple:
+        """缓存键：查询名称、按名称排序的参数和数据库版本"""
+        return name, json.dumps(params, sort_keys=True, default=str, ensure_ascii=False), version
+
+    def _store_memory(self, key: Tuple, df: pd.DataFrame):
+        """写入进程内缓存，超出上限时淘汰最久未使用的结果（调用方持有锁）"""
+        size = result_size(df)
+        if size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[1]
+        self._memory[key] = (df, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _check_version(self, version: str):
+        """数据库版本变化时清除旧版本的结果
+
+        磁盘缓存记录了写入时的版本，新启动的 worker 也能清除旧版本留下的条目。
+        """
+        if version == self._version:
+            return
+        with self._lock:
+            self._version = version
+            stale = [key for key in self._memory if key[2] != version]
+            for key in stale:
+                self._memory_bytes -= self._memory.pop(key)[1]
+        removed = 0
+        if self.disk is not None:
+            old_version = self.disk.get(VERSION_KEY)
+            if old_version != version:
+                if old_version is not None:
+                    removed = self.disk.evict(old_version)
+                self.disk.set(VERSION_KEY, version)
+        if stale or removed:
+            logger.info(f"数据库版本变化为 {version[:12]}，已清除 {len(stale)} 条内存缓存、{removed} 条磁盘缓存")
+
+    def get_or_run(self, name: str, params: Dict, version: str, run: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """读取缓存的查询结果，未命中时执行查询并写入缓存
+
+        Args:
+            name (str): 查询名称
+            params (Dict): 查询参数
+            version (str): 数据库版本
+            run (Callable[[], pd.DataFrame]): 未命中时执行的查询
+
+        Returns:
+            pd.DataFrame: 查询结果的副本
+        """
+        self._check_version(version)
+        key = self.make_key(name, params, version)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+
+        df = self.disk.get(key) if self.disk is not None else None
+        if df is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._store_memory(key, df)
+            return df.copy()
+
+        if self.disk is None:
+            df = run()
+        else:
+            df, waited = self._run_once(key, version, run)
+            if waited:
+                with self._lock:
+                    self.waits += 1
+                    self._store_memory(key, df)
+                return df.copy()
+        with self._lock:
+            self.misses += 1
+            self._store_memory(key, df.copy())
+        return df
+
+    def _run_once(self, key: Tuple, version: str, run: Callable[[], pd.DataFrame]) -> Tuple[pd.DataFrame, bool]:
+        """执行查询并写入磁盘缓存；相同的查询正在别处执行时等待其结果
+
+        Returns:
+            Tuple[pd.DataFrame, bool]: 查询结果，以及是否是等到的其他执行者的结果
+        """
+        in_flight_key = (IN_FLIGHT_PREFIX,) + key
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            if self.disk.add(in_flight_key, os.getpid(), expire=self.wait_timeout, tag=version):
+                try:
+                    # 占位前其他执行者可能刚好写入了结果
+                    df = self.disk.get(key)
+                    if df is not None:
+                        return df, True
+                    df = run()
+                    self.disk.set(key, df, tag=version)
+                    return df, False
+                finally:
+                    self.disk.delete(in_flight_key)
+            df = self.disk.get(key)
+            if df is not None:
+                return df, True
+            holder = self.disk.get(in_flight_key)
+            if holder is not None and not process_alive(holder):
+                logger.info(f"查询 {key[0]} 的执行进程 {holder} 已结束，重新执行")
+                self.disk.delete(in_flight_key)
+                continue
+            if time.monotonic() > deadline:
+                logger.warning(f"等待查询 {key[0]} 超时，自行执行")
+                df = run()
+                self.disk.set(key, df, tag=version)
+                return df, False
+            time.sleep(self.poll_interval)
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict:
+        """命中率和缓存大小
+
+        Returns:
+            Dict: hits（内存命中）、disk_hits（磁盘命中）、misses（查询数据库）、
+                waits（等到其他执行者的结果）、hit_rate、memory_entries、memory_bytes、
+                disk_entries、disk_bytes、in_flight（正在执行的查询）、version
+        """
+        with self._lock:
+            requests = self.hits + self.disk_hits + self.waits + self.misses
+            stats = {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'hit_rate': round((self.hits + self.disk_hits + self.waits) / requests, 4) if requests else None,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'max_bytes': self.max_bytes,
+                'version': self._version,
+            }
+        if self.disk is not None:
+            in_flight = sum(
+                1 for key in self.disk.iterkeys() if isinstance(key, tuple) and key[:1] == (IN_FLIGHT_PREFIX,)
+            )
+            stats['disk_entries'] = max(len(self.disk) - (VERSION_KEY in self.disk) - in_flight, 0)
+            stats['in_flight'] = in_flight
+            stats['disk_bytes'] = self.disk.volume()
+        return stats
+
+
+def register_cache_endpoint(server, cache: QueryResultCache, route: str = '/api/cache/stats'):
+    """在 Flask 服务上注册缓存统计接口，GET {route} 返回 QueryResultCache.stats() 的 JSON"""
+    from flask import jsonify
+
+    def cache_stats():
+        return jsonify(cache.stats())
+
+    server.add_url_rule(route, 'query_cache_stats', cache_stats, methods=['GET'])
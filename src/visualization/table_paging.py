@@ -0,0 +1,183 @@
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 关系表格的列：列ID -> (排序和筛选用的 SQL 表达式, 列类型)
+# 排序键不含 NULL（与表格中空值显示为 "0" 一致），便于按行值比较做键集分页
+RELATIONSHIP_COLUMNS: Dict[str, Tuple[str, str]] = {
+    'source_name': ("coalesce(source_name, '')", 'text'),
+    'target_name': ("coalesce(target_name, '')", 'text'),
+    'relationship_type': ("coalesce(relationship_type, '')", 'text'),
+    'procurement_amount': ('coalesce(procurement_amount, 0)', 'numeric'),
+    'revenue': ('coalesce(revenue, 0)', 'numeric'),
+    'is_shared': ('is_shared', 'text'),
+}
+
+# 默认排序，以及保证排序唯一的边主键（有向图中 源-目标 唯一）
+DEFAULT_SORT = ['source_name', 'target_name']
+TIEBREAK_COLUMNS = ['source_node_id', 'target_node_id']
+
+# DataTable filter_query 的比较运算符
+FILTER_OPERATORS = {
+    '=': '=', 'eq': '=',
+    '!=': '!=', 'ne': '!=',
+    '<': '<', 'lt': '<',
+    '<=': '<=', 'le': '<=',
+    '>': '>', 'gt': '>',
+    '>=': '>=', 'ge': '>=',
+    'contains': 'contains',
+    'datestartswith': 'datestartswith',
+}
+
+FILTER_PART = re.compile(r'^\s*\{(?P<column>[^}]+)\}\s+(?P<operator>\S+)\s+(?P<value>.+?)\s*$')
+
+
+def parse_filter_query(filter_query: str) -> List[Tuple[str, str, object, bool]]:
+    """解析 DataTable 的 filter_query
+
+    Args:
+        filter_query (str): 如 '{source_name} contains "华为" && {revenue} > 100'
+
+    Returns:
+        List[Tuple[str, str, object, bool]]: (列ID, 运算符, 值, 是否忽略大小写)，
+            无法识别的列或运算符被忽略
+    """
+    conditions = []
+    for part in (filter_query or '').split(' && '):
+        match = FILTER_PART.match(part)
+        if not match:
+            continue
+        column, operator, value = match.group('column', 'operator', 'value')
+        ignore_case = False
+        if operator not in FILTER_OPERATORS and operator[:1] in ('i', 's') and operator[1:] in FILTER_OPERATORS:
+            ignore_case = operator[0] == 'i'
+            operator = operator[1:]
+        if column not in RELATIONSHIP_COLUMNS or operator not in FILTER_OPERATORS:
+            logger.warning(f"忽略无法识别的筛选条件: {part}")
+            continue
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'", '`'):
+            value = value[1:-1].replace('\\' + value[0], value[0])
+        conditions.append((column, FILTER_OPERATORS[operator], value, ignore_case))
+    return conditions
+
+
+def filter_conditions(filter_query: str) -> Tuple[List[str], Dict]:
+    """把 filter_query 转换为参数化的 WHERE 条件
+
+    列名只取自 RELATIONSHIP_COLUMNS，筛选值一律作为参数绑定。
+
+    Returns:
+        Tuple[List[str], Dict]: 条件列表和参数
+    """
+    clauses, params = [], {}
+    for i, (column, operator, value, ignore_case) in enumerate(parse_filter_query(filter_query)):
+        expr, column_type = RELATIONSHIP_COLUMNS[column]
+        name = f'filter_{i}'
+        if operator in ('contains', 'datestartswith'):
+            expr = f'CAST({expr} AS VARCHAR)'
+            if ignore_case:
+                expr, params[name] = f'lower({expr})', str(value).lower()
+            else:
+                params[name] = str(value)
+            clauses.append(
+                f'contains({expr}, ${name})' if operator == 'contains' else f'starts_with({expr}, ${name})'
+            )
+            continue
+        if column_type == 'numeric':
+            try:
+                params[name] = float(value)
+            except ValueError:
+                logger.warning(f"忽略非数值的筛选条件: {column} {operator} {value}")
+                continue
+        else:
+            params[name] = str(value)
+        clauses.append(f'{expr} {operator} ${name}')
+    return clauses, params
+
+
+def sort_keys(sort_by: Optional[List[Dict]]) -> Tuple[List[str], bool]:
+    """排序键表达式及方向
+
+    只支持单列排序：用户选择的列在前，其余为默认排序和边主键，
+    全部同向，才能用一次行值比较定位下一页。
+
+    Returns:
+        Tuple[List[str], bool]: 排序键表达式列表、是否降序
+    """
+    columns, descending = list(DEFAULT_SORT), False
+    if sort_by and sort_by[0].get('column_id') in RELATIONSHIP_COLUMNS:
+        column = sort_by[0]['column_id']
+        descending = sort_by[0].get('direction') == 'desc'
+        columns = [column] + [c for c in DEFAULT_SORT if c != column]
+    return [RELATIONSHIP_COLUMNS[c][0] for c in columns] + TIEBREAK_COLUMNS, descending
+
+
+def relationship_source(base_sql: str) -> str:
+    """在关系查询外层加上表格显示的 is_shared 列"""
+    return f"""
+        SELECT
+            *,
+            CASE WHEN coalesce(source_is_shared, false) OR coalesce(target_is_shared, false)
+                THEN '是' ELSE '否' END AS is_shared
+        FROM ({base_sql})
+    """
+
+
+def build_count_query(base_sql: str, filter_query: str) -> Tuple[str, Dict]:
+    """筛选后的总行数，用于计算页数"""
+    clauses, params = filter_conditions(filter_query)
+    sql = f"""
+        SELECT count(*) AS total
+        FROM ({relationship_source(base_sql)}) r
+        WHERE {' AND '.join(clauses) or 'true'}
+    """
+    return sql, params
+
+
+def build_page_query(
+    base_sql: str,
+    filter_query: str,
+    sort_by: Optional[List[Dict]],
+    page_size: int,
+    after: Optional[List] = None,
+    offset: int = 0
+) -> Tuple[str, Dict]:
+    """一页数据的查询
+
+    给出上一页最后一行的排序键 after 时按键集分页：
+    WHERE (k0, k1, ...) > (after) ORDER BY k0, k1, ... LIMIT n，
+    不需要跳过前面的行；否则退回 LIMIT/OFFSET（跳页时）。
+
+    Args:
+        base_sql (str): 关系查询（如 queries.QUERY_SQL['all_relationships']）
+        filter_query (str): DataTable 的 filter_query
+        sort_by (List[Dict]): DataTable 的 sort_by
+        page_size (int): 每页行数
+        after (List): 上一页最后一行的排序键，见结果中的 _key_* 列
+        offset (int): 没有 after 时跳过的行数
+
+    Returns:
+        Tuple[str, Dict]: SQL 和参数（不含 base_sql 自身的参数）；结果中 _key_0、_key_1 …
+            为该行的排序键
+    """
+    clauses, params = filter_conditions(filter_query)
+    keys, descending = sort_keys(sort_by)
+    direction = 'DESC' if descending else 'ASC'
+    if after is not None and len(after) == len(keys):
+        names = [f'$after_{i}' for i in range(len(keys))]
+        params.update({f'after_{i}': value for i, value in enumerate(after)})
+        # 首列的范围条件便于 DuckDB 用 zonemap 跳过数据块，行值比较保证严格位于上一页之后
+        clauses.append(f"{keys[0]} {'<=' if descending else '>='} {names[0]}")
+        clauses.append(f"({', '.join(keys)}) {'<' if descending else '>'} ({', '.join(names)})")
+        offset = 0
+    params.update({'page_limit': int(page_size), 'page_offset': int(offset)})
+    sql = f"""
+        SELECT r.*, {', '.join(f'{key} AS _key_{i}' for i, key in enumerate(keys))}
+        FROM ({relationship_source(base_sql)}) r
+        WHERE {' AND '.join(clauses) or 'true'}
+        ORDER BY {', '.join(f'_key_{i} {direction}' for i in range(len(keys)))}
+        LIMIT $page_limit OFFSET $page_offset
+    """
+    return sql, params
@@ -0,0 +1,71 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src' / 'network'))
+
+from concentration import CONCENTRATION_COLUMNS, compute_concentration_metrics
+
+
+def edges(rows) -> pd.DataFrame:
+    """(relationship_type, 供应商, 客户, 占比, 金额) 转换为边表"""
+    return pd.DataFrame([
+        {
+            'source_node_id': source,
+            'target_node_id': target,
+            'relationship_type': kind,
+            'procurement_share': share if kind == 'supplier' else np.nan,
+            'revenue_share': share if kind == 'customer' else np.nan,
+            'procurement_amount': amount if kind == 'supplier' else np.nan,
+            'revenue': amount if kind == 'customer' else np.nan,
+        }
+        for kind, source, target, share, amount in rows
+    ])
+
+
+class ConcentrationMetricsTest(unittest.TestCase):
+
+    def test_disclosed_shares(self):
+        df = compute_concentration_metrics(edges([
+            ('supplier', f's{i}', 'buyer', share, 100.0)
+            for i, share in enumerate([0.3, 0.2, 0.1, 0.1, 0.1, 0.05, np.nan])
+        ])).set_index('unique_node_id')
+        self.assertEqual(list(df.reset_index().columns), CONCENTRATION_COLUMNS)
+        row = df.loc['buyer']
+        self.assertEqual(row['supplier_count'], 7)
+        self.assertAlmostEqual(row['supplier_amount'], 700.0)
+        self.assertAlmostEqual(row['supplier_hhi'], 0.09 + 0.04 + 0.01 * 3 + 0.0025)
+        self.assertAlmostEqual(row['supplier_top5_share'], 0.8)
+        self.assertAlmostEqual(row['supplier_max_share'], 0.3)
+        self.assertEqual(row['customer_count'], 0)
+        self.assertTrue(np.isnan(row['customer_hhi']))
+
+    def test_undisclosed_shares_are_missing(self):
+        df = compute_concentration_metrics(edges([
+            ('supplier', 's1', 'buyer', np.nan, 100.0),
+            ('supplier', 's2', 'buyer', np.nan, np.nan),
+            ('customer', 'seller', 'c1', 0.4, 10.0),
+            ('customer', 'seller', 'c2', np.nan, 10.0),
+        ])).set_index('unique_node_id')
+        buyer = df.loc['buyer']
+        self.assertEqual(buyer['supplier_count'], 2)
+        for metric in ['supplier_hhi', 'supplier_top5_share', 'supplier_max_share']:
+            with self.subTest(metric=metric):
+                self.assertTrue(np.isnan(buyer[metric]))
+        seller = df.loc['seller']
+        self.assertAlmostEqual(seller['customer_hhi'], 0.16)
+        self.assertAlmostEqual(seller['customer_top5_share'], 0.4)
+
+    def test_node_filter(self):
+        df = compute_concentration_metrics(edges([
+            ('supplier', 's1', 'a', 0.5, 1.0),
+            ('supplier', 's1', 'b', 0.5, 1.0),
+        ]), node_ids=['b'])
+        self.assertEqual(df['unique_node_id'].tolist(), ['b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import unittest
+from pathlib import Path
+
+import networkx as nx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src' / 'network'))
+
+from shock_simulation import SupplyShockSimulator
+
+
+class SupplyShockSimulatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        graph = nx.DiGraph()
+        for node in ['S1', 'S2', 'A', 'B', 'C', 'D', 'X']:
+            graph.add_node(node, canonical_name=node, is_listed=1, area='北京' if node == 'S1' else '上海')
+        for source, target, share in [
+            ('S1', 'A', 0.5), ('S2', 'A', 0.3),
+            ('A', 'B', 0.4), ('B', 'C', 0.5),
+            ('S1', 'D', 0.8), ('S2', 'D', 0.7),
+        ]:
+            graph.add_edge(source, target, relationship_type='supplier', procurement_share=share)
+        # 客户边的收入占比是 A 对 X 的依赖，X 不应暴露于 A 的上游冲击
+        graph.add_edge('A', 'X', relationship_type='customer', revenue_share=0.9)
+        cls.simulator = SupplyShockSimulator(graph, max_tiers=3)
+
+    def exposures(self, df, column='total_exposure'):
+        return dict(zip(df['unique_node_id'], df[column]))
+
+    def test_propagation_by_hand(self):
+        df = self.simulator.simulate(node_ids=['S1'], listed_only=False)
+        tier_1 = self.exposures(df, 'tier_1_exposure')
+        self.assertAlmostEqual(tier_1['A'], 0.5)
+        # D 的采购占比之和 1.5 超过 1，按行缩放
+        self.assertAlmostEqual(tier_1['D'], 0.8 / 1.5)
+        self.assertAlmostEqual(self.exposures(df, 'tier_2_exposure')['B'], 0.4 * 0.5)
+        self.assertAlmostEqual(self.exposures(df, 'tier_3_exposure')['C'], 0.5 * 0.4 * 0.5)
+        total = self.exposures(df)
+        self.assertAlmostEqual(total['C'], 0.1)
+        self.assertEqual(total['X'], 0)
+        self.assertEqual(total['S2'], 0)
+
+    def test_area_shock_and_severity(self):
+        df = self.simulator.simulate(area='北京', severity=0.5, listed_only=False)
+        self.assertEqual(df.loc[df['shocked'], 'unique_node_id'].tolist(), ['S1'])
+        self.assertAlmostEqual(self.exposures(df)['A'], 0.25)
+
+    def test_customer_edges_are_not_dependencies(self):
+        df = self.simulator.simulate(node_ids=['A'], listed_only=False)
+        total = self.exposures(df)
+        self.assertEqual(total['X'], 0)
+        self.assertAlmostEqual(total['B'], 0.4)
+
+    def test_monte_carlo_with_certain_failure(self):
+        df = self.simulator.monte_carlo(
+            n_scenarios=5, failure_prob=1.0, candidates=['S1'], batch_size=2,
+            exposure_threshold=0.2, seed=0, listed_only=False
+        )
+        mean = self.exposures(df, 'mean_exposure')
+        self.assertAlmostEqual(mean['A'], 0.5)
+        self.assertAlmostEqual(mean['C'], 0.1)
+        exceed = self.exposures(df, 'exceed_prob')
+        self.assertEqual(exceed['A'], 1.0)
+        self.assertEqual(exceed['C'], 0.0)
+
+    def test_monte_carlo_requires_scenarios(self):
+        with self.assertRaises(ValueError):
+            self.simulator.monte_carlo(n_scenarios=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
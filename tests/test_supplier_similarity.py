@@ -0,0 +1,73 @@
+import sys
+import unittest
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src' / 'network'))
+
+from supplier_similarity import SIMILARITY_COLUMNS, SupplierSimilarityIndex
+
+
+class SupplierSimilarityTest(unittest.TestCase):
+    """分块稀疏计算的结果与逐对计算的 Jaccard 一致"""
+
+    TOP_K = 4
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(11)
+        cls.graph = nx.DiGraph()
+        cls.suppliers = {}
+        for company in range(25):
+            chosen = rng.choice(30, size=int(rng.integers(1, 8)), replace=False)
+            cls.suppliers[f'C{company:02d}'] = {f'S{s:02d}' for s in chosen}
+            for supplier in chosen:
+                cls.graph.add_edge(
+                    f'S{supplier:02d}', f'C{company:02d}',
+                    relationship_type='supplier', procurement_amount=float(rng.integers(1, 100))
+                )
+        # 客户关系不参与供应商相似度
+        cls.graph.add_edge('C00', 'X', relationship_type='customer', revenue=1.0)
+        # 块大小小于公司数，覆盖跨块的情况
+        cls.index = SupplierSimilarityIndex.build(cls.graph, top_k=cls.TOP_K, block_size=7)
+
+    def brute_force(self, company: str):
+        mine = self.suppliers[company]
+        scores = {}
+        for peer, theirs in self.suppliers.items():
+            shared = len(mine & theirs)
+            if peer != company and shared:
+                scores[peer] = (shared / len(mine | theirs), shared)
+        return scores
+
+    def test_columns(self):
+        self.assertEqual(list(self.index.df_similarity.columns), SIMILARITY_COLUMNS)
+
+    def test_jaccard_matches_brute_force(self):
+        for company in self.suppliers:
+            with self.subTest(company=company):
+                expected = self.brute_force(company)
+                peers = self.index.peers(company)
+                self.assertEqual(len(peers), min(self.TOP_K, len(expected)))
+                self.assertEqual(peers['rank'].tolist(), list(range(1, len(peers) + 1)))
+                for peer, jaccard, shared in peers[['peer_id', 'jaccard', 'shared_suppliers']].itertuples(index=False):
+                    self.assertAlmostEqual(jaccard, expected[peer][0])
+                    self.assertEqual(shared, expected[peer][1])
+                # 保留的是 Jaccard 最高的同行
+                kept = sorted(peers['jaccard'], reverse=True)
+                best = sorted((score for score, _ in expected.values()), reverse=True)[:len(peers)]
+                np.testing.assert_allclose(kept, best)
+
+    def test_company_without_peers(self):
+        self.assertTrue(self.index.peers('X').empty)
+
+    def test_empty_graph(self):
+        df = SupplierSimilarityIndex.build(nx.DiGraph()).df_similarity
+        self.assertTrue(df.empty)
+        self.assertEqual(list(df.columns), SIMILARITY_COLUMNS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import sys
+import unittest
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src' / 'visualization'))
+
+from queries import QUERY_SQL
+from table_paging import build_count_query, build_page_query, filter_conditions, parse_filter_query
+
+
+class ParseFilterQueryTest(unittest.TestCase):
+
+    def test_unknown_columns_and_operators_are_dropped(self):
+        conditions = parse_filter_query(
+            '{source_name} contains 华为 && {secret} = 1 && {revenue} between 5 && {revenue} >= 100'
+        )
+        self.assertEqual(conditions, [
+            ('source_name', 'contains', '华为', False),
+            ('revenue', '>=', '100', False),
+        ])
+
+    def test_malformed_parts_are_dropped(self):
+        self.assertEqual(parse_filter_query('source_name contains 华为 && {revenue}'), [])
+        self.assertEqual(parse_filter_query(''), [])
+        self.assertEqual(parse_filter_query(None), [])
+
+    def test_word_operators_map_to_sql(self):
+        conditions = parse_filter_query('{revenue} gt 1 && {procurement_amount} le 2 && {source_name} ne A')
+        self.assertEqual([operator for _, operator, _, _ in conditions], ['>', '<=', '!='])
+
+    def test_quoted_values_are_unquoted(self):
+        conditions = parse_filter_query(
+            '{source_name} contains "华为 技术" && {target_name} = \'It\\\'s\' && {relationship_type} = `supplier`'
+        )
+        self.assertEqual([value for _, _, value, _ in conditions], ['华为 技术', "It's", 'supplier'])
+
+    def test_case_prefixes(self):
+        conditions = parse_filter_query('{source_name} icontains AbC && {target_name} scontains AbC')
+        self.assertEqual(conditions, [
+            ('source_name', 'contains', 'AbC', True),
+            ('target_name', 'contains', 'AbC', False),
+        ])
+
+    def test_unknown_prefixed_operator_is_dropped(self):
+        self.assertEqual(parse_filter_query('{source_name} xcontains a && {source_name} ibetween a'), [])
+
+
+class FilterConditionsTest(unittest.TestCase):
+
+    def test_non_numeric_values_are_dropped(self):
+        clauses, params = filter_conditions('{revenue} > abc && {procurement_amount} < 5')
+        self.assertEqual(clauses, ['coalesce(procurement_amount, 0) < $filter_1'])
+        self.assertEqual(params, {'filter_1': 5.0})
+
+    def test_values_are_bound_as_parameters(self):
+        clauses, params = filter_conditions("{source_name} = a'; DROP TABLE edges; --")
+        self.assertEqual(clauses, ["coalesce(source_name, '') = $filter_0"])
+        self.assertEqual(params, {'filter_0': "a'; DROP TABLE edges; --"})
+
+    def test_ignore_case_lowers_column_and_value(self):
+        clauses, params = filter_conditions('{source_name} icontains AbC && {target_name} contains AbC')
+        self.assertEqual(clauses, [
+            "contains(lower(CAST(coalesce(source_name, '') AS VARCHAR)), $filter_0)",
+            "contains(CAST(coalesce(target_name, '') AS VARCHAR), $filter_1)",
+        ])
+        self.assertEqual(params, {'filter_0': 'abc', 'filter_1': 'AbC'})
+
+
+class KeysetPagingTest(unittest.TestCase):
+    """键集分页与 LIMIT/OFFSET 分页逐页结果一致"""
+
+    PAGE_SIZE = 7
+
+    @classmethod
+    def setUpClass(cls):
+        rows = []
+        for i in range(60):
+            rows.append({
+                'source_node_id': f'node_id_{i % 9:03d}',
+                'target_node_id': f'node_id_{100 + i:03d}',
+                # 名称和金额有大量重复和缺失，排序依赖边主键区分
+                'source_name': None if i % 11 == 0 else f'公司{i % 9}',
+                'target_name': None if i % 13 == 0 else f'客户{i % 5}',
+                'relationship_type': 'supplier' if i % 2 else 'customer',
+                'procurement_amount': None if i % 3 == 0 else float(i % 4) * 1000,
+                'revenue': None if i % 2 == 0 else float(i % 6) * 500,
+                'source_is_shared': i % 4 == 0,
+                'target_is_shared': None if i % 7 == 0 else False,
+            })
+        cls.conn = duckdb.connect()
+        cls.conn.register('df_edges', pd.DataFrame(rows))
+        cls.conn.execute('CREATE TABLE edges_enriched AS SELECT * FROM df_edges')
+        cls.base_sql = QUERY_SQL['all_relationships']
+        cls.base_params = {'supplier_filter': 'all'}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def page(self, filter_query, sort_by, after=None, offset=0) -> pd.DataFrame:
+        sql, params = build_page_query(
+            self.base_sql, filter_query, sort_by, self.PAGE_SIZE, after=after, offset=offset
+        )
+        return self.conn.execute(sql, {**self.base_params, **params}).df()
+
+    def total(self, filter_query) -> int:
+        sql, params = build_count_query(self.base_sql, filter_query)
+        return int(self.conn.execute(sql, {**self.base_params, **params}).fetchone()[0])
+
+    def assert_keyset_matches_offset(self, filter_query, sort_by):
+        total = self.total(filter_query)
+        self.assertGreater(total, self.PAGE_SIZE)
+        after, seen = None, []
+        for page_number in range(-(-total // self.PAGE_SIZE)):
+            keyset = self.page(filter_query, sort_by, after=after)
+            offset = self.page(filter_query, sort_by, offset=page_number * self.PAGE_SIZE)
+            pd.testing.assert_frame_equal(keyset, offset)
+            key_columns = [col for col in keyset.columns if col.startswith('_key_')]
+            after = keyset[key_columns].iloc[-1].tolist()
+            seen += list(zip(keyset['source_node_id'], keyset['target_node_id']))
+        self.assertEqual(len(seen), total)
+        self.assertEqual(len(set(seen)), total)
+        self.assertTrue(self.page(filter_query, sort_by, after=after).empty)
+
+    def test_default_sort(self):
+        self.assert_keyset_matches_offset('', [])
+
+    def test_both_directions_for_each_column(self):
+        for column in ['source_name', 'target_name', 'relationship_type', 'procurement_amount', 'revenue', 'is_shared']:
+            for direction in ['asc', 'desc']:
+                with self.subTest(column=column, direction=direction):
+                    self.assert_keyset_matches_offset('', [{'column_id': column, 'direction': direction}])
+
+    def test_with_filter(self):
+        for direction in ['asc', 'desc']:
+            with self.subTest(direction=direction):
+                self.assert_keyset_matches_offset(
+                    '{revenue} >= 0 && {source_name} icontains 公司',
+                    [{'column_id': 'revenue', 'direction': direction}]
+                )
+
+    def test_filter_counts(self):
+        self.assertEqual(self.total('{relationship_type} = supplier'), 30)
+        self.assertEqual(self.total('{revenue} > abc'), 60)
+        self.assertEqual(self.total('{is_shared} = 是'), 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
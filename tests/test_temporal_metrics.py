@@ -0,0 +1,71 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src' / 'network'))
+
+from temporal_metrics import METRIC_COLUMNS, TemporalNetworkMetrics, disclosure_edges
+
+
+def supplier_filings(rows) -> pd.DataFrame:
+    """(上市公司, 供应商, 占比, 公告日期) 转换为原始供应商记录"""
+    return pd.DataFrame([
+        {'Coname': listed, 'Suplnm': supplier, 'Suplpa': 100.0, 'Suplpart': share, 'Anncdate': date}
+        for listed, supplier, share, date in rows
+    ])
+
+
+class TemporalMetricsUpdateTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(7)
+        dates = ['2020-03-31', '2020-06-30', '2020-09-30', '2020-12-31', '2021-03-31']
+        rows = [
+            (f'L{listed}', f'S{supplier}', round(float(rng.random()) / 4, 3), date)
+            for date in dates
+            for listed in rng.choice(8, size=5, replace=False)
+            for supplier in rng.choice(20, size=3, replace=False)
+        ]
+        cls.df_history = disclosure_edges(supplier_filings(rows), None, lambda name: name)
+        cls.df_metrics = TemporalNetworkMetrics(cls.df_history).compute()
+
+    def test_disclosure_edges(self):
+        df = disclosure_edges(
+            supplier_filings([('L1', 'S1', 0.2, '2020-03-31'), ('L1', None, 0.1, '2020-03-31')]),
+            pd.DataFrame([{'Coname': 'L1', 'Custnm': 'C1', 'Custinc': 5.0, 'Custincrt': 0.5, 'Anncdate': '2020-06-30'}]),
+            lambda name: name
+        )
+        self.assertEqual(df['relationship_type'].tolist(), ['supplier', 'customer'])
+        self.assertEqual(df[['source_node_id', 'target_node_id']].values.tolist(), [['S1', 'L1'], ['L1', 'C1']])
+        self.assertTrue(disclosure_edges(None, None, lambda name: name).empty)
+
+    def test_update_matches_full_compute(self):
+        df_new = disclosure_edges(supplier_filings([
+            ('L1', 'S99', 0.3, '2021-06-30'),
+            ('L2', 'S1', 0.1, '2021-06-30'),
+            ('L9', 'S2', 0.2, '2022-03-31'),
+        ]), None, lambda name: name)
+        df_history = pd.concat([self.df_history, df_new], ignore_index=True)
+        updated = TemporalNetworkMetrics.update(self.df_metrics, df_history, df_new)
+        full = TemporalNetworkMetrics(df_history).compute()
+        self.assertEqual(list(updated.columns), METRIC_COLUMNS)
+        self.assertEqual(updated['period'].tolist()[-2:], ['2021Q2', '2022Q1'])
+        pd.testing.assert_frame_equal(updated, full)
+
+    def test_update_needs_later_periods(self):
+        df_new = disclosure_edges(supplier_filings([('L1', 'S99', 0.3, '2021-03-31')]), None, lambda name: name)
+        df_history = pd.concat([self.df_history, df_new], ignore_index=True)
+        self.assertIsNone(TemporalNetworkMetrics.update(self.df_metrics, df_history, df_new))
+
+    def test_update_without_dated_filings(self):
+        df_new = disclosure_edges(supplier_filings([('L1', 'S99', 0.3, None)]), None, lambda name: name)
+        updated = TemporalNetworkMetrics.update(self.df_metrics, self.df_history, df_new)
+        pd.testing.assert_frame_equal(updated, self.df_metrics)
+
+
+if __name__ == '__main__':
+    unittest.main()